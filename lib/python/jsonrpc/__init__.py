@@ -0,0 +1,103 @@
+"""
+Shared JSON-RPC 2.0 server core for the Python solutions under `solutions/*/code/python/`.
+
+Usage from a `server.py`:
+
+    rpc = Registry()
+
+    @rpc.method('subtract', params=params.by_position_or_name(('minuend', 'subtrahend'), ...))
+    def subtract(a, b):
+        return a - b
+
+    if __name__ == '__main__':
+        main(rpc)
+"""
+from . import params
+from .cli import main
+from .core import (
+    INTERNAL_ERROR,
+    INVALID_PARAMS,
+    INVALID_REQUEST,
+    METHOD_NOT_FOUND,
+    MISSING,
+    PARSE_ERROR,
+    InvalidParams,
+    Registry,
+    RpcError,
+    StreamedArray,
+    dumps,
+    encode,
+    make_error,
+)
+from .rawjson import RawJSON
+from .transport import serve_stdio, serve_stdio_stream
+
+# Imported on first use (PEP 562), so that a one-shot stdio request does not
+# load threads, process pools, profilers or the HTTP server it never touches
+_LAZY = {
+    'SERVER_BUSY': 'admission',
+    'Limiter': 'admission',
+    'attach_admission': 'admission',
+    'ResultCache': 'cache',
+    'attach_cache': 'cache',
+    'Metrics': 'metrics',
+    'attach_metrics': 'metrics',
+    'CALL_TIMEOUT': 'offload',
+    'ProcessPool': 'offload',
+    'attach_offload_pool': 'offload',
+    'attach_pool': 'pool',
+    'Profiler': 'profiling',
+    'SlowLog': 'profiling',
+    'attach_profiler': 'profiling',
+    'serve_http': 'httpd',
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    from importlib import import_module
+    value = getattr(import_module(f'.{_LAZY[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+__all__ = [
+    'CALL_TIMEOUT',
+    'INTERNAL_ERROR',
+    'INVALID_PARAMS',
+    'INVALID_REQUEST',
+    'METHOD_NOT_FOUND',
+    'MISSING',
+    'PARSE_ERROR',
+    'SERVER_BUSY',
+    'InvalidParams',
+    'Limiter',
+    'Metrics',
+    'ProcessPool',
+    'Profiler',
+    'RawJSON',
+    'Registry',
+    'ResultCache',
+    'RpcError',
+    'SlowLog',
+    'StreamedArray',
+    'attach_admission',
+    'attach_cache',
+    'attach_metrics',
+    'attach_offload_pool',
+    'attach_pool',
+    'attach_profiler',
+    'dumps',
+    'encode',
+    'make_error',
+    'main',
+    'params',
+    'serve_http',
+    'serve_stdio',
+    'serve_stdio_stream',
+]
@@ -0,0 +1,128 @@
+"""
+Admission control for expensive methods (`--admission`, or `attach_admission(rpc)`).
+
+    @rpc.method('matmul', params=matrices, cost=lambda a, b: len(a[0]) * a[1] * b[1], limit=4 * 200 ** 3)
+
+`cost` receives the validated handler arguments and estimates the work of one
+call (multiply-adds, array length, `count`, ...). It defaults to 1 per call, so
+that `limit` becomes a plain concurrency cap. `limit` is the cost one method may
+have in flight at once. A call estimated above `limit` runs only when nothing
+else of that method does. `--limit METHOD=UNITS` sets or overrides it.
+
+Small calls, those costing at most `SMALL_SHARE` of the limit, may go over it
+by that share. A method saturated by large calls therefore still admits its
+cheap ones at once.
+
+A call that does not fit waits, for at most `max_wait` seconds and behind at
+most `max_queue` other waiting calls. Otherwise it is rejected at once with
+`SERVER_BUSY` ("Server busy"). The error `data` carries `retry_after_ms`, an
+estimate of when capacity frees up. Methods without a limit, and cache hits,
+are never held back, so cheap calls keep their latency while heavy ones queue.
+"""
+import threading
+import time
+from time import perf_counter
+
+from .core import RpcError
+
+# Spec: -32000 to -32099 are reserved for implementation-defined server errors
+SERVER_BUSY = -32000
+DEFAULT_MAX_WAIT = 0.25
+DEFAULT_MAX_QUEUE = 32
+# Calls costing at most this share of the limit may exceed the limit by as much
+SMALL_SHARE = 0.1
+# Weight of the latest call in the moving average of call durations
+_SMOOTHING = 0.2
+
+
+class Limiter:
+    """Weighted semaphore: calls hold their cost while they run; waits are bounded."""
+
+    def __init__(self, method, capacity, max_wait=DEFAULT_MAX_WAIT, max_queue=DEFAULT_MAX_QUEUE):
+        self.method = method
+        self.capacity = capacity
+        self.small = capacity * SMALL_SHARE
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.in_use = 0
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+        # Moving average of call durations (seconds), for retry hints
+        self.avg_seconds = None
+        self._cond = threading.Condition()
+
+    def run(self, func, args, cost):
+        cost = min(cost, self.capacity)
+        self._acquire(cost)
+        started = perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = perf_counter() - started
+            with self._cond:
+                self.running -= 1
+                # Float costs must not leave a residue that blocks a full-capacity call
+                self.in_use = self.in_use - cost if self.running else 0
+                avg = self.avg_seconds
+                self.avg_seconds = elapsed if avg is None else avg + _SMOOTHING * (elapsed - avg)
+                self._cond.notify_all()
+
+    def _acquire(self, cost):
+        ceiling = self.capacity + self.small if cost <= self.small else self.capacity
+        with self._cond:
+            if self.in_use + cost > ceiling:
+                if self.waiting >= self.max_queue:
+                    raise self._busy()
+                deadline = time.monotonic() + self.max_wait
+                self.waiting += 1
+                try:
+                    while self.in_use + cost > ceiling:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise self._busy()
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.in_use += cost
+            self.running += 1
+
+    def _busy(self):
+        # Called with the lock held
+        self.rejected += 1
+        avg = self.avg_seconds if self.avg_seconds is not None else self.max_wait
+        retry_after = avg * (self.waiting + 1) / max(self.running, 1)
+        return RpcError(SERVER_BUSY, 'Server busy', {
+            'method': self.method,
+            'retry_after_ms': max(1, round(retry_after * 1000)),
+        })
+
+    def stats(self):
+        with self._cond:
+            return {
+                'capacity': self.capacity,
+                'in_use': self.in_use,
+                'running': self.running,
+                'waiting': self.waiting,
+                'rejected': self.rejected,
+            }
+
+
+def parse_limit(text):
+    """`METHOD=UNITS` (from `--limit`) -> (method, units)."""
+    method, sep, units = text.rpartition('=')
+    if not sep or not method:
+        raise ValueError(f'expected METHOD=UNITS, got {text!r}')
+    units = float(units)
+    if units <= 0:
+        raise ValueError(f'limit for {method} must be positive')
+    return method, int(units) if units.is_integer() else units
+
+
+def attach_admission(registry, limits=None, max_wait=DEFAULT_MAX_WAIT, max_queue=DEFAULT_MAX_QUEUE):
+    """Create a `Limiter` for every method with a `limit` (registered, or in `limits`)."""
+    capacities = dict(registry._limits)
+    capacities.update(limits or {})
+    limiters = {method: Limiter(method, capacity, max_wait, max_queue) for method, capacity in capacities.items()}
+    registry.set_limiters(limiters)
+    return limiters
@@ -0,0 +1,290 @@
+"""
+asyncio HTTP/1.1 transport (`server.py --http --async`).
+
+- Connections are kept alive (HTTP/1.1 default, or `Connection: keep-alive` from 1.0 clients)
+  and closed after `KEEPALIVE_TIMEOUT` seconds without a new request
+- Pipelined requests on one connection are read ahead and dispatched as they arrive;
+  responses are written back strictly in request order
+- Requests that call a method registered with `offload=True` run on an executor so
+  they do not block the event loop; everything else is handled inline
+- `StreamedArray` results are sent with chunked transfer encoding, each chunk
+  produced on the executor (HTTP/1.0 clients get an unframed body and a close)
+- With metrics attached (`--metrics`), `GET /metrics` answers in the Prometheus text format
+- A Content-Length above `max_body` is answered with 413 before the body is read,
+  and one that is not plain digits with 400 and a -32700 error
+- Compressed request bodies are decompressed; with `compression`, responses are
+  compressed for clients that accept it, large ones piece by piece on the executor
+"""
+import asyncio
+import contextvars
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from .compression import SLICE, STREAM_ABOVE, negotiate, slices
+from .core import encode_chunks, is_streamed
+from .transport import (
+    DEFAULT_MAX_BODY,
+    METRICS_CONTENT_TYPE,
+    bad_content_length,
+    body_too_large,
+    content_length,
+    decode_body,
+)
+
+KEEPALIVE_TIMEOUT = 60
+# Requests read ahead of the response currently being written, per connection
+PIPELINE_DEPTH = 32
+MAX_HEADER_BYTES = 64 * 1024
+
+_REASONS = {
+    200: 'OK',
+    204: 'No Content',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    411: 'Length Required',
+    413: 'Payload Too Large',
+    415: 'Unsupported Media Type',
+    501: 'Not Implemented',
+}
+
+
+def _response(status, body=b'', close=False, extra=()):
+    # JSON unless `extra` names another Content-Type
+    head = [f'HTTP/1.1 {status} {_REASONS[status]}']
+    if status != 204:
+        if body and not any(h.startswith('Content-Type:') for h in extra):
+            head.append('Content-Type: application/json')
+        head.append(f'Content-Length: {len(body)}')
+    head.extend(extra)
+    if close:
+        head.append('Connection: close')
+    return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+
+def _streamed_head(chunked, close, extra=()):
+    head = ['HTTP/1.1 200 OK', 'Content-Type: application/json']
+    if chunked:
+        head.append('Transfer-Encoding: chunked')
+    head.extend(extra)
+    if close:
+        head.append('Connection: close')
+    return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1')
+
+
+class _BadRequest(Exception):
+    def __init__(self, status, extra=(), body=b''):
+        super().__init__(status)
+        self.status = status
+        self.extra = extra
+        self.body = body
+
+
+async def _read_request(reader, max_body=None):
+    """Read one request; returns (body bytes, keep_alive, is HTTP/1.1, Accept-Encoding)
+    or None on a clean EOF.
+
+    The body is None for `GET /metrics`.
+    """
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise _BadRequest(400)
+    except asyncio.LimitOverrunError:
+        raise _BadRequest(400)
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        verb, target, version = lines[0].split(' ', 2)
+    except ValueError:
+        raise _BadRequest(400)
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    conn = headers.get('connection', '').lower()
+    if version == 'HTTP/1.1':
+        keep_alive = conn != 'close'
+    else:
+        keep_alive = conn == 'keep-alive'
+
+    accept = headers.get('accept-encoding')
+    if verb == 'GET' and target.partition('?')[0] == '/metrics':
+        return None, keep_alive, version == 'HTTP/1.1', accept
+    if verb != 'POST':
+        raise _BadRequest(405, ('Allow: POST',))
+    if 'transfer-encoding' in headers:
+        raise _BadRequest(501)
+    if 'content-length' not in headers:
+        raise _BadRequest(411)
+    length = content_length(headers['content-length'])
+    if length is None:
+        raise _BadRequest(400, body=bad_content_length())
+    if max_body and length > max_body:
+        raise _BadRequest(413, body=body_too_large(max_body))
+    body = await reader.readexactly(length) if length else b''
+    if 'content-encoding' in headers:
+        status, body = decode_body(body, headers['content-encoding'], max_body)
+        if status != 200:
+            raise _BadRequest(status, body=body)
+    return body, keep_alive, version == 'HTTP/1.1', accept
+
+
+class AsyncServer:
+    def __init__(self, registry, executor=None, max_body=DEFAULT_MAX_BODY, compression=None):
+        self.registry = registry
+        self.max_body = max_body
+        self.compression = compression
+        self.vary = ('Vary: Accept-Encoding',) if compression else ()
+        # Runs requests for offload=True methods; defaults to a thread pool
+        self.executor = executor or ThreadPoolExecutor(thread_name_prefix='jsonrpc-offload')
+        self._connections = {}
+        self._closing = False
+
+    async def dispatch(self, body, accept=None):
+        """Returns (status, body, extra headers) for one request body; the body is bytes or
+        an iterator of chunks."""
+        registry = self.registry
+        loop = asyncio.get_running_loop()
+        req, resp = registry.decode(body)
+        if req is not None:
+            if registry.wants_offload(req):
+                # Carries the slow-log record of this request into the executor thread
+                ctx = contextvars.copy_context()
+                resp = await loop.run_in_executor(self.executor, ctx.run, registry.handle, req)
+            else:
+                resp = registry.handle(req)
+        if resp is None:
+            return 204, b'', ()
+        compression = self.compression
+        coding = negotiate(accept) if compression else None
+        extra = self.vary + ((f'Content-Encoding: {coding}',) if coding else ())
+        if is_streamed(resp):
+            chunks = encode_chunks(resp)
+            return 200, compression.stream(chunks, coding) if coding else chunks, extra
+        out = registry.encode(resp)
+        if not coding or len(out) < compression.threshold:
+            return 200, out, self.vary
+        if len(out) > STREAM_ABOVE:
+            # Compressed slice by slice on the executor as it is written
+            return 200, compression.stream(slices(out), coding), extra
+        if len(out) > SLICE:
+            return 200, await loop.run_in_executor(self.executor, compression.compress, out, coding), extra
+        return 200, compression.compress(out, coding), extra
+
+    def metrics_response(self):
+        registry = self.registry
+        if registry.metrics is None:
+            return 404, b'', ()
+        body = registry.metrics.prometheus(registry.cache).encode('utf-8')
+        return 200, body, (f'Content-Type: {METRICS_CONTENT_TYPE}',)
+
+    async def write_streamed(self, writer, chunks, chunked, close, extra):
+        loop = asyncio.get_running_loop()
+        writer.write(_streamed_head(chunked, close, extra))
+        while True:
+            chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+            if chunk is None:
+                break
+            if not chunk:
+                # An empty chunk would end a chunked body early
+                continue
+            writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+            await writer.drain()
+        if chunked:
+            writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    async def handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        state = self._connections[task] = {'busy': False}
+        pending = asyncio.Queue(PIPELINE_DEPTH)
+
+        async def write_responses():
+            closed = False
+            while True:
+                item = await pending.get()
+                if item is None:
+                    return
+                fut, keep_alive, http11 = item
+                if closed:
+                    # Read ahead before the connection was closed under it; drop
+                    fut.cancel()
+                    continue
+                status, body, extra = await fut
+                if isinstance(body, bytes):
+                    writer.write(_response(status, body, close=not keep_alive, extra=extra))
+                    await writer.drain()
+                else:
+                    # Without chunking the body can only end with the connection
+                    keep_alive = keep_alive and http11
+                    await self.write_streamed(writer, body, http11, not keep_alive, extra)
+                    if not keep_alive:
+                        writer.close()
+                        closed = True
+                        continue
+                if pending.empty():
+                    state['busy'] = False
+                    if self._closing:
+                        task.cancel()
+                        return
+
+        writer_task = asyncio.create_task(write_responses())
+        try:
+            while True:
+                try:
+                    req = await asyncio.wait_for(_read_request(reader, self.max_body), KEEPALIVE_TIMEOUT)
+                except _BadRequest as e:
+                    await pending.put((_done((e.status, e.body, e.extra)), False, True))
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if req is None:
+                    break
+                body, keep_alive, http11, accept = req
+                state['busy'] = True
+                fut = _done(self.metrics_response()) if body is None else asyncio.ensure_future(self.dispatch(body, accept))
+                await pending.put((fut, keep_alive, http11))
+                if not keep_alive:
+                    break
+            await pending.put(None)
+            await writer_task
+        except (ConnectionError, asyncio.CancelledError):
+            writer_task.cancel()
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, int(port), limit=MAX_HEADER_BYTES, backlog=128)
+        print(f'Listening on {host}:{port} (asyncio)', file=sys.stderr)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        async with server:
+            await stop.wait()
+            self._closing = True
+            server.close()
+            # Drop idle keep-alive connections; let busy ones finish their current responses
+            for task, state in list(self._connections.items()):
+                if not state['busy']:
+                    task.cancel()
+            if self._connections:
+                await asyncio.wait(list(self._connections), timeout=KEEPALIVE_TIMEOUT)
+        self.executor.shutdown(wait=True)
+
+
+def _done(value):
+    fut = asyncio.get_running_loop().create_future()
+    fut.set_result(value)
+    return fut
+
+
+def serve_async(registry, host, port, executor=None, max_body=DEFAULT_MAX_BODY, compression=None):
+    asyncio.run(AsyncServer(registry, executor, max_body, compression).serve(host, port))
@@ -0,0 +1,230 @@
+"""
+Large batch bodies handled while they are read (`--stream-batches`).
+
+A batch array larger than `SPLIT_ABOVE` bytes is split into its members as the
+body arrives. Each member is decoded and dispatched as soon as it is complete,
+and its reply is produced for a `StreamedArray` that the transport writes as it
+goes. Only the member in progress is held, not the whole batch, so the
+transport's `max_body` caps each member rather than the body.
+
+- A member longer than `max_member` bytes is dropped while it is read and
+  answered with -32600 (id null)
+- An error found before the first reply (an empty array, a body that is not
+  valid JSON) is answered on its own, as `Registry.handle_json` would
+- A parse error found later (a member that is not valid JSON, a truncated body,
+  text after the closing bracket) cannot take back the replies already
+  produced: the reply array ends with a -32700 error with id null, and no
+  member after it is run
+- With `Registry.executor` (`--batch-workers`), members are dispatched in
+  groups on the pool while the next group is read; replies keep member order
+"""
+import re
+from collections import deque
+
+from .core import INVALID_REQUEST, PARSE_ERROR, StreamedArray, make_error
+
+# Smaller bodies are read whole: splitting only pays off on large ones
+SPLIT_ABOVE = 1024 * 1024
+READ_SIZE = 64 * 1024
+# Stands in for a member longer than `max_member`
+TOO_LARGE = object()
+# Members per pool worker dispatched together (`Registry.executor`)
+GROUP_PER_WORKER = 64
+
+_WHITESPACE = b' \t\r\n'
+# Skip plain text and whole strings up to the next bracket (or comma, between
+# members); a string whose end has not been read yet is finished with _STRING.
+# Between members, a whole member nested at most two deep is skipped at once.
+# Inside brackets text is matched a byte at a time, so a member that is not
+# complete yet fails in linear time.
+_STRING_BODY = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+_FLAT = rb'(?:[^][{}"]|' + _STRING_BODY + rb')*'
+_SHALLOW = rb'(?:[^][{}"]|' + _STRING_BODY + rb'|\{' + _FLAT + rb'\}|\[' + _FLAT + rb'\])*'
+_TOP = re.compile(rb'(?:[^][{}",]+|' + _STRING_BODY + rb'|\{' + _SHALLOW + rb'\}|\[' + _SHALLOW + rb'\])*', re.DOTALL)
+_NESTED = re.compile(rb'(?:[^][{}"]+|' + _STRING_BODY + rb')*', re.DOTALL)
+_STRING = re.compile(rb'["\\]')
+
+
+def is_batch(head):
+    """True when a body starting with `head` is a JSON array."""
+    return head.lstrip(_WHITESPACE)[:1] == b'['
+
+
+def split_array(read, head, max_member=None):
+    """Yield the text of each member of the JSON array `head` starts, reading on with `read(n)`.
+
+    Members are only delimited here, not validated. One longer than
+    `max_member` bytes is not kept and yields `TOO_LARGE`. Raises ValueError
+    when the text around the members is not a well-formed array.
+    """
+    buf = bytearray(head)
+    pos = begin = buf.index(b'[') + 1
+    depth = 0
+    in_string = False
+    skipping = False
+    members = 0
+    while True:
+        if in_string:
+            m = _STRING.search(buf, pos)
+            if m is not None:
+                in_string = buf[m.start()] == 0x5c
+                # After a backslash, skip the escaped character
+                pos = m.end() + in_string
+                continue
+        else:
+            pos = (_NESTED if depth else _TOP).match(buf, pos).end()
+            if pos < len(buf):
+                c = buf[pos]
+                pos += 1
+                if c == 0x22:
+                    in_string = True
+                elif c == 0x5b or c == 0x7b:
+                    depth += 1
+                elif depth:
+                    depth -= 1
+                elif c == 0x7d:
+                    raise ValueError('unbalanced }')
+                else:
+                    # `,` or `]` ends a member of the batch
+                    if skipping:
+                        skipping = False
+                        yield TOO_LARGE
+                    else:
+                        member = bytes(buf[begin:pos - 1]).strip(_WHITESPACE)
+                        if member:
+                            yield member
+                        elif c == 0x2c or members:
+                            raise ValueError('empty batch member')
+                        else:
+                            # `[]`
+                            _expect_end(read, buf[pos:])
+                            return
+                    members += 1
+                    begin = pos
+                    if c == 0x5d:
+                        _expect_end(read, buf[pos:])
+                        return
+                continue
+        data = read(READ_SIZE)
+        if not data:
+            raise ValueError('truncated batch')
+        # Drop what has been delimited already (and, when skipping, the member in progress)
+        cut = min(pos, len(buf)) if skipping else begin
+        del buf[:cut]
+        pos -= cut
+        begin -= cut
+        buf += data
+        if max_member and not skipping and len(buf) - begin > max_member:
+            # Whitespace before a member does not count towards its size
+            begin = len(buf) - len(buf[begin:].lstrip(_WHITESPACE))
+            skipping = len(buf) - begin > max_member
+
+
+def _expect_end(read, rest):
+    # Only whitespace may follow the array, up to the end of the body
+    while not rest.strip(_WHITESPACE):
+        rest = read(READ_SIZE)
+        if not rest:
+            return
+    raise ValueError('data after the batch array')
+
+
+class _BodyError(Exception):
+    """Ends the replies with `resp`, the answer to the body as a whole."""
+
+    def __init__(self, resp):
+        super().__init__(resp['error']['message'])
+        self.resp = resp
+
+
+def _decoded(registry, members):
+    # Decoded members in order (`TOO_LARGE` passed through); raises _BodyError
+    seen = False
+    try:
+        for raw in members:
+            seen = True
+            if raw is TOO_LARGE:
+                yield raw
+                continue
+            req, err = registry.decode(raw)
+            if err is not None:
+                raise _BodyError(err)
+            yield req
+    except ValueError:
+        raise _BodyError(registry._reject(None, PARSE_ERROR, 'Parse error'))
+    if not seen:
+        raise _BodyError(make_error(None, INVALID_REQUEST, 'Invalid Request'))
+
+
+def _replies(registry, members, max_member):
+    """Yield the reply of every member that has one, in member order."""
+    too_large = f'Invalid Request: batch member exceeds {max_member} bytes'
+    requests = _decoded(registry, members)
+    executor = registry.executor
+    if executor is None:
+        for req in requests:
+            resp = registry._reject(None, INVALID_REQUEST, too_large) if req is TOO_LARGE else registry.handle_one(req)
+            if resp is not None:
+                yield resp
+        return
+
+    workers = registry._batch_workers
+    size = GROUP_PER_WORKER * workers
+    # Replies of the groups handed to the pool, oldest first; one group runs while the next is read
+    pending = deque()
+    group = []
+
+    def submit():
+        chunksize = max(1, len(group) // (4 * workers))
+        pending.append(executor.map(registry._batch_member, group, chunksize=chunksize))
+
+    error = None
+    try:
+        for req in requests:
+            if req is TOO_LARGE:
+                if group:
+                    submit()
+                    group = []
+                pending.append([registry._reject(None, INVALID_REQUEST, too_large)])
+            else:
+                group.append(req)
+                if len(group) >= size:
+                    submit()
+                    group = []
+            while len(pending) > 1:
+                yield from filter(None, pending.popleft())
+    except _BodyError as e:
+        # Members before the error still run, and their replies go out first
+        error = e
+    if group:
+        submit()
+    while pending:
+        yield from filter(None, pending.popleft())
+    if error is not None:
+        raise error
+
+
+def handle_streamed(registry, read, head, max_member=None):
+    """Handle the batch array starting with `head`, reading the rest with `read(n)`.
+
+    Returns what `Registry.handle_json` would: None when no member has a reply,
+    an error response for the body as a whole, or the replies as a
+    `StreamedArray` that dispatches the remaining members as it is written.
+    """
+    replies = _replies(registry, split_array(read, head, max_member), max_member)
+    try:
+        first = next(replies, None)
+    except _BodyError as e:
+        return e.resp
+    if first is None:
+        return None
+    return StreamedArray(_encode_replies, registry, first, replies)
+
+
+def _encode_replies(registry, first, replies):
+    yield registry.encode(first).decode('utf-8')
+    try:
+        for resp in replies:
+            yield registry.encode(resp).decode('utf-8')
+    except _BodyError as e:
+        yield registry.encode(e.resp).decode('utf-8')
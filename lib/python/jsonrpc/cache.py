@@ -0,0 +1,143 @@
+"""
+Memoising result cache for pure methods.
+
+    @rpc.method('subtract', params=..., cache=True)     # cached until evicted
+    @rpc.method('fibStream', params=..., cache=300)     # cached for at most 300 s
+
+The cache only takes effect once one is attached (`--cache-size N`, or
+`attach_cache(rpc, maxsize)`). Entries are keyed on the method name plus the
+handler arguments the params validator returned, so invalid calls never reach
+the cache and params that validate to the same arguments (`{"a":1,"b":2}` and
+`{"b":2,"a":1}`, or `"7"` and `7` where the validator converts) share an entry,
+while `1` and `1.0` do not. Calls whose arguments hold more than
+`KEY_MAX_ITEMS` values, or values other than JSON-like ones, are not cached.
+
+Only successful results are stored. A hit returns the stored result object
+itself, so the response bytes are identical to a fresh call; handlers of cached
+methods, and callers of `Registry.handle`, must not mutate a result afterwards.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from .core import MISSING, dumps
+
+# Calls with larger arguments are not cached: their keys would be slow to build and big to keep
+KEY_MAX_ITEMS = 1024
+
+
+class _Unkeyable(Exception):
+    pass
+
+
+def cache_key(method, args):
+    """A hashable key for `method` called with the validated `args`, or None if they are not cached."""
+    if type(args) is tuple and all(type(arg) is int or type(arg) is str for arg in args):
+        return method, args
+    try:
+        # Items of the arguments' lists and objects count, not the arguments themselves
+        return method, _freeze(args, [KEY_MAX_ITEMS + len(args)])
+    except _Unkeyable:
+        return None
+
+
+def _freeze(value, budget):
+    t = type(value)
+    if t is int or t is str or value is None:
+        return value
+    if t is float or t is bool:
+        # Otherwise 1, 1.0 and True would be one key, though their results differ (2 vs
+        # 2.0); repr also tells 0.0 from -0.0
+        return t, repr(value)
+    if t is list or t is tuple or t is dict:
+        budget[0] -= len(value)
+        if budget[0] < 0:
+            raise _Unkeyable
+        if t is dict:
+            return t, frozenset((k, _freeze(v, budget)) for k, v in value.items())
+        return t, tuple(_freeze(item, budget) for item in value)
+    raise _Unkeyable
+
+
+class ResultCache:
+    """Thread-safe LRU bounded by entry count and, optionally, by approximate size.
+
+    `max_bytes` counts the repr of the key plus the serialised result of each
+    entry (measuring costs one extra serialisation per miss).
+    """
+
+    key = staticmethod(cache_key)
+
+    def __init__(self, maxsize=1024, max_bytes=None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        # key -> (result, expires_at or None, size)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Returns the cached result or MISSING."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            result, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result, ttl=None):
+        size = 0
+        if self.max_bytes is not None:
+            size = len(repr(key[1])) + len(dumps(result))
+            if size > self.max_bytes:
+                return
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._entries[key] = (result, expires_at, size)
+            self.bytes += size
+            while len(self._entries) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+def attach_cache(registry, maxsize=1024, max_bytes=None):
+    """Attach a `ResultCache` to `registry`; methods registered with `cache=...` start using it."""
+    cache = ResultCache(maxsize, max_bytes)
+    registry.set_cache(cache)
+    return cache
@@ -0,0 +1,148 @@
+"""
+Command-line entry point shared by every `server.py`.
+
+    python server.py            # one request on stdin -> one response on stdout
+    python server.py --http     # HTTP server on TEST_HOST/TEST_PORT (default 127.0.0.1:4000)
+    python server.py --stdio-stream   # many requests on stdin (one per line, or Content-Length framed)
+
+`--async` serves HTTP/1.1 with keep-alive and pipelining on asyncio instead.
+`--workers N` serves HTTP with N threads, or N pre-forked processes sharing
+the port with `--worker-mode process`.
+
+Batch members run in order by default; `--batch-workers N` runs them on a
+thread (default) or process pool (`--batch-pool process`).
+
+`--stream` lets methods return large `StreamedArray` results, which every
+transport writes as they are produced (chunked over HTTP).
+
+`--cache-size N` memoises the results of methods registered with `cache=...`
+in an LRU of N entries (optionally also capped at `--cache-bytes`).
+
+`--metrics` records per-method calls, errors and latency histograms, served at
+`GET /metrics` (Prometheus text format) and by the `rpc.stats` method.
+
+`--profiling` lets SIGUSR1 (and, with `--admin-token`, the `rpc.profile` method)
+start a cProfile or sampling capture written to `tmp/`; `--slow-log MS` logs
+requests slower than MS milliseconds there (see `jsonrpc.profiling`).
+
+`--admission` admits methods registered with `limit=...` (or named by
+`--limit METHOD=UNITS`) through bounded queues; calls that cannot get in within
+`--max-wait` are rejected at once with a retry hint (see `jsonrpc.admission`).
+HTTP bodies larger than `--max-body` are refused before they are read.
+
+`--compress` gzip/deflate-compresses HTTP responses of at least
+`--compress-threshold` bytes for clients that send Accept-Encoding, at
+`--compress-level` (see `jsonrpc.compression`).
+
+`--stream-batches` handles large batch bodies while they are read: members are
+dispatched one by one and the reply array is written as it grows, so memory
+holds one member instead of the whole batch (see `jsonrpc.batchstream`).
+
+`--offload-workers N` runs the methods registered with `offload='process'` on
+N forked worker processes, warm with the solution's module state; calls over
+`--offload-timeout` seconds are cut off and their worker replaced (see
+`jsonrpc.offload`).
+
+JSON is decoded and encoded with orjson or ujson when one is importable;
+`--json-codec` picks the backend explicitly (`json`: standard library only).
+
+Without arguments the request is served before argparse or any optional
+feature is imported: a one-shot process spends its time on the call, not on
+loading a server it does not run (see `scripts/check-startup.py`).
+"""
+import os
+import sys
+
+from . import codec
+from .transport import DEFAULT_MAX_BODY, WORKER_MODES, serve_stdio, serve_stdio_stream
+
+
+def main(registry, argv=None):
+    if not (sys.argv[1:] if argv is None else argv):
+        serve_stdio(registry)
+        return
+    import argparse
+
+    from .admission import DEFAULT_MAX_QUEUE, DEFAULT_MAX_WAIT, attach_admission, parse_limit
+    from .cache import attach_cache
+    from .compression import DEFAULT_LEVEL, DEFAULT_THRESHOLD, Compression
+    from .metrics import attach_metrics
+    from .pool import POOL_KINDS, attach_pool
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--http', action='store_true', help='Run as a simple HTTP JSON-RPC server (listen on TEST_HOST/TEST_PORT env vars or defaults)')
+    parser.add_argument('--stdio-stream', action='store_true', help='Serve newline-delimited (or Content-Length framed) requests from stdin until EOF')
+    parser.add_argument('--async', action='store_true', dest='use_async', help='HTTP: use the asyncio keep-alive/pipelining server')
+    parser.add_argument('--workers', type=int, default=0, help='HTTP: serve N connections concurrently (0: one at a time)')
+    parser.add_argument('--worker-mode', choices=WORKER_MODES, default='thread', help='HTTP: run --workers as threads or as pre-forked processes sharing the port (default: thread)')
+    parser.add_argument('--batch-workers', type=int, default=0, help='Run batch members concurrently on N workers (0: in order, in the request thread)')
+    parser.add_argument('--batch-pool', choices=POOL_KINDS, default='thread', help='Pool used by --batch-workers (default: thread)')
+    parser.add_argument('--stream', action='store_true', help='Write array results incrementally (HTTP chunked / stdio pieces) and let methods accept larger requests')
+    parser.add_argument('--cache-size', type=int, default=0, help='Memoise results of cacheable methods in an LRU of N entries (0: no cache)')
+    parser.add_argument('--cache-bytes', type=int, default=None, help='With --cache-size: also evict once cached params + results exceed N bytes')
+    parser.add_argument('--metrics', action='store_true', help='Record per-method counts, errors and latency histograms (GET /metrics, rpc.stats)')
+    parser.add_argument('--profiling', action='store_true', help='Allow on-demand profiling: SIGUSR1 starts a 10 s sampling capture written to --profile-dir')
+    parser.add_argument('--profile-dir', default=None, help='Where captures and the slow log are written (default: tmp/ in the repository)')
+    parser.add_argument('--admin-token', default=os.environ.get('JSONRPC_ADMIN_TOKEN'), help='With --profiling: register rpc.profile, accepted only with this token (default: JSONRPC_ADMIN_TOKEN)')
+    parser.add_argument('--slow-log', type=float, default=None, metavar='MS', help='Append requests slower than MS milliseconds to <profile dir>/slow-<pid>.log')
+    parser.add_argument('--admission', action='store_true', help='Limit the cost in flight of methods registered with limit=... (and those named by --limit)')
+    parser.add_argument('--limit', action='append', default=[], metavar='METHOD=UNITS', help='With --admission: cost units METHOD may have in flight (repeatable)')
+    parser.add_argument('--max-wait', type=float, default=DEFAULT_MAX_WAIT * 1000, metavar='MS', help='With --admission: longest wait for capacity before "Server busy" (default: %(default)g)')
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE, help='With --admission: calls that may wait per method (default: %(default)s)')
+    parser.add_argument('--max-body', type=int, default=DEFAULT_MAX_BODY, metavar='BYTES', help='HTTP: refuse larger request bodies with 413 before reading them; --stdio-stream: skip larger framed messages (0: no cap; default: %(default)s)')
+    parser.add_argument('--compress', action='store_true', help='HTTP: gzip/deflate-compress responses for clients that send Accept-Encoding')
+    parser.add_argument('--compress-level', type=int, choices=range(1, 10), default=DEFAULT_LEVEL, metavar='1-9', help='With --compress: zlib level (default: %(default)s)')
+    parser.add_argument('--compress-threshold', type=int, default=DEFAULT_THRESHOLD, metavar='BYTES', help='With --compress: leave smaller responses uncompressed (default: %(default)s)')
+    parser.add_argument('--stream-batches', action='store_true', help='One-shot stdio and --http (threaded): handle batch bodies above 1 MiB member by member while they are read; --max-body then caps each member')
+    parser.add_argument('--offload-workers', type=int, default=0, help="Run methods registered with offload='process' on N worker processes (0: in the calling thread)")
+    parser.add_argument('--offload-timeout', type=float, default=None, metavar='SECONDS', help='With --offload-workers: answer calls running longer with "Call timed out" and replace the worker (0: no limit; default: 30)')
+    parser.add_argument('--json-codec', choices=codec.CODECS, default='auto', help='JSON backend: orjson, ujson, the standard library (json), or the first importable (default: auto)')
+    args = parser.parse_args(argv)
+    if args.stream_batches and (args.stdio_stream or args.http and args.use_async):
+        parser.error('--stream-batches needs one-shot stdio or --http without --async')
+    try:
+        codec.use(args.json_codec)
+    except ValueError as e:
+        parser.error(str(e))
+    registry.streaming = args.stream
+    if args.metrics:
+        attach_metrics(registry)
+    if args.profiling:
+        from .profiling import attach_profiler
+        attach_profiler(registry, args.profile_dir, args.admin_token)
+    if args.slow_log is not None:
+        from .profiling import SlowLog
+        path = None if args.profile_dir is None else os.path.join(args.profile_dir, f'slow-{os.getpid()}.log')
+        registry.set_slow_log(SlowLog(args.slow_log / 1000, path))
+    if args.admission or args.limit:
+        try:
+            limits = dict(parse_limit(text) for text in args.limit)
+        except ValueError as e:
+            parser.error(str(e))
+        attach_admission(registry, limits, args.max_wait / 1000, args.max_queue)
+    if args.cache_size > 0:
+        attach_cache(registry, args.cache_size, args.cache_bytes)
+    if args.offload_workers > 0:
+        from .offload import DEFAULT_TIMEOUT, attach_offload_pool
+        timeout = DEFAULT_TIMEOUT if args.offload_timeout is None else args.offload_timeout
+        # Pre-forked HTTP processes fork their own workers on first use
+        prefork = args.http and not args.use_async and args.workers > 0 and args.worker_mode == 'process'
+        attach_offload_pool(registry, args.offload_workers, timeout, start=not prefork)
+    if args.batch_workers > 0:
+        attach_pool(registry, args.batch_pool, args.batch_workers)
+    if args.http:
+        host = os.environ.get('TEST_HOST', '127.0.0.1')
+        port = os.environ.get('TEST_PORT', '4000')
+        compression = Compression(args.compress_level, args.compress_threshold) if args.compress else None
+        if args.use_async:
+            from .aio import serve_async
+            serve_async(registry, host, port, max_body=args.max_body, compression=compression)
+        else:
+            from .httpd import serve_http
+            serve_http(registry, host, port, workers=args.workers, mode=args.worker_mode, max_body=args.max_body,
+                       compression=compression, stream_batches=args.stream_batches)
+        return
+    if args.stdio_stream:
+        serve_stdio_stream(registry, max_body=args.max_body)
+        return
+    serve_stdio(registry, stream_batches=args.stream_batches)
@@ -0,0 +1,513 @@
+"""
+JSON-RPC 2.0 client over HTTP/1.1 with pooled keep-alive connections.
+
+    client = Client('http://127.0.0.1:4000/')
+    client.call('subtract', [42, 23])          # -> 19; an error response raises RpcError
+    client.notify('update', [1, 2])
+    client.batch([('sum', [1, 2]), ('divide', [1, 0])])   # -> [3, RpcError(...)]
+
+    async with AsyncClient('http://127.0.0.1:4000/', batch_window=0.002) as client:
+        await asyncio.gather(*(client.call('subtract', [i, 1]) for i in range(100)))
+
+- Connections are reused across calls, up to `pool_size` at once. A kept-alive
+  connection the server has closed in the meantime is replaced and the request
+  sent again, once.
+- Request ids are assigned by the client.
+- With `batch_window` (seconds), calls made within the window of each other,
+  from any thread or task, are sent as one batch request of up to `max_batch`
+  calls. Each caller still gets its own result.
+- `AsyncClient` also pipelines: up to `pipeline` requests are written to one
+  connection before their responses arrive. Responses come back in request
+  order (HTTP/1.1), and chunked (`StreamedArray`) responses are read whole.
+- With `compress=True` the client sends `Accept-Encoding: gzip, deflate`.
+  Compressed responses are always decompressed.
+- `send(body)` posts a raw body (bytes or str) and returns the raw response
+  body, or b'' for 204. It is what the test runner uses to replay fixtures.
+- A status other than 200 or 204 raises `HTTPError`. A reply that is not valid
+  JSON-RPC raises ValueError.
+"""
+import asyncio
+import collections
+import http.client
+import itertools
+import threading
+import urllib.parse
+from concurrent.futures import Future
+
+from . import codec
+from .compression import decompress
+from .core import RpcError
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_BATCH = 100
+DEFAULT_PIPELINE = 8
+
+# Errors that mean a kept-alive connection was closed by the server before our request got through
+_STALE = (ConnectionResetError, BrokenPipeError, ConnectionAbortedError, asyncio.IncompleteReadError)
+
+
+class HTTPError(Exception):
+    """The server answered with a status other than 200 or 204."""
+
+    def __init__(self, status, body):
+        super().__init__(f'HTTP {status}')
+        self.status = status
+        self.body = body
+
+
+def _split_url(url):
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme != 'http':
+        raise ValueError(f'only http:// URLs are supported, got {url!r}')
+    return parts.hostname, parts.port or 80, parts.path or '/'
+
+
+def _request(method, params, id_=None):
+    req = {'jsonrpc': '2.0', 'method': method}
+    if params is not None:
+        req['params'] = params
+    if id_ is not None:
+        req['id'] = id_
+    return req
+
+
+def _decode(data):
+    return codec.loads(data) if data else None
+
+
+def _settle(batch, reply):
+    """Resolve the future of every call in `batch` [(request, future)] from the server's reply."""
+    replies = reply if isinstance(reply, list) else [] if reply is None else [reply]
+    by_id = {r.get('id'): r for r in replies if isinstance(r, dict)}
+    # One error for the whole body (e.g. Parse error) comes back with id null
+    whole = by_id.get(None) if len(replies) == 1 else None
+    for req, fut in batch:
+        if fut is None or fut.done():
+            continue
+        resp = by_id.get(req['id'], whole)
+        if resp is None:
+            fut.set_exception(ValueError(f'no response for id {req["id"]}'))
+        elif isinstance(resp.get('error'), dict):
+            err = resp['error']
+            fut.set_exception(RpcError(err.get('code'), err.get('message'), err.get('data')))
+        elif 'result' in resp:
+            fut.set_result(resp['result'])
+        else:
+            fut.set_exception(ValueError(f'malformed response for id {req["id"]}'))
+
+
+def _outcomes(futures):
+    return [fut.exception() or fut.result() for fut in futures]
+
+
+# --- threads ------------------------------------------------------------------------
+
+class _Batcher:
+    """Collects calls for `window` seconds (or until `max_batch`), then sends them as one batch."""
+
+    def __init__(self, send, window, max_batch, make_future, schedule):
+        self.send = send
+        self.window = window
+        self.max_batch = max_batch
+        self.make_future = make_future
+        self.schedule = schedule
+        self.pending = []
+        self.timer = None
+
+    def add(self, req):
+        """Queue `req`; returns its future (None for a notification) and a full batch to send, if any."""
+        fut = self.make_future() if 'id' in req else None
+        self.pending.append((req, fut))
+        if len(self.pending) >= self.max_batch:
+            return fut, self.take()
+        if self.timer is None:
+            self.timer = self.schedule(self.window)
+        return fut, None
+
+    def take(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        return batch
+
+
+class Client:
+    """Thread-safe JSON-RPC client; share one instance between threads."""
+
+    def __init__(self, url, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 batch_window=None, max_batch=DEFAULT_MAX_BATCH, compress=False):
+        self.host, self.port, self.path = _split_url(url)
+        self.timeout = timeout
+        self._headers = {'Content-Type': 'application/json'}
+        if compress:
+            self._headers['Accept-Encoding'] = 'gzip, deflate'
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._ids = itertools.count(1)
+        self._batcher = None
+        if batch_window:
+            self._batcher = _Batcher(self._send_batch, batch_window, max_batch, Future, self._start_timer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def call(self, method, params=None):
+        """Call `method` and return its result; an error response raises `RpcError`."""
+        req = _request(method, params, next(self._ids))
+        if self._batcher is not None:
+            return self._queue(req).result()
+        fut = Future()
+        _settle([(req, fut)], _decode(self.send(codec.dumps(req))))
+        return fut.result()
+
+    def notify(self, method, params=None):
+        """Send a notification; with batching it goes out with the next batch."""
+        req = _request(method, params)
+        if self._batcher is not None:
+            self._queue(req)
+        else:
+            self.send(codec.dumps(req))
+
+    def batch(self, calls):
+        """Send [(method, params), ...] as one batch; returns each result, or the `RpcError` it raised."""
+        batch = [(_request(method, params, next(self._ids)), Future()) for method, params in calls]
+        if batch:
+            self._send_batch(batch)
+        return _outcomes([fut for _, fut in batch])
+
+    def send(self, body):
+        """POST a raw body; returns the response body (b'' for 204)."""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        with self._slots:
+            conn, reused = self._checkout()
+            try:
+                try:
+                    resp = self._post(conn, body)
+                except _STALE:
+                    if not reused:
+                        raise
+                    conn.close()
+                    conn = self._connect()
+                    resp = self._post(conn, body)
+                status, data = resp.status, resp.read()
+                coding = resp.getheader('Content-Encoding')
+                if coding:
+                    data = decompress(data, coding)
+            except BaseException:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                with self._lock:
+                    self._idle.append(conn)
+        if status not in (200, 204):
+            raise HTTPError(status, data)
+        return data
+
+    def flush(self):
+        """Send the calls queued for auto-batching now."""
+        if self._batcher is not None:
+            with self._lock:
+                batch = self._batcher.take()
+            if batch:
+                self._send_batch(batch)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _queue(self, req):
+        with self._lock:
+            fut, full = self._batcher.add(req)
+        if full:
+            self._send_batch(full)
+        return fut
+
+    def _start_timer(self, window):
+        timer = threading.Timer(window, self.flush)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def _send_batch(self, batch):
+        # A single call goes out as a plain request, not a batch of one
+        body = batch[0][0] if len(batch) == 1 else [req for req, _ in batch]
+        try:
+            reply = _decode(self.send(codec.dumps(body)))
+        except Exception as e:
+            for _, fut in batch:
+                if fut is not None:
+                    fut.set_exception(e)
+            return
+        _settle(batch, reply)
+
+    def _connect(self):
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _checkout(self):
+        """An idle connection (most recently used first), or a new one; returns (conn, reused)."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._connect(), False
+
+    def _post(self, conn, body):
+        conn.request('POST', self.path, body=body, headers=self._headers)
+        return conn.getresponse()
+
+
+# --- asyncio ------------------------------------------------------------------------
+
+class _Connection:
+    """One pipelined HTTP/1.1 connection: requests are written as they come, responses
+    are matched to them in order by a reader task."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.waiting = collections.deque()
+        self.closed = False
+        self.answered = 0
+        self.task = asyncio.ensure_future(self._read_responses())
+
+    async def request(self, data):
+        fut = asyncio.get_running_loop().create_future()
+        self.waiting.append(fut)
+        try:
+            self.writer.write(data)
+            await self.writer.drain()
+        except BaseException:
+            fut.cancel()
+            raise
+        return await fut
+
+    def close(self):
+        self.closed = True
+        self.task.cancel()
+        self.writer.close()
+
+    async def _read_responses(self):
+        error = ConnectionResetError('connection closed by the server')
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                status, body, close = await self._read_response(line)
+                if not self.waiting:
+                    error = ValueError('unexpected response from the server')
+                    break
+                fut = self.waiting.popleft()
+                self.answered += 1
+                if not fut.done():
+                    fut.set_result((status, body))
+                if close:
+                    break
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            error = e
+        finally:
+            self.closed = True
+            self.writer.close()
+            while self.waiting:
+                fut = self.waiting.popleft()
+                if not fut.done():
+                    fut.set_exception(error)
+
+    async def _read_response(self, line):
+        reader = self.reader
+        try:
+            version, code = line.split(None, 2)[:2]
+            status = int(code)
+        except ValueError:
+            raise ValueError(f'bad status line {line!r}')
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+        conn = headers.get('connection', '')
+        close = conn == 'close' or (version == b'HTTP/1.0' and conn != 'keep-alive')
+        if status == 204 or status == 304 or 100 <= status < 200:
+            return status, b'', close
+        if 'chunked' in headers.get('transfer-encoding', ''):
+            body = await self._read_chunked()
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            # Unframed body: it ends with the connection
+            body = await reader.read()
+            close = True
+        if 'content-encoding' in headers:
+            body = decompress(body, headers['content-encoding'])
+        return status, body, close
+
+    async def _read_chunked(self):
+        reader = self.reader
+        parts = []
+        while True:
+            size = int((await reader.readline()).split(b';', 1)[0], 16)
+            if size == 0:
+                # Skip trailers up to the closing blank line
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(parts)
+            parts.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+
+class AsyncClient:
+    """asyncio JSON-RPC client with pooled, pipelined connections; use from one event loop."""
+
+    def __init__(self, url, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 batch_window=None, max_batch=DEFAULT_MAX_BATCH, pipeline=DEFAULT_PIPELINE, compress=False):
+        self.host, self.port, self.path = _split_url(url)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        accept = 'Accept-Encoding: gzip, deflate\r\n' if compress else ''
+        self._head = (f'POST {self.path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n{accept}'
+                      'Content-Type: application/json\r\nContent-Length: ').encode('latin-1')
+        self._conns = []
+        self._open_lock = None
+        # In-flight requests across the pool; keeps every connection within `pipeline`
+        self._in_flight = None
+        self._pipeline = pipeline
+        self._ids = itertools.count(1)
+        self._sending = set()
+        self._batcher = None
+        if batch_window:
+            self._batcher = _Batcher(self._send_batch, batch_window, max_batch, self._future, self._start_timer)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def call(self, method, params=None):
+        """Call `method` and return its result; an error response raises `RpcError`."""
+        req = _request(method, params, next(self._ids))
+        if self._batcher is not None:
+            return await self._queue(req)
+        fut = self._future()
+        _settle([(req, fut)], _decode(await self.send(codec.dumps(req))))
+        return fut.result()
+
+    async def notify(self, method, params=None):
+        """Send a notification; with batching it goes out with the next batch."""
+        req = _request(method, params)
+        if self._batcher is not None:
+            self._queue(req)
+        else:
+            await self.send(codec.dumps(req))
+
+    async def batch(self, calls):
+        """Send [(method, params), ...] as one batch; returns each result, or the `RpcError` it raised."""
+        batch = [(_request(method, params, next(self._ids)), self._future()) for method, params in calls]
+        if batch:
+            await self._send_batch(batch)
+        return _outcomes([fut for _, fut in batch])
+
+    async def send(self, body):
+        """POST a raw body; returns the response body (b'' for 204)."""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        data = self._head + b'%d\r\n\r\n' % len(body) + body
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self.pool_size * self._pipeline)
+            self._open_lock = asyncio.Lock()
+        async with self._in_flight:
+            conn = await self._connection()
+            try:
+                status, body = await asyncio.wait_for(conn.request(data), self.timeout)
+            except _STALE:
+                if not conn.answered:
+                    raise
+                # Sent on a kept-alive connection the server had closed: once more on a new one
+                conn = await self._connection(fresh=True)
+                status, body = await asyncio.wait_for(conn.request(data), self.timeout)
+        if status not in (200, 204):
+            raise HTTPError(status, body)
+        return body
+
+    async def flush(self):
+        """Send the calls queued for auto-batching now."""
+        if self._batcher is not None:
+            batch = self._batcher.take()
+            if batch:
+                await self._send_batch(batch)
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+    async def close(self):
+        await self.flush()
+        conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+
+    def _future(self):
+        return asyncio.get_running_loop().create_future()
+
+    def _queue(self, req):
+        fut, full = self._batcher.add(req)
+        if full:
+            self._spawn(full)
+        return fut
+
+    def _start_timer(self, window):
+        return asyncio.get_running_loop().call_later(window, self._flush_later)
+
+    def _flush_later(self):
+        self._batcher.timer = None
+        batch = self._batcher.take()
+        if batch:
+            self._spawn(batch)
+
+    def _spawn(self, batch):
+        task = asyncio.ensure_future(self._send_batch(batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send_batch(self, batch):
+        # A single call goes out as a plain request, not a batch of one
+        body = batch[0][0] if len(batch) == 1 else [req for req, _ in batch]
+        try:
+            reply = _decode(await self.send(codec.dumps(body)))
+        except Exception as e:
+            for _, fut in batch:
+                if fut is not None and not fut.done():
+                    fut.set_exception(e)
+            return
+        _settle(batch, reply)
+
+    async def _connection(self, fresh=False):
+        """An idle connection, else a new one while the pool has room, else the least busy one."""
+        while True:
+            live = [c for c in self._conns if not c.closed]
+            if not fresh:
+                idle = next((c for c in live if not c.waiting), None)
+                if idle is not None:
+                    return idle
+            async with self._open_lock:
+                self._conns = live = [c for c in self._conns if not c.closed]
+                if fresh or len(live) < self.pool_size:
+                    reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+                    conn = _Connection(reader, writer)
+                    self._conns.append(conn)
+                    return conn
+            if live:
+                return min(live, key=lambda c: len(c.waiting))
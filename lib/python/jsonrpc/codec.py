@@ -0,0 +1,160 @@
+"""
+JSON codec used by every transport: request bodies are decoded straight from
+bytes and responses are encoded straight to bytes.
+
+    use('auto')     # orjson, else ujson, else the standard library (the default)
+    use('json')     # standard library only
+
+Until a backend is chosen, the first `loads`/`dumps` chooses 'auto'. A one-shot
+stdio process calls `choose` instead, which keeps the standard library for a
+small body: importing orjson costs more than it saves on a single short call.
+
+An accelerated backend is only a fast path. Whatever it rejects is handed to
+the standard library, which has the final word. This covers `NaN` literals,
+lone surrogates, integers beyond 64 bits, and values holding `RawJSON` or
+`StreamedArray`. Some backends turn out-of-range integers into floats instead
+of rejecting them, so a body with a run of 19 or more digits is always decoded
+by the standard library. Valid requests therefore decode to the same objects
+whichever backend is active, and invalid ones are still answered with a Parse
+error.
+
+JSON has no NaN or infinities. Every backend writes such a float as `null`,
+as orjson does, instead of the `NaN`/`Infinity` tokens of the standard library
+that other parsers reject.
+"""
+import json
+import math
+import re
+
+CODECS = ('auto', 'orjson', 'ujson', 'json')
+
+# Any integer outside the signed 64-bit range has at least 19 digits
+_LONG_DIGITS_B = re.compile(rb'[0-9]{19}')
+_LONG_DIGITS_S = re.compile(r'[0-9]{19}')
+
+# Compact, ASCII-only: the reply stays one line and its bytes are its text. Non-finite
+# floats raise ValueError, and are then replaced by `finite`
+_std_encoder = json.JSONEncoder(separators=(',', ':'), allow_nan=False)
+
+
+def _std_loads(data):
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
+
+
+def _std_dumps(obj):
+    try:
+        return _std_encoder.encode(obj).encode('ascii')
+    except ValueError:
+        return _std_encoder.encode(finite(obj)).encode('ascii')
+
+
+def finite(obj):
+    """`obj` with every NaN or infinite float in its dicts, lists and tuples replaced by None."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [finite(value) for value in obj]
+    return obj
+
+
+def _unsupported(obj):
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def _orjson():
+    import orjson
+    # orjson reads bytes, bytearray, memoryview and str without converting them first
+    return orjson.loads, orjson.dumps
+
+
+def _ujson():
+    import ujson
+
+    def loads(data):
+        return ujson.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+    options = dict(ensure_ascii=False, escape_forward_slashes=False, default=_unsupported)
+    try:
+        # Raise for NaN and infinities, which recent ujson writes as NaN/Infinity;
+        # versions without allow_nan always raise for them
+        ujson.dumps(0.0, allow_nan=False)
+        options['allow_nan'] = False
+    except TypeError:
+        pass
+
+    def dumps(obj):
+        return ujson.dumps(obj, **options).encode('utf-8')
+
+    return loads, dumps
+
+
+_BACKENDS = {'orjson': _orjson, 'ujson': _ujson}
+# Bodies below this many bytes are not worth importing an accelerated backend for (see `choose`)
+SMALL_BODY = 64 * 1024
+
+# Active backend: name (None: not chosen yet), and its loads/dumps (None: the standard library alone)
+name = None
+_fast_loads = None
+_fast_dumps = None
+
+
+def use(codec='auto'):
+    """Select the backend; raises ValueError when a named one is not importable."""
+    global name, _fast_loads, _fast_dumps
+    if codec not in CODECS:
+        raise ValueError(f'unknown codec {codec!r}')
+    candidates = ('orjson', 'ujson') if codec == 'auto' else (codec,)
+    for candidate in candidates:
+        if candidate == 'json':
+            break
+        try:
+            _fast_loads, _fast_dumps = _BACKENDS[candidate]()
+        except ImportError:
+            if codec != 'auto':
+                raise ValueError(f'{candidate} is not installed')
+            continue
+        name = candidate
+        return name
+    name, _fast_loads, _fast_dumps = 'json', None, None
+    return name
+
+
+def choose(size):
+    """Choose the backend for a process that handles a single `size`-byte body, unless one is chosen."""
+    if name is None:
+        use('json' if size < SMALL_BODY else 'auto')
+    return name
+
+
+def loads(data):
+    """Decode a JSON document from bytes, bytearray, memoryview or str."""
+    if name is None:
+        use('auto')
+    if _fast_loads is not None:
+        long_digits = _LONG_DIGITS_S if isinstance(data, str) else _LONG_DIGITS_B
+        if long_digits.search(data) is None:
+            try:
+                return _fast_loads(data)
+            except Exception:
+                pass
+    return _std_loads(data)
+
+
+def dumps(obj):
+    """Compact UTF-8 JSON bytes of `obj` made of plain JSON types.
+
+    Raises TypeError (or ValueError) for anything else; callers that may hold
+    `RawJSON`/`StreamedArray` values fall back to `core.iter_encode`.
+    """
+    if name is None:
+        use('auto')
+    if _fast_dumps is not None:
+        try:
+            return _fast_dumps(obj)
+        except Exception:
+            pass
+    return _std_dumps(obj)
@@ -0,0 +1,115 @@
+"""
+HTTP content coding for the HTTP transports (`--compress`).
+
+- Responses: with compression enabled, a client that sends `Accept-Encoding:
+  gzip` (or `deflate`) gets bodies of at least `threshold` bytes compressed at
+  `level`. Bodies above `STREAM_ABOVE` bytes, and every `StreamedArray`
+  result, are compressed piece by piece while they are written (chunked
+  transfer encoding), so the full compressed copy never sits in memory.
+- Requests: a body sent with `Content-Encoding: gzip` or `deflate` is always
+  decompressed before it is parsed, up to the transport's `max_body` bytes.
+
+`deflate` is the zlib format (RFC 9110); raw deflate streams, which some
+clients send instead, are accepted on requests too.
+"""
+import zlib
+
+ENCODINGS = ('gzip', 'deflate')
+DEFAULT_LEVEL = 1
+DEFAULT_THRESHOLD = 1024
+# Larger encoded responses are compressed in SLICE-sized pieces and sent chunked
+STREAM_ABOVE = 256 * 1024
+SLICE = 64 * 1024
+
+_WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+_ALIASES = {'x-gzip': 'gzip'}
+
+
+def negotiate(accept_encoding):
+    """The preferred coding allowed by an `Accept-Encoding` value, or None (identity)."""
+    if not accept_encoding:
+        return None
+    qvalues = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[_ALIASES.get(coding, coding)] = q
+    best, best_q = None, 0.0
+    for coding in ENCODINGS:
+        q = qvalues.get(coding, qvalues.get('*', 0.0))
+        # Ties go to the earlier entry of ENCODINGS
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def decompress(data, content_encoding, limit=None):
+    """Undo a request's `Content-Encoding`.
+
+    Raises LookupError for a coding other than gzip/deflate/identity, ValueError
+    for corrupt or truncated data, and OverflowError when the result would exceed
+    `limit` bytes.
+    """
+    coding = (content_encoding or 'identity').strip().lower()
+    coding = _ALIASES.get(coding, coding)
+    if coding == 'identity':
+        return data
+    if coding not in _WBITS:
+        raise LookupError(coding)
+    try:
+        return _inflate(data, _WBITS[coding], limit)
+    except zlib.error:
+        if coding != 'deflate':
+            raise ValueError('corrupt gzip body')
+    try:
+        return _inflate(data, -zlib.MAX_WBITS, limit)
+    except zlib.error:
+        raise ValueError('corrupt deflate body')
+
+
+def _inflate(data, wbits, limit):
+    inflater = zlib.decompressobj(wbits)
+    out = inflater.decompress(data, limit + 1 if limit else 0)
+    if limit and len(out) > limit:
+        raise OverflowError(limit)
+    if not inflater.eof:
+        raise ValueError('truncated compressed body')
+    return out
+
+
+def slices(data):
+    """`data` in SLICE-sized memoryview pieces, for `Compression.stream`."""
+    view = memoryview(data)
+    for start in range(0, len(view), SLICE):
+        yield view[start:start + SLICE]
+
+
+class Compression:
+    """Response compression settings shared by the HTTP transports."""
+
+    def __init__(self, level=DEFAULT_LEVEL, threshold=DEFAULT_THRESHOLD):
+        if not 1 <= level <= 9:
+            raise ValueError('compression level must be between 1 and 9')
+        self.level = level
+        self.threshold = threshold
+
+    def compress(self, data, coding):
+        deflater = zlib.compressobj(self.level, zlib.DEFLATED, _WBITS[coding])
+        return deflater.compress(data) + deflater.flush()
+
+    def stream(self, chunks, coding):
+        """Compress an iterable of byte chunks as it is consumed; yields non-empty pieces."""
+        deflater = zlib.compressobj(self.level, zlib.DEFLATED, _WBITS[coding])
+        for chunk in chunks:
+            out = deflater.compress(chunk)
+            if out:
+                yield out
+        yield deflater.flush()
@@ -0,0 +1,523 @@
+"""
+JSON-RPC 2.0 core shared by the Python reference solutions.
+- `Registry` holds the method table; handlers are added with the `@registry.method(...)` decorator
+- Each method may carry a params validator built once at registration time (see `jsonrpc.params`)
+- `Registry.handle` validates one decoded request and dispatches it with a single dict lookup
+- Batch arrays are handled member by member, optionally fanned out on `Registry.executor`
+- Methods registered with `cache=...` are memoised in `Registry.cache` once one is attached
+- Methods registered with `offload='process'` run in forked worker processes once
+  a process pool is attached (see `jsonrpc.offload`)
+- Methods registered with `limit=...` (and `cost=...`) are admitted through a
+  `jsonrpc.admission.Limiter` once admission control is attached
+- Members named in `raw_params` reach the handler as `RawJSON` text that `dumps`
+  splices back verbatim (see `jsonrpc.rawjson`)
+- Handlers may return a `StreamedArray`; `Registry.streaming` tells them the transport
+  writes it incrementally, so larger results are acceptable
+- Bodies are decoded from bytes and responses encoded to bytes by `jsonrpc.codec`;
+  `encode` writes the success envelope from pre-built byte fragments
+- With `Registry.metrics` attached, calls, errors and phase timings are recorded
+  (see `jsonrpc.metrics`); `Registry.profiler` and `Registry.slow_log` wrap the
+  same points (see `jsonrpc.profiling`)
+"""
+import json
+from time import perf_counter
+
+from . import codec
+from .rawjson import RawJSON, decode_keeping_raw
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+# Sentinel for "member not present" (distinct from an explicit JSON null)
+MISSING = object()
+
+# Spec: id MUST be a String, Number or Null
+_ID_TYPES = (str, int, float, type(None))
+
+
+class RpcError(Exception):
+    """Raise from a handler or validator to answer with a JSON-RPC error object."""
+
+    def __init__(self, code, message, data=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class InvalidParams(RpcError):
+    """-32602 with the conventional `Invalid params: <detail>` message."""
+
+    def __init__(self, detail=None, data=None):
+        message = 'Invalid params' if detail is None else f'Invalid params: {detail}'
+        super().__init__(INVALID_PARAMS, message, data)
+
+
+def make_error(id_, code, message, data=None):
+    err = {"code": code, "message": message}
+    if data is not None:
+        err["data"] = data
+    # Spec: error responses always carry "id" (null when it could not be determined)
+    return {"jsonrpc": "2.0", "error": err, "id": id_}
+
+
+class StreamedArray:
+    """A result serialised as a JSON array whose items are produced lazily as JSON text.
+
+    `source` is an iterable of already-encoded items, or a callable returning one
+    (called as `source(*args)` each time the array is serialised, so the value can
+    be cached and re-sent). Streaming transports write the items as they are
+    produced; elsewhere `dumps` joins them into one string.
+    """
+    __slots__ = ('source', 'args')
+
+    def __init__(self, source, *args):
+        self.source = source
+        self.args = args
+
+    def __iter__(self):
+        if callable(self.source):
+            return iter(self.source(*self.args))
+        return iter(self.source)
+
+
+class _ContainsStream(Exception):
+    pass
+
+
+def _no_stream(obj):
+    if isinstance(obj, (StreamedArray, RawJSON)):
+        raise _ContainsStream()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+# Built once: json.dumps() with keyword arguments constructs a new encoder per call.
+# Non-finite floats raise ValueError and are written as null (see `codec.finite`)
+_fast_dumps = json.JSONEncoder(separators=(',', ':'), default=_no_stream, allow_nan=False).encode
+
+
+def iter_encode(obj):
+    """Yield the compact JSON text of `obj` in pieces, expanding `StreamedArray` item by item
+    and splicing `RawJSON` text as is."""
+    if isinstance(obj, RawJSON):
+        yield obj.text
+        return
+    if isinstance(obj, StreamedArray):
+        sep = '['
+        for item in obj:
+            yield sep + item
+            sep = ','
+        yield '[]' if sep == '[' else ']'
+        return
+    try:
+        yield _fast_dumps(obj)
+        return
+    except _ContainsStream:
+        pass
+    except ValueError:
+        yield from iter_encode(codec.finite(obj))
+        return
+    if isinstance(obj, dict):
+        sep = '{'
+        for key, value in obj.items():
+            yield sep + _fast_dumps(str(key)) + ':'
+            yield from iter_encode(value)
+            sep = ','
+        yield '}'
+    else:
+        sep = '['
+        for value in obj:
+            yield sep
+            yield from iter_encode(value)
+            sep = ','
+        yield ']'
+
+
+def encode_chunks(obj, size=65536):
+    """`iter_encode` regrouped into UTF-8 byte chunks of roughly `size` bytes."""
+    buf = []
+    pending = 0
+    for piece in iter_encode(obj):
+        buf.append(piece)
+        pending += len(piece)
+        if pending >= size:
+            yield ''.join(buf).encode('utf-8')
+            buf = []
+            pending = 0
+    if buf:
+        yield ''.join(buf).encode('utf-8')
+
+
+def is_streamed(resp):
+    """True when a response (or any batch member) carries a `StreamedArray` result, or is
+    itself one: a batch replied to member by member (see `jsonrpc.batchstream`)."""
+    if isinstance(resp, StreamedArray):
+        return True
+    if isinstance(resp, list):
+        return any(isinstance(r.get('result'), StreamedArray) for r in resp)
+    return isinstance(resp, dict) and isinstance(resp.get('result'), StreamedArray)
+
+
+def dumps(obj):
+    try:
+        return _fast_dumps(obj)
+    except (_ContainsStream, ValueError):
+        return ''.join(iter_encode(obj))
+
+
+# {"jsonrpc":"2.0","result":<result>,"id":<id>}
+_RESULT_HEAD = b'{"jsonrpc":"2.0","result":'
+_ID_SEP = b',"id":'
+_RESULT_TAIL = b'}'
+
+
+def _encode_value(obj):
+    try:
+        return codec.dumps(obj)
+    except Exception:
+        # RawJSON / StreamedArray inside, or a type only the stdlib path reports
+        return dumps(obj).encode('utf-8')
+
+
+def encode(resp):
+    """UTF-8 JSON bytes of a response dict or batch list (not for streamed responses)."""
+    if type(resp) is list:
+        return b'[' + b','.join([encode(r) for r in resp]) + b']'
+    result = resp.get('result', MISSING)
+    if result is MISSING:
+        # Error responses are rare enough to take the generic path
+        return _encode_value(resp)
+    id_ = resp['id']
+    return b''.join((_RESULT_HEAD, _encode_value(result), _ID_SEP,
+                     b'%d' % id_ if type(id_) is int else _encode_value(id_), _RESULT_TAIL))
+
+
+class Registry:
+    """Method table for one JSON-RPC service."""
+
+    def __init__(self):
+        # name -> (handler, params validator or None)
+        self._methods = {}
+        # Methods that event-loop transports should run on an executor: those marked
+        # offload, plus those admitted through a Limiter, whose wait would block the loop
+        self._offload = set()
+        self._off_loop = frozenset()
+        # name -> (handler, offload_cost) of the methods registered with offload='process',
+        # and the pool running them while one is attached (see `jsonrpc.offload`)
+        self._process = {}
+        self.process_pool = None
+        # Optional concurrent.futures executor used to run batch members concurrently,
+        # and the callable it runs per member (see `jsonrpc.pool`)
+        self.executor = None
+        self._batch_member = self.handle_one
+        self._batch_workers = 1
+        # Optional result cache (see `jsonrpc.cache`) and name -> TTL (None: no expiry)
+        # for the methods that may use it
+        self.cache = None
+        self._cache_ttl = {}
+        # True when the transport writes `StreamedArray` results as they are produced
+        # (`--stream`); handlers may then accept larger requests
+        self.streaming = False
+        # name -> params members passed as RawJSON, and the union of all of them
+        self._raw_params = {}
+        self._raw_keys = frozenset()
+        # name -> cost estimator / default limit, and the active name -> Limiter
+        # (see `jsonrpc.admission`)
+        self._costs = {}
+        self._limits = {}
+        self._limiters = {}
+        # Optional observers of dispatch, decode and encode: `jsonrpc.metrics.Metrics`,
+        # `jsonrpc.profiling.Profiler` and `jsonrpc.profiling.SlowLog`; `_observed` is
+        # False while none is attached so the plain path pays a single check
+        self.metrics = None
+        self.profiler = None
+        self.slow_log = None
+        self._observed = False
+
+    def set_executor(self, executor, member=None, workers=1):
+        """Run batch members on `executor` (`workers` wide); `member` replaces `handle_one`
+        as the submitted callable (process pools need a picklable module-level function)."""
+        self.executor = executor
+        self._batch_member = member or self.handle_one
+        self._batch_workers = workers
+
+    def set_process_pool(self, pool):
+        """Run the handlers of offload='process' methods on `pool` (None: in the calling thread again)."""
+        self.process_pool = pool
+        for name, (func, offload_cost) in self._process.items():
+            if pool is not None:
+                func = pool.bind(name, func, self._costs.get(name), offload_cost)
+            self._methods[name] = (func, self._methods[name][1])
+
+    def set_metrics(self, metrics):
+        """Record call counts, errors and phase timings in `metrics` (None disables)."""
+        self.metrics = metrics
+        self._update_observed()
+
+    def set_profiler(self, profiler):
+        """Run dispatched calls through `profiler.run` (None disables)."""
+        self.profiler = profiler
+        self._update_observed()
+
+    def set_slow_log(self, slow_log):
+        """Report per-request phase timings to `slow_log` (None disables)."""
+        self.slow_log = slow_log
+        self._update_observed()
+
+    def _update_observed(self):
+        self._observed = not (self.metrics is None and self.profiler is None and self.slow_log is None)
+
+    def set_cache(self, cache):
+        """Memoise results of methods registered with `cache=...` in `cache` (None disables)."""
+        self.cache = cache
+
+    def set_limiters(self, limiters):
+        """Admit calls of each method in `limiters` (name -> `Limiter`) through it."""
+        self._limiters = dict(limiters)
+        self._update_off_loop()
+
+    def _update_off_loop(self):
+        self._off_loop = frozenset(self._offload).union(self._limiters)
+
+    def method(self, name=None, params=None, offload=False, cache=False, raw_params=None, cost=None, limit=None,
+               offload_cost=None):
+        """Decorator registering `func` under `name` (defaults to the function name).
+
+        `params` is a callable taking the raw `params` member (or `MISSING`) and
+        returning the positional arguments for the handler; it raises
+        `InvalidParams` for bad input. Without it the handler gets `params` as-is.
+        `offload=True` marks CPU-heavy methods that must not run on an event loop;
+        `offload='process'` also runs them in a worker process once a process
+        pool is attached (see `jsonrpc.offload`); with `offload_cost`, only calls
+        whose `cost` is at least that go to a worker.
+        `cache=True` (or a TTL in seconds) marks pure methods whose results may be
+        memoised by `Registry.cache`; hits share the result object, so it must not
+        be mutated once returned.
+        `raw_params` names members of an object `params` that are handed over as
+        `RawJSON` source text (for values that are only passed through).
+        `cost` estimates the work of a call from the handler arguments, and `limit`
+        is the cost the method may have in flight under admission control.
+        """
+        def decorator(func):
+            self.register(name or func.__name__, func, params, offload, cache, raw_params, cost, limit, offload_cost)
+            return func
+        return decorator
+
+    def register(self, name, func, params=None, offload=False, cache=False, raw_params=None, cost=None, limit=None,
+                 offload_cost=None):
+        self._methods[name] = (func, params)
+        for table, value in ((self._costs, cost), (self._limits, limit)):
+            if value is None:
+                table.pop(name, None)
+            else:
+                table[name] = value
+        if offload:
+            self._offload.add(name)
+        else:
+            self._offload.discard(name)
+        self._update_off_loop()
+        if offload == 'process':
+            self._process[name] = (func, offload_cost)
+        else:
+            self._process.pop(name, None)
+        if cache is False or cache is None:
+            self._cache_ttl.pop(name, None)
+        else:
+            self._cache_ttl[name] = None if cache is True else cache
+        if raw_params:
+            self._raw_params[name] = frozenset(raw_params)
+        else:
+            self._raw_params.pop(name, None)
+        self._raw_keys = frozenset().union(*self._raw_params.values())
+
+    def wants_offload(self, req):
+        """True when a decoded request (or any batch member) calls an offload method
+        or one under admission control, and for batches fanned out on `executor`,
+        since handle_batch waits for their members."""
+        off_loop = self._off_loop
+        if isinstance(req, list):
+            if self.executor is not None and len(req) > 1:
+                return True
+            return bool(off_loop) and any(isinstance(r, dict) and r.get("method") in off_loop for r in req)
+        if not off_loop:
+            return False
+        return isinstance(req, dict) and req.get("method") in off_loop
+
+    def __contains__(self, name):
+        return name in self._methods
+
+    def handle(self, req):
+        """Handle a decoded request or batch; returns the response (dict/list) or None when nothing is to be sent."""
+        if isinstance(req, list):
+            return self.handle_batch(req)
+        return self.handle_one(req)
+
+    def handle_batch(self, reqs):
+        """Handle a batch array. Notification members are dropped from the reply;
+        an all-notification batch yields None, an empty batch is itself invalid."""
+        if not reqs:
+            return make_error(None, INVALID_REQUEST, "Invalid Request")
+        if self.executor is None or len(reqs) == 1:
+            resps = [self.handle_one(r) for r in reqs]
+        else:
+            # map() keeps member order; chunking amortises process-pool round trips
+            chunksize = max(1, len(reqs) // (4 * self._batch_workers))
+            resps = self.executor.map(self._batch_member, reqs, chunksize=chunksize)
+        out = [r for r in resps if r is not None]
+        return out or None
+
+    def _reject(self, id_, code, message):
+        # Errors raised before a method is dispatched
+        if self.metrics is not None:
+            self.metrics.error(code)
+        return make_error(id_, code, message)
+
+    def handle_one(self, req):
+        """Handle one decoded request object; returns the response dict or None for notifications."""
+        if not isinstance(req, dict):
+            return self._reject(None, INVALID_REQUEST, "Invalid Request")
+
+        id_ = req.get("id", MISSING)
+        if id_ is not MISSING and (not isinstance(id_, _ID_TYPES) or isinstance(id_, bool)):
+            return self._reject(None, INVALID_REQUEST, "Invalid Request")
+        reply_id = None if id_ is MISSING else id_
+
+        version = req.get("jsonrpc", MISSING)
+        if version is MISSING:
+            # Not a JSON-RPC 2.0 request object at all (e.g. `{"foo": "bar"}`)
+            return self._reject(reply_id, INVALID_REQUEST, "Invalid Request")
+        if version != "2.0":
+            return self._reject(reply_id, INVALID_REQUEST, "Invalid Request: jsonrpc must be '2.0'")
+
+        method = req.get("method")
+        if not isinstance(method, str):
+            return self._reject(reply_id, INVALID_REQUEST, "Invalid Request: method must be a string")
+
+        entry = self._methods.get(method)
+        if entry is None:
+            if id_ is MISSING:
+                return None
+            return self._reject(reply_id, METHOD_NOT_FOUND, "Method not found")
+
+        if not self._observed:
+            return self._dispatch(method, entry, req.get("params", MISSING), id_)
+        return self._observed_dispatch(method, entry, req.get("params", MISSING), id_)
+
+    def _observed_dispatch(self, method, entry, params, id_):
+        metrics = self.metrics
+        profiler = self.profiler
+        if metrics is not None:
+            metrics.begin(method)
+        started = perf_counter()
+        resp = None
+        try:
+            if profiler is None:
+                resp = self._dispatch(method, entry, params, id_)
+            else:
+                resp = profiler.run(self._dispatch, method, entry, params, id_)
+        finally:
+            elapsed = perf_counter() - started
+            if metrics is not None:
+                # Failed notifications have no response, so their errors are not counted
+                code = resp["error"]["code"] if resp is not None and "error" in resp else None
+                metrics.end(method, elapsed, code)
+            if self.slow_log is not None:
+                self.slow_log.call(method, params, elapsed)
+        return resp
+
+    def _dispatch(self, method, entry, params, id_):
+        """Run a validated call: params validation, cache lookup and the handler."""
+        func, validate = entry
+        reply_id = None if id_ is MISSING else id_
+        cache = self.cache
+        key = None
+        result = MISSING
+        try:
+            args = (None if params is MISSING else params,) if validate is None else validate(params)
+            if cache is not None and method in self._cache_ttl:
+                # Keyed on the validated arguments: rejected calls never pay for a key
+                key = cache.key(method, args)
+                if key is not None:
+                    result = cache.get(key)
+            if result is MISSING:
+                limiter = self._limiters.get(method) if self._limiters else None
+                if limiter is None:
+                    result = func(*args)
+                else:
+                    cost = self._costs.get(method)
+                    result = limiter.run(func, args, 1 if cost is None else cost(*args))
+                if key is not None:
+                    cache.put(key, result, self._cache_ttl[method])
+        except RpcError as e:
+            if id_ is MISSING:
+                return None
+            return make_error(reply_id, e.code, e.message, e.data)
+        except Exception:
+            if id_ is MISSING:
+                return None
+            return make_error(reply_id, INTERNAL_ERROR, "Internal error")
+
+        if id_ is MISSING:
+            # Notification — no response
+            return None
+        return {"jsonrpc": "2.0", "result": result, "id": id_}
+
+    def decode(self, raw):
+        """Decode a request body (bytes, memoryview or str); returns (request, None) or (None, parse error response)."""
+        if not self._observed:
+            return self._decode(raw)
+        started = perf_counter()
+        req, err = self._decode(raw)
+        elapsed = perf_counter() - started
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.observe('parse', elapsed)
+            if err is not None:
+                metrics.error(PARSE_ERROR)
+        if self.slow_log is not None:
+            self.slow_log.begin(raw, elapsed)
+        return req, err
+
+    def _decode(self, raw):
+        if self._raw_keys:
+            req = decode_keeping_raw(raw, self._raw_keys)
+            if req is not None:
+                return self._restore_raw(req), None
+        try:
+            return codec.loads(raw), None
+        except Exception:
+            # JSON-RPC spec: Parse error responses MUST include an "id" set to null
+            return None, make_error(None, PARSE_ERROR, "Parse error")
+
+    def _restore_raw(self, req):
+        # Decode raw members the called method did not ask for
+        params = req.get("params")
+        if isinstance(params, dict):
+            wanted = self._raw_params.get(req.get("method"), ())
+            for key, value in params.items():
+                if isinstance(value, RawJSON) and key not in wanted:
+                    params[key] = value.decode()
+        return req
+
+    def encode(self, resp):
+        """`encode(resp)`, timed as the serialise phase when metrics or a slow log are attached."""
+        if not self._observed:
+            return encode(resp)
+        started = perf_counter()
+        out = encode(resp)
+        elapsed = perf_counter() - started
+        if self.metrics is not None:
+            self.metrics.observe('serialise', elapsed)
+        if self.slow_log is not None:
+            self.slow_log.end(elapsed)
+        return out
+
+    def handle_json(self, raw):
+        """Decode a request body and handle it; parse failures map to -32700."""
+        req, err = self.decode(raw)
+        if err is not None:
+            return err
+        return self.handle(req)
@@ -0,0 +1,433 @@
+"""
+The threaded HTTP transport (`--http`): POST body in, JSON-RPC response out (204
+for notifications). Imported only when it is used, so the stdio transports do
+not pay for `http.server` at startup.
+
+`StreamedArray` results are written as they are produced, with HTTP/1.1
+chunked transfer encoding. With metrics attached (`--metrics`), `GET /metrics`
+answers in the Prometheus text format.
+
+HTTP/1.1 connections are kept alive between requests. An idle connection is
+closed after `KEEPALIVE_TIMEOUT` seconds. It is also closed, after the response
+in progress (with `Connection: close`) or at once when idle, whenever it holds
+up a new connection: one the single-threaded server has not accepted yet, or
+one waiting for a thread of a full threading server.
+
+A body whose Content-Length exceeds `max_body` is refused with 413 and a -32600
+error before any of it is read, and one that is not plain digits (`-1`) with
+400 and a -32700 error; the connection is then closed. With
+`stream_batches` (`--stream-batches`), a batch above `SPLIT_ABOVE` bytes is
+handled member by member while it is read instead, and `max_body` caps each
+member (see `jsonrpc.batchstream`). Its replies are spooled to a temporary
+file until the body has been read, then sent chunked.
+
+Request bodies sent with `Content-Encoding: gzip|deflate` are decompressed (up
+to `max_body`); with `compression` (`--compress`), responses are compressed
+for clients that accept it (see `jsonrpc.compression`).
+
+`serve_http` runs one of three ways:
+- `workers=0`: a single-threaded `HTTPServer` (one connection at a time)
+- `mode='thread'`: a threading server handling at most `workers` connections at once
+- `mode='process'`: `workers` pre-forked processes, each binding the same port with
+  SO_REUSEPORT so the kernel spreads connections across cores
+
+SIGTERM/SIGINT stop accepting new connections and let in-flight requests finish.
+"""
+import os
+import select
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+
+from .batchstream import READ_SIZE, SPLIT_ABOVE, handle_streamed, is_batch
+from .compression import STREAM_ABOVE, negotiate, slices
+from .core import encode_chunks, is_streamed
+from .transport import (
+    DEFAULT_MAX_BODY,
+    METRICS_CONTENT_TYPE,
+    bad_content_length,
+    body_too_large,
+    content_length,
+    decode_body,
+)
+
+# Shorter than the asyncio transport's: an idle connection here holds a thread (or the whole server)
+KEEPALIVE_TIMEOUT = 5
+# How often an idle keep-alive connection checks whether another connection is waiting
+_IDLE_POLL = 0.01
+# Replies to a batch still being read are held in memory up to this size, then on disk
+SPOOL_MEMORY = 8 * 1024 * 1024
+# Pre-forked workers that exit within QUICK_EXIT seconds of being forked are respawned
+# after a doubling delay (up to RESPAWN_DELAY_MAX); after MAX_QUICK_EXITS in a row the
+# parent gives up, as a worker that cannot start would otherwise be forked in a tight loop
+QUICK_EXIT = 1.0
+RESPAWN_DELAY = 0.1
+RESPAWN_DELAY_MAX = 5.0
+MAX_QUICK_EXITS = 5
+
+
+def _spooled(chunks, finish):
+    """`chunks` collected in a temporary file, then `finish()`, then the collected chunks.
+
+    A client that sends its whole body before reading the response would stop
+    reading while the server writes, and the server would then stop reading
+    the body: replies to a batch that is still arriving wait in the spool.
+    """
+    with tempfile.SpooledTemporaryFile(SPOOL_MEMORY) as spool:
+        for chunk in chunks:
+            spool.write(chunk)
+        finish()
+        spool.seek(0)
+        yield from iter(lambda: spool.read(READ_SIZE), b'')
+
+
+def make_handler(registry, max_body=DEFAULT_MAX_BODY, compression=None, stream_batches=False):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes; without TCP_NODELAY the second
+        # waits for the client's delayed ACK on a kept-alive connection
+        disable_nagle_algorithm = True
+
+        def handle(self):
+            self.close_connection = True
+            self.handle_one_request()
+            while not self.close_connection and self.next_request_arrives():
+                self.handle_one_request()
+
+        def end_headers(self):
+            if not self.close_connection and _contended(self.server):
+                # A busy connection makes way too: the client is told, so it does not reuse it
+                self.send_header('Connection', 'close')
+            super().end_headers()
+
+        def next_request_arrives(self):
+            """Wait while the connection is idle; False when it should be closed instead."""
+            if self.buffered_input():
+                return True
+            deadline = time.monotonic() + KEEPALIVE_TIMEOUT
+            while not select.select([self.connection], [], [], _IDLE_POLL)[0]:
+                if time.monotonic() >= deadline or _contended(self.server):
+                    return False
+            return True
+
+        def buffered_input(self):
+            # A pipelined request may already sit in rfile's buffer, where select() cannot see it
+            self.connection.settimeout(0)
+            try:
+                return bool(self.rfile.peek(1))
+            except OSError:
+                return False
+            finally:
+                self.connection.settimeout(self.timeout)
+
+        def log_message(self, format, *args):
+            # No per-request access log: it costs a stderr write per call and fills
+            # the pipe of a parent that never drains it (e.g. scripts/run-tests.py)
+            pass
+
+        def do_GET(self):
+            if registry.metrics is None or self.path.partition('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.metrics.prometheus(registry.cache).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', METRICS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = content_length(self.headers.get('Content-Length', '0'))
+            if length is None:
+                # Where the body ends is unknown, so nothing after it can be read
+                self.close_connection = True
+                self.send_json(400, bad_content_length())
+                return
+            if 'Transfer-Encoding' in self.headers:
+                # Chunked bodies are not read: whatever follows cannot be parsed as the next request
+                self.close_connection = True
+            if stream_batches and length > SPLIT_ABOVE and 'Content-Encoding' not in self.headers:
+                self.post_streamed(length)
+                return
+            if max_body and length > max_body:
+                # Refused unread: the rest of the body makes the connection unusable
+                self.close_connection = True
+                self.send_json(413, body_too_large(max_body))
+                return
+            body = self.rfile.read(length)
+            if 'Content-Encoding' in self.headers:
+                status, body = decode_body(body, self.headers['Content-Encoding'], max_body)
+                if status != 200:
+                    self.send_json(status, body)
+                    return
+            # Decoded straight from the bytes read (see `jsonrpc.codec`)
+            self.reply(registry.handle_json(body))
+
+        def post_streamed(self, length):
+            """A large body handled while it is read: a batch member by member, with
+            `max_body` capping each member (see `jsonrpc.batchstream`)."""
+            remaining = length
+
+            def read(n):
+                nonlocal remaining
+                data = self.rfile.read(min(n, remaining))
+                remaining -= len(data)
+                return data
+
+            head = read(READ_SIZE)
+            if not is_batch(head):
+                if max_body and length > max_body:
+                    self.close_connection = True
+                    self.send_json(413, body_too_large(max_body))
+                    return
+                self.reply(registry.handle_json(head + read(remaining)))
+                return
+
+            def discard_rest():
+                # Members after an error are not run, but the client only reads the
+                # reply once it has sent them
+                while read(READ_SIZE):
+                    pass
+
+            resp = handle_streamed(registry, read, head, max_body)
+            if is_streamed(resp):
+                self.reply(resp, discard_rest)
+                return
+            discard_rest()
+            self.reply(resp)
+
+        def reply(self, resp, finish=None):
+            """Send a response; with `finish`, a streamed one is spooled and `finish()` runs before it is sent."""
+            if resp is None:
+                # Notification -- empty response
+                self.send_response(204)
+                self.end_headers()
+                return
+            coding = negotiate(self.headers.get('Accept-Encoding')) if compression else None
+            if is_streamed(resp):
+                chunks = encode_chunks(resp)
+                if finish is not None:
+                    chunks = _spooled(chunks, finish)
+                self.send_chunked(compression.stream(chunks, coding) if coding else chunks, coding)
+                return
+            resp_bytes = registry.encode(resp)
+            if coding and len(resp_bytes) >= compression.threshold:
+                if len(resp_bytes) > STREAM_ABOVE:
+                    self.send_chunked(compression.stream(slices(resp_bytes), coding), coding, keep_alive=True)
+                    return
+                self.send_json(200, compression.compress(resp_bytes, coding), coding)
+                return
+            self.send_json(200, resp_bytes)
+
+        def send_json(self, status, body, coding=None):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_codings(coding)
+            self.send_header('Content-Length', str(len(body)))
+            if self.close_connection:
+                self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_codings(self, coding):
+            if coding:
+                self.send_header('Content-Encoding', coding)
+            if compression:
+                self.send_header('Vary', 'Accept-Encoding')
+
+        def send_chunked(self, chunks, coding=None, keep_alive=False):
+            http11 = self.request_version == 'HTTP/1.1'
+            if not (keep_alive and http11):
+                # Streamed results close the connection afterwards, so a long stream
+                # does not also hold it for keep-alive
+                self.close_connection = True
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_codings(coding)
+            if not http11:
+                # HTTP/1.0 clients know no chunking: the body simply ends when the connection closes
+                self.end_headers()
+                for chunk in chunks:
+                    self.wfile.write(chunk)
+                return
+            self.send_header('Transfer-Encoding', 'chunked')
+            if self.close_connection:
+                self.send_header('Connection', 'close')
+            self.end_headers()
+            for chunk in chunks:
+                # An empty chunk would end the body early
+                if chunk:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+
+    return Handler
+
+
+class BoundedThreadingHTTPServer(ThreadingHTTPServer):
+    """Thread-per-connection server capped at `max_threads` concurrent connections.
+
+    Threads are non-daemon so `server_close()` waits for in-flight requests.
+    """
+    daemon_threads = False
+    block_on_close = True
+    # An accepted connection is waiting for a slot (idle keep-alive connections then close)
+    waiting = False
+
+    def __init__(self, server_address, handler_class, max_threads):
+        self._slots = threading.BoundedSemaphore(max_threads)
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        # Blocks the accept loop once every slot is busy; the kernel backlog queues the rest
+        if not self._slots.acquire(blocking=False):
+            self.waiting = True
+            self._slots.acquire()
+            self.waiting = False
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._slots.release()
+
+
+class ReusePortHTTPServer(HTTPServer):
+    """HTTPServer that binds with SO_REUSEPORT so several processes can share one port."""
+
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def _contended(server):
+    """True when an idle keep-alive connection should make way for another connection."""
+    if getattr(server, 'stopping', False) or getattr(server, 'waiting', False):
+        return True
+    if isinstance(server, ThreadingHTTPServer):
+        # Its accept loop takes new connections while a slot is free
+        return False
+    # Single-threaded: nothing else is accepted until this connection closes
+    return bool(select.select([server.socket], [], [], 0)[0])
+
+
+def _serve_until_signalled(server):
+    def stop(signum, frame):
+        # Idle keep-alive connections close instead of waiting out their timeout
+        server.stopping = True
+        # shutdown() waits for serve_forever() to return, so it cannot run on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        # Joins in-flight request threads for the threading server
+        server.server_close()
+
+
+def _serve_prefork(handler, host, port, workers):
+    # Bind once in the parent first so configuration errors (port in use, bad host)
+    # surface before any worker is forked.
+    probe = ReusePortHTTPServer((host, port), handler, bind_and_activate=False)
+    probe.server_bind()
+
+    # pid -> time it was forked
+    children = {}
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                probe.server_close()
+                _serve_until_signalled(ReusePortHTTPServer((host, port), handler))
+            except SystemExit as exc:
+                # As the interpreter would: None is 0, other non-int codes are printed and give 1
+                if exc.code is None or isinstance(exc.code, int):
+                    code = exc.code or 0
+                else:
+                    print(exc.code, file=sys.stderr)
+                    code = 1
+            except KeyboardInterrupt:
+                code = 128 + signal.SIGINT
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                # os._exit() skips the flush at interpreter exit
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    for _ in range(workers):
+        spawn()
+    probe.server_close()
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    quick_exits = 0
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        forked = children.pop(pid, None)
+        if stopping or forked is None:
+            continue
+        # Replace a crashed worker so capacity stays at `workers`, backing off while
+        # workers keep dying right after start-up
+        if time.monotonic() - forked < QUICK_EXIT:
+            quick_exits += 1
+            if quick_exits >= MAX_QUICK_EXITS:
+                stop(None, None)
+                for pid in list(children):
+                    os.waitpid(pid, 0)
+                raise SystemExit(f'{quick_exits} workers in a row exited within {QUICK_EXIT:g} s of starting '
+                                 f'(last exit status {os.waitstatus_to_exitcode(status)}); giving up')
+            time.sleep(min(RESPAWN_DELAY * 2 ** (quick_exits - 1), RESPAWN_DELAY_MAX))
+            if stopping:
+                continue
+        else:
+            quick_exits = 0
+        spawn()
+
+
+def serve_http(registry, host, port, workers=0, mode='thread', max_body=DEFAULT_MAX_BODY, compression=None,
+               stream_batches=False):
+    handler = make_handler(registry, max_body, compression, stream_batches)
+    port = int(port)
+    if workers and mode == 'process':
+        print(f'Listening on {host}:{port} ({workers} processes)', file=sys.stderr)
+        _serve_prefork(handler, host, port, workers)
+        return
+    if workers:
+        server = BoundedThreadingHTTPServer((host, port), handler, workers)
+        print(f'Listening on {host}:{port} ({workers} threads)', file=sys.stderr)
+    else:
+        server = HTTPServer((host, port), handler)
+        print(f'Listening on {host}:{port}', file=sys.stderr)
+    _serve_until_signalled(server)
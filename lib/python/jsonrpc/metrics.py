@@ -0,0 +1,173 @@
+"""
+Runtime metrics for a `Registry` (`--metrics`, or `attach_metrics(rpc)`).
+
+- Per method: calls, in-flight calls, and errors by JSON-RPC code (errors
+  raised before a method is known, such as -32700 and -32600, use method "")
+- Latency histograms with power-of-two buckets from 1 µs to about 17 s, one per
+  phase: `parse` (request body -> objects), `dispatch` (per method: validation
+  and handler), and `serialise` (response -> bytes)
+- Read with `GET /metrics` (Prometheus text format) on the HTTP transports, or
+  with the reserved `rpc.stats` method, which also reports the result cache and
+  admission control
+
+Each pre-forked worker process (`--worker-mode process`) keeps its own numbers,
+and so does each process-pool batch worker (`--batch-pool process`). Their
+dispatch timings are not seen by the process that serves `/metrics`.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds in seconds: 1 µs, 2 µs, 4 µs, ... 16.8 s
+BUCKETS = tuple(2 ** i / 1e6 for i in range(25))
+PHASES = ('parse', 'dispatch', 'serialise')
+STATS_METHOD = 'rpc.stats'
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum')
+
+    def __init__(self):
+        # One slot per bucket plus the +Inf overflow
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+
+    def snapshot(self):
+        cumulative = []
+        total = 0
+        for n in self.counts:
+            total += n
+            cumulative.append(total)
+        return {'count': total, 'sum': self.sum, 'cumulative': cumulative}
+
+
+class Metrics:
+    """Thread-safe counters and histograms; the `Registry` feeds it, transports read it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.calls = {}
+        self.in_flight = {}
+        # (method, code) -> count
+        self.errors = {}
+        # (phase, method) -> Histogram; parse and serialise use method ""
+        self.histograms = {}
+
+    def begin(self, method):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.in_flight[method] = self.in_flight.get(method, 0) + 1
+
+    def end(self, method, seconds, code=None):
+        """Close a call opened with `begin`; `code` is its error code, if it failed."""
+        with self._lock:
+            self.in_flight[method] -= 1
+            self._observe('dispatch', method, seconds)
+            if code is not None:
+                self.errors[method, code] = self.errors.get((method, code), 0) + 1
+
+    def error(self, code, method=''):
+        with self._lock:
+            self.errors[method, code] = self.errors.get((method, code), 0) + 1
+
+    def observe(self, phase, seconds, method=''):
+        with self._lock:
+            self._observe(phase, method, seconds)
+
+    def _observe(self, phase, method, seconds):
+        hist = self.histograms.get((phase, method))
+        if hist is None:
+            hist = self.histograms[phase, method] = Histogram()
+        hist.observe(seconds)
+
+    def snapshot(self):
+        """Plain-data copy of every counter (the `rpc.stats` result)."""
+        with self._lock:
+            methods = {}
+            for method in sorted(set(self.calls) | {m for m, _ in self.errors}):
+                methods[method] = {
+                    'calls': self.calls.get(method, 0),
+                    'in_flight': self.in_flight.get(method, 0),
+                    'errors': {str(code): n for (m, code), n in sorted(self.errors.items()) if m == method},
+                }
+            phases = {}
+            for (phase, method), hist in sorted(self.histograms.items()):
+                snap = hist.snapshot()
+                phases.setdefault(phase, {})[method] = {
+                    'count': snap['count'],
+                    'sum_seconds': snap['sum'],
+                    # bucket upper bound (µs) -> calls that took at most that long
+                    'buckets_us': {str(2 ** i): n for i, n in enumerate(snap['cumulative'][:-1])},
+                }
+        return {'uptime_seconds': time.time() - self.started_at, 'methods': methods, 'phases': phases}
+
+    def prometheus(self, cache=None):
+        """The Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            calls = sorted(self.calls.items())
+            in_flight = sorted(self.in_flight.items())
+            errors = sorted(self.errors.items())
+            hists = [(key, hist.snapshot()) for key, hist in sorted(self.histograms.items())]
+        out = [
+            '# HELP jsonrpc_requests_total Calls dispatched to a method.',
+            '# TYPE jsonrpc_requests_total counter',
+        ]
+        out += [f'jsonrpc_requests_total{{method="{_label(m)}"}} {n}' for m, n in calls]
+        out += [
+            '# HELP jsonrpc_in_flight Calls currently running.',
+            '# TYPE jsonrpc_in_flight gauge',
+        ]
+        out += [f'jsonrpc_in_flight{{method="{_label(m)}"}} {n}' for m, n in in_flight]
+        out += [
+            '# HELP jsonrpc_errors_total Error responses by JSON-RPC error code.',
+            '# TYPE jsonrpc_errors_total counter',
+        ]
+        out += [f'jsonrpc_errors_total{{method="{_label(m)}",code="{code}"}} {n}' for (m, code), n in errors]
+        out += [
+            '# HELP jsonrpc_phase_seconds Time spent parsing requests, dispatching calls and serialising responses.',
+            '# TYPE jsonrpc_phase_seconds histogram',
+        ]
+        for (phase, method), snap in hists:
+            labels = f'phase="{phase}",method="{_label(method)}"'
+            for bound, n in zip(BUCKETS, snap['cumulative']):
+                out.append(f'jsonrpc_phase_seconds_bucket{{{labels},le="{bound:g}"}} {n}')
+            out.append(f'jsonrpc_phase_seconds_bucket{{{labels},le="+Inf"}} {snap["count"]}')
+            out.append(f'jsonrpc_phase_seconds_sum{{{labels}}} {snap["sum"]!r}')
+            out.append(f'jsonrpc_phase_seconds_count{{{labels}}} {snap["count"]}')
+        if cache is not None:
+            stats = cache.stats()
+            out += [
+                '# TYPE jsonrpc_cache_entries gauge',
+                f'jsonrpc_cache_entries {stats["entries"]}',
+                '# TYPE jsonrpc_cache_bytes gauge',
+                f'jsonrpc_cache_bytes {stats["bytes"]}',
+            ]
+            for name in ('hits', 'misses', 'evictions', 'expirations'):
+                out += [f'# TYPE jsonrpc_cache_{name}_total counter', f'jsonrpc_cache_{name}_total {stats[name]}']
+        return '\n'.join(out) + '\n'
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def attach_metrics(registry):
+    """Attach a `Metrics` to `registry` and register the `rpc.stats` method."""
+    metrics = Metrics()
+    registry.set_metrics(metrics)
+
+    def stats(params):
+        result = metrics.snapshot()
+        if registry.cache is not None:
+            result['cache'] = registry.cache.stats()
+        if registry._limiters:
+            result['admission'] = {name: limiter.stats() for name, limiter in sorted(registry._limiters.items())}
+        return result
+
+    registry.register(STATS_METHOD, stats)
+    return metrics
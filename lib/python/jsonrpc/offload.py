@@ -0,0 +1,329 @@
+"""
+Process-pool offload for CPU-bound methods (`--offload-workers N`, or `attach_offload_pool(rpc, N)`).
+
+    @rpc.method('matmul', params=matrices, offload='process', cost=multiply_adds, offload_cost=32 ** 3)
+
+Pure-Python handlers hold the GIL, so threads do not run two of them at once.
+Once a pool is attached, a method registered with `offload='process'` runs in
+one of its worker processes. The calling thread (a request thread, or an
+executor thread of the asyncio server) only waits on the worker's pipe, so
+cheap methods keep running in the server process meanwhile. Without a pool,
+`offload='process'` behaves like `offload=True`.
+
+- Workers are forked when the pool starts, before the server runs. They inherit
+  the registry and whatever the solution built at import time (the prime table
+  of 005, for instance), so the first call finds them warm
+- Params validation, the result cache and admission control stay in the server
+  process; only the handler arguments and the result cross the boundary
+- Methods registered with `cost=...` and `offload_cost=...` send only calls
+  costing at least `offload_cost` to a worker; cheaper ones run in the calling
+  thread instead of waiting behind heavy calls for a free worker
+- Numeric buffers of at least `SHARE_ABOVE` bytes (an `array.array`, or a
+  matrix given as equal-length `array.array` rows) are copied into one
+  `multiprocessing.shared_memory` block per call instead of being pickled
+  through the pipe. Lists of Python numbers are pickled: turning them into a
+  buffer and back costs as much as pickling them
+- A call running longer than `timeout` seconds is answered with `CALL_TIMEOUT`
+  ("Call timed out"); its worker is killed and a new one forked. A worker that
+  dies answers -32603 and is replaced the same way
+- A pool inherited by a forked process (`--worker-mode process`) starts its own
+  workers there on first use
+- A worker releases the sockets it inherited (listeners, client connections,
+  the pipes of the other workers) as it starts, so connections the server
+  closes are closed, whenever the worker was forked
+
+Results must be picklable; a `StreamedArray` built from a generator is not.
+"""
+import multiprocessing
+import os
+import queue
+import signal
+import stat
+import threading
+from array import array
+from functools import partial
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from .core import RpcError
+
+# Spec: -32000 to -32099 are reserved for implementation-defined server errors
+CALL_TIMEOUT = -32003
+DEFAULT_TIMEOUT = 30.0
+# Smaller buffers are pickled: setting up a shared block costs more than copying them
+SHARE_ABOVE = 64 * 1024
+
+_OK, _RPC_ERROR, _FAILED = range(3)
+
+
+class _Shared:
+    """Stands in for an argument stored in the call's shared block."""
+    __slots__ = ('offset', 'typecode', 'count', 'cols', 'kind')
+
+    def __init__(self, offset, typecode, count, cols, kind):
+        self.offset = offset
+        self.typecode = typecode
+        self.count = count
+        self.cols = cols
+        self.kind = kind
+
+
+def _flatten(value):
+    """(kind, flat array, cols) for an argument worth sharing, else None."""
+    if type(value) is array:
+        return ('array', value, None) if value.itemsize * len(value) >= SHARE_ABOVE else None
+    if type(value) is not list or not value or type(value[0]) is not array:
+        return None
+    first = value[0]
+    typecode = first.typecode
+    cols = len(first)
+    if not cols or first.itemsize * cols * len(value) < SHARE_ABOVE:
+        return None
+    flat = array(typecode)
+    for row in value:
+        if type(row) is not array or row.typecode != typecode or len(row) != cols:
+            return None
+        flat += row
+    return 'rows', flat, cols
+
+
+def pack(args):
+    """Move the large numeric members of `args` into a shared block.
+
+    Returns (args with `_Shared` placeholders, SharedMemory or None). The caller
+    closes and unlinks the block once the worker has answered.
+    """
+    flats = []
+    size = 0
+
+    def walk(value):
+        nonlocal size
+        if type(value) is tuple:
+            return tuple(walk(item) for item in value)
+        found = _flatten(value)
+        if found is None:
+            return value
+        kind, flat, cols = found
+        flats.append(flat)
+        size += flat.itemsize * len(flat)
+        return _Shared(size - flat.itemsize * len(flat), flat.typecode, len(flat), cols, kind)
+
+    packed = walk(args)
+    if not flats:
+        return args, None
+    shm = SharedMemory(create=True, size=size)
+    offset = 0
+    for flat in flats:
+        end = offset + flat.itemsize * len(flat)
+        shm.buf[offset:end] = memoryview(flat).cast('B')
+        offset = end
+    return packed, shm
+
+
+def unpack(args, name):
+    """Rebuild the arguments `pack` placed in the shared block `name` (in the worker)."""
+    shm = SharedMemory(name)
+    try:
+        return _restore(args, shm.buf)
+    finally:
+        shm.close()
+
+
+def _restore(value, buf):
+    if type(value) is tuple:
+        return tuple(_restore(item, buf) for item in value)
+    if type(value) is not _Shared:
+        return value
+    flat = array(value.typecode)
+    with buf[value.offset:value.offset + flat.itemsize * value.count] as view:
+        flat.frombytes(view)
+    if value.kind == 'array':
+        return flat
+    cols = value.cols
+    return [flat[i:i + cols] for i in range(0, len(flat), cols)]
+
+
+def _open_fds():
+    try:
+        return [int(name) for name in os.listdir('/dev/fd')]
+    except OSError:
+        return range(os.sysconf('SC_OPEN_MAX'))
+
+
+def _release_inherited_sockets(keep):
+    # The fork copied every socket of the server process: the listening socket,
+    # client connections, and the server's end of each worker pipe (this one's
+    # included). Held here, they would keep connections open after the server
+    # closes them, and keep workers from seeing EOF when the server exits. Each
+    # one is found by its descriptor, whatever holds it, and /dev/null is put in
+    # its place: the socket is released, and an inherited object that later
+    # closes that number closes /dev/null rather than a descriptor opened since.
+    devnull = os.open(os.devnull, os.O_RDWR)
+    try:
+        for fd in _open_fds():
+            if fd == keep or fd == devnull:
+                continue
+            try:
+                if stat.S_ISSOCK(os.fstat(fd).st_mode):
+                    os.dup2(devnull, fd)
+            except OSError:
+                # Not open (any more), such as the descriptor that listed /dev/fd
+                pass
+    finally:
+        os.close(devnull)
+
+
+def _worker_main(conn, handlers):
+    # The server process stops its workers: Ctrl-C and the server's signal handlers do not apply here
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _release_inherited_sockets(conn.fileno())
+    conn.send(_OK)
+    while True:
+        try:
+            method, args, shm_name = conn.recv()
+        except EOFError:
+            return
+        try:
+            if shm_name is not None:
+                args = unpack(args, shm_name)
+            reply = (_OK, handlers[method](*args))
+        except RpcError as e:
+            reply = (_RPC_ERROR, (e.code, e.message, e.data))
+        except Exception as e:
+            reply = (_FAILED, repr(e))
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # An unpicklable result
+            conn.send((_FAILED, repr(e)))
+
+
+class _Worker:
+    __slots__ = ('process', 'conn')
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+
+
+class ProcessPool:
+    """`workers` forked processes running `handlers` (name -> function), one call at a time each."""
+
+    def __init__(self, handlers, workers=None, timeout=DEFAULT_TIMEOUT):
+        self.handlers = dict(handlers)
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout or None
+        self.replaced = 0
+        self._context = multiprocessing.get_context('fork')
+        self._idle = queue.SimpleQueue()
+        self._workers = set()
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Fork the workers of this process (at most once per process) and wait until each is ready."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Workers inherited from another process belong to it; dropping our copies
+            # of their pipes lets them see EOF when that process exits
+            for worker in self._workers:
+                worker.conn.close()
+            self._workers = set()
+            self._idle = queue.SimpleQueue()
+            # Workers share this process's tracker, which then sees every shared block released
+            resource_tracker.ensure_running()
+            for _ in range(self.workers):
+                self._idle.put(self._spawn())
+            self._pid = os.getpid()
+
+    def _spawn(self):
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child_conn, self.handlers),
+                                        name='jsonrpc-offload', daemon=True)
+        process.start()
+        child_conn.close()
+        conn.recv()
+        worker = _Worker(process, conn)
+        self._workers.add(worker)
+        return worker
+
+    def _replace(self, worker):
+        worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+        with self._lock:
+            self._workers.discard(worker)
+            self.replaced += 1
+            self._idle.put(self._spawn())
+
+    def bind(self, method, func, cost=None, offload_cost=None):
+        """The handler the registry calls for `method`: `func` itself for calls whose
+        `cost` is below `offload_cost`, a worker for the others."""
+        if cost is None or offload_cost is None:
+            return partial(self.call, method)
+
+        def call_or_run(*args):
+            if cost(*args) < offload_cost:
+                return func(*args)
+            return self.call(method, *args)
+        return call_or_run
+
+    def call(self, method, *args):
+        """Run handler `method` on an idle worker and return its result (raises its RpcError)."""
+        if self._pid != os.getpid():
+            self.start()
+        args, shm = pack(args)
+        try:
+            worker = self._idle.get()
+            try:
+                worker.conn.send((method, args, None if shm is None else shm.name))
+                if not worker.conn.poll(self.timeout):
+                    self._replace(worker)
+                    worker = None
+                    raise RpcError(CALL_TIMEOUT, 'Call timed out', {'timeout_ms': round(self.timeout * 1000)})
+                status, value = worker.conn.recv()
+            except (EOFError, OSError):
+                self._replace(worker)
+                worker = None
+                raise RuntimeError(f'offload worker running {method!r} died')
+            finally:
+                if worker is not None:
+                    self._idle.put(worker)
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        if status == _OK:
+            return value
+        if status == _RPC_ERROR:
+            raise RpcError(*value)
+        raise RuntimeError(value)
+
+    def close(self):
+        """Stop the idle workers of this process."""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            worker.conn.close()
+            with self._lock:
+                self._workers.discard(worker)
+            worker.process.join(1)
+            if worker.process.is_alive():
+                worker.process.kill()
+
+
+def attach_offload_pool(registry, workers=None, timeout=DEFAULT_TIMEOUT, start=True):
+    """Run `registry`'s offload='process' methods on a `ProcessPool` of `workers` (default: CPU count).
+
+    Attach it after every method is registered. With `start=False` the workers
+    are forked on the first call instead (in the process that makes it).
+    """
+    pool = ProcessPool({name: func for name, (func, _) in registry._process.items()}, workers, timeout)
+    if start:
+        pool.start()
+    registry.set_process_pool(pool)
+    return pool
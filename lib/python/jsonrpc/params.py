@@ -0,0 +1,67 @@
+"""
+Params validators for `Registry.method(params=...)`.
+
+Each factory below does its set-up work once and returns a small closure that
+the dispatcher calls per request. A validator receives the raw `params` member
+(`MISSING` when absent) and returns a tuple of positional handler arguments, or
+raises `InvalidParams`.
+"""
+from .core import MISSING, InvalidParams
+
+
+def array_of(convert=None, key=None, default=MISSING, shape=None, invalid=None, empty=None):
+    """Validate a list of values (or `{key: [...]}` when `key` is given).
+
+    - `convert` is applied to every item; any exception becomes `InvalidParams(invalid)`
+    - `shape` is the detail used when params is not a list (None -> plain "Invalid params")
+    - `empty`, when set, rejects an empty list with that detail
+    The handler receives the converted list as its single argument.
+    """
+    def validate(params):
+        if params is MISSING:
+            params = default
+        if isinstance(params, list):
+            values = params
+        elif key is not None and isinstance(params, dict) and isinstance(params.get(key), list):
+            values = params[key]
+        else:
+            raise InvalidParams(shape)
+        if empty is not None and not values:
+            raise InvalidParams(empty)
+        if convert is None:
+            return (values,)
+        try:
+            return ([convert(x) for x in values],)
+        except Exception:
+            raise InvalidParams(invalid)
+    return validate
+
+
+def by_position_or_name(names, convert=None, default=MISSING, missing=None, invalid=None):
+    """Accept `[v1, v2, ...]` or `{name1: v1, ...}` and pass the values positionally.
+
+    - A list shorter than `names` raises `InvalidParams(missing)`
+    - Anything other than a list/object raises plain `InvalidParams()`
+    - `convert` is applied to every value; any exception becomes `InvalidParams(invalid)`
+    """
+    names = tuple(names)
+    arity = len(names)
+
+    def validate(params):
+        if params is MISSING:
+            params = default
+        if isinstance(params, list):
+            if len(params) < arity:
+                raise InvalidParams(missing)
+            values = params[:arity]
+        elif isinstance(params, dict):
+            values = [params.get(n) for n in names]
+        else:
+            raise InvalidParams()
+        if convert is None:
+            return tuple(values)
+        try:
+            return tuple(convert(v) for v in values)
+        except Exception:
+            raise InvalidParams(invalid)
+    return validate
@@ -0,0 +1,48 @@
+"""
+Executors for running batch members concurrently.
+
+    attach_pool(rpc, 'thread', 8)    # threads: good for handlers that release the GIL / wait on I/O
+    attach_pool(rpc, 'process', 8)   # processes: CPU-bound pure-Python handlers
+
+Process workers are forked so they inherit the registry (handlers and the
+params validator closures are not picklable); only the member request and its
+response cross the process boundary.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+POOL_KINDS = ('thread', 'process')
+
+# Registry inherited by forked process-pool workers
+_worker_registry = None
+
+
+def _init_worker(registry):
+    global _worker_registry
+    _worker_registry = registry
+    # Already in a worker process: offload='process' methods run right here
+    registry.set_process_pool(None)
+
+
+def _handle_in_worker(req):
+    return _worker_registry.handle_one(req)
+
+
+def attach_pool(registry, kind='thread', workers=None):
+    """Create an executor of `kind` with `workers` workers (default: CPU count) and attach it to `registry`."""
+    workers = workers or os.cpu_count() or 1
+    if kind == 'thread':
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jsonrpc-batch')
+        registry.set_executor(executor, workers=workers)
+    elif kind == 'process':
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker,
+            initargs=(registry,),
+        )
+        registry.set_executor(executor, _handle_in_worker, workers=workers)
+    else:
+        raise ValueError(f'unknown pool kind: {kind!r} (expected one of {", ".join(POOL_KINDS)})')
+    return executor
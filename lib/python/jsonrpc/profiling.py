@@ -0,0 +1,322 @@
+"""
+On-demand profiling of a live server (`--profiling`), and a slow-request log (`--slow-log MS`).
+
+A capture profiles the calls dispatched while it runs. It ends after `seconds`,
+or after `requests` calls, whichever comes first, and then writes one file to
+`tmp/` (or `--profile-dir`):
+- `cprofile`: deterministic profile of each call, merged across threads, as
+  `profile-<time>-<pid>.pstats` (read with `python -m pstats` or snakeviz)
+- `sample`: the stacks of the threads running a call, every `interval` seconds,
+  as `profile-<time>-<pid>.folded` (collapsed stacks for flamegraph.pl / speedscope)
+
+Start a capture in one of two ways:
+- `kill -USR1 <pid>` runs the default capture: `sample` for 10 s.
+- The reserved `rpc.profile` method, registered only when an admin token is
+  configured (`--admin-token` or `JSONRPC_ADMIN_TOKEN`):
+
+    {"jsonrpc": "2.0", "method": "rpc.profile", "id": 1,
+     "params": {"token": "...", "mode": "cprofile", "seconds": 5, "requests": 1000}}
+
+  The result is `{"mode": ..., "path": ...}`; the file appears once the capture ends.
+
+The slow log appends one JSON line per response that took at least the
+threshold from the start of parsing to the end of serialisation. Each line
+holds the body size, the parse and serialise times, and every call's method,
+params size and dispatch time. Notifications, streamed results and members
+of a process-pool batch are not covered.
+"""
+import contextvars
+import cProfile
+import json
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from time import perf_counter
+
+from .core import InvalidParams, RpcError
+
+MODES = ('sample', 'cprofile')
+DEFAULT_SECONDS = 10
+DEFAULT_INTERVAL = 0.005
+PROFILE_METHOD = 'rpc.profile'
+# Spec: -32000 to -32099 are reserved for implementation-defined server errors
+UNAUTHORIZED = -32001
+PROFILE_BUSY = -32002
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'tmp')
+
+
+def _output_path(out_dir, suffix):
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    return os.path.abspath(os.path.join(out_dir, f'profile-{stamp}-{os.getpid()}{suffix}'))
+
+
+class _Capture:
+    """One running capture; `run` wraps every dispatched call until it is closed."""
+
+    def __init__(self, profiler, path, seconds, requests):
+        self.profiler = profiler
+        self.path = path
+        self.remaining = requests
+        self.deadline = None if seconds is None else perf_counter() + seconds
+        self.lock = threading.Lock()
+        self.open = True
+        self.in_flight = 0
+
+    def admit(self):
+        """Count one call in; False once the capture is over."""
+        with self.lock:
+            if not self.open:
+                return False
+            if self.deadline is not None and perf_counter() >= self.deadline:
+                self.open = False
+                return False
+            if self.remaining is not None:
+                self.remaining -= 1
+                if self.remaining <= 0:
+                    # Last call of the capture: it is written once this one returns
+                    self.open = False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+            last = not self.open and self.in_flight == 0
+        if last:
+            self.profiler._finish(self)
+
+    def close(self):
+        with self.lock:
+            if not self.open:
+                return
+            self.open = False
+            idle = self.in_flight == 0
+        if idle:
+            self.profiler._finish(self)
+
+
+class _CProfileCapture(_Capture):
+    def __init__(self, *args):
+        super().__init__(*args)
+        # cProfile only sees the thread that enabled it: one Profile per serving thread
+        self.local = threading.local()
+        self.profiles = []
+
+    def run(self, func, *args):
+        prof = getattr(self.local, 'profile', None)
+        if prof is None:
+            prof = self.local.profile = cProfile.Profile()
+            with self.lock:
+                self.profiles.append(prof)
+        return prof.runcall(func, *args)
+
+    def write(self):
+        if not self.profiles:
+            # Nothing was dispatched: an empty profile still marks the capture as done
+            cProfile.Profile().dump_stats(self.path)
+            return
+        stats = pstats.Stats(self.profiles[0])
+        for prof in self.profiles[1:]:
+            stats.add(prof)
+        stats.dump_stats(self.path)
+
+
+class _SampleCapture(_Capture):
+    def __init__(self, *args, interval=DEFAULT_INTERVAL):
+        super().__init__(*args)
+        self.interval = interval
+        self.busy = set()
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self._sample, name='jsonrpc-sampler', daemon=True)
+        self.sampler.start()
+
+    def run(self, func, *args):
+        ident = threading.get_ident()
+        self.busy.add(ident)
+        try:
+            return func(*args)
+        finally:
+            self.busy.discard(ident)
+
+    def _sample(self):
+        while not self.stopped.wait(self.interval):
+            if self.deadline is not None and perf_counter() >= self.deadline:
+                self.close()
+            frames = sys._current_frames()
+            for ident in list(self.busy):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_collapse(frame)] += 1
+
+    def write(self):
+        self.stopped.set()
+        if threading.current_thread() is not self.sampler:
+            self.sampler.join()
+        with open(self.path, 'w') as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f'{stack} {n}\n')
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+class Profiler:
+    """Starts captures and hands each dispatched call to the running one."""
+
+    def __init__(self, out_dir=None):
+        self.out_dir = out_dir or DEFAULT_DIR
+        self.capture = None
+        self.last_path = None
+        self._lock = threading.Lock()
+
+    def start(self, mode='sample', seconds=None, requests=None, interval=DEFAULT_INTERVAL):
+        """Begin a capture; returns the path it will be written to. Raises RuntimeError
+        while another capture is running."""
+        if mode not in MODES:
+            raise ValueError(f'mode must be one of {", ".join(MODES)}')
+        if seconds is None and requests is None:
+            seconds = DEFAULT_SECONDS
+        with self._lock:
+            if self.capture is not None:
+                raise RuntimeError('a capture is already running')
+            if mode == 'cprofile':
+                capture = _CProfileCapture(self, _output_path(self.out_dir, '.pstats'), seconds, requests)
+            else:
+                capture = _SampleCapture(self, _output_path(self.out_dir, '.folded'), seconds, requests,
+                                         interval=interval)
+            self.capture = capture
+        if mode == 'cprofile' and seconds is not None:
+            timer = threading.Timer(seconds, capture.close)
+            timer.daemon = True
+            timer.start()
+        return capture.path
+
+    def stop(self):
+        capture = self.capture
+        if capture is not None:
+            capture.close()
+
+    def run(self, func, *args):
+        """Call `func(*args)`, profiled when a capture is running."""
+        capture = self.capture
+        if capture is None or not capture.admit():
+            return func(*args)
+        try:
+            return capture.run(func, *args)
+        finally:
+            capture.release()
+
+    def _finish(self, capture):
+        with self._lock:
+            if self.capture is not capture:
+                return
+            self.capture = None
+        capture.write()
+        self.last_path = capture.path
+        print(f'Profile written to {capture.path}', file=sys.stderr)
+
+
+# Timings of the request being handled in this thread / asyncio task
+_current = contextvars.ContextVar('jsonrpc_slow_log_request', default=None)
+
+
+class SlowLog:
+    """Appends a JSON line for every response slower than `threshold` seconds."""
+
+    def __init__(self, threshold, path=None):
+        self.threshold = threshold
+        self.path = path or os.path.join(DEFAULT_DIR, f'slow-{os.getpid()}.log')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def begin(self, raw, parse_seconds):
+        _current.set({'bytes': len(raw), 'parse': parse_seconds, 'calls': []})
+
+    def call(self, method, params, seconds):
+        record = _current.get()
+        if record is not None:
+            record['calls'].append((method, params, seconds))
+
+    def end(self, serialise_seconds):
+        record = _current.get()
+        if record is None:
+            return
+        _current.set(None)
+        total = record['parse'] + sum(c[2] for c in record['calls']) + serialise_seconds
+        if total < self.threshold:
+            return
+        line = json.dumps({
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'total_ms': round(total * 1e3, 3),
+            'bytes': record['bytes'],
+            'parse_ms': round(record['parse'] * 1e3, 3),
+            'serialise_ms': round(serialise_seconds * 1e3, 3),
+            'calls': [{'method': method, 'params_bytes': _size(params), 'dispatch_ms': round(seconds * 1e3, 3)}
+                      for method, params, seconds in record['calls']],
+        }, separators=(',', ':'))
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+
+def _size(params):
+    try:
+        return len(json.dumps(params, separators=(',', ':'), default=str))
+    except (TypeError, ValueError):
+        return None
+
+
+def attach_profiler(registry, out_dir=None, admin_token=None, signum=signal.SIGUSR1):
+    """Attach a `Profiler` to `registry`; `signum` starts the default capture, and
+    with `admin_token` the `rpc.profile` method is registered."""
+    profiler = Profiler(out_dir)
+    registry.set_profiler(profiler)
+
+    if signum is not None:
+        def start_default():
+            try:
+                profiler.start()
+            except RuntimeError:
+                pass
+
+        def on_signal(signum, frame):
+            # The handler runs on the main thread between two bytecodes, possibly while
+            # that thread holds the profiler's lock (in _finish): start from another thread
+            threading.Thread(target=start_default, name='jsonrpc-profile-signal', daemon=True).start()
+        signal.signal(signum, on_signal)
+
+    if admin_token:
+        def profile(params):
+            params = params if isinstance(params, dict) else {}
+            if params.get('token') != admin_token:
+                raise RpcError(UNAUTHORIZED, 'Unauthorized')
+            mode = params.get('mode', 'sample')
+            seconds = params.get('seconds')
+            requests = params.get('requests')
+            if seconds is not None and (type(seconds) not in (int, float) or seconds <= 0):
+                raise InvalidParams('seconds must be a positive number')
+            if requests is not None and (type(requests) is not int or requests <= 0):
+                raise InvalidParams('requests must be a positive integer')
+            try:
+                path = profiler.start(mode, seconds, requests)
+            except ValueError as e:
+                raise InvalidParams(str(e))
+            except RuntimeError as e:
+                raise RpcError(PROFILE_BUSY, str(e))
+            return {'mode': mode, 'path': path}
+
+        registry.register(PROFILE_METHOD, profile)
+    return profiler
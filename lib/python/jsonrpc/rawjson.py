@@ -0,0 +1,95 @@
+"""
+Request decoding that keeps selected `params` members as raw JSON text.
+
+A method registered with `raw_params=('payload',)` receives that member as a
+`RawJSON` holding its exact source text instead of decoded Python objects. When
+the handler returns it (anywhere in its result), `dumps` splices the text into
+the response unchanged, so a large value that is only passed through is never
+rebuilt as objects nor re-encoded.
+
+Only single request objects take this path; batches, and any body this
+scanner does not accept, are decoded normally (which also produces the usual
+Parse error for invalid JSON).
+"""
+import json
+import re
+from json.decoder import scanstring
+
+_WS = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+# Validates a value and finds where it ends; every object inside is dropped as soon
+# as it is parsed, so only the position survives
+_skipper = json.JSONDecoder(object_pairs_hook=lambda pairs: None)
+
+
+class RawJSON:
+    """A JSON value kept as its source text."""
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def decode(self):
+        return _decoder.decode(self.text)
+
+    def __repr__(self):
+        return f'RawJSON({self.text[:40]!r})'
+
+
+def _parse_object(s, idx, raw_keys, top=False):
+    """Parse the object starting at s[idx] == '{'; returns (dict, end index).
+
+    In the request object (`top`) a `params` object is parsed the same way, and
+    there members named in `raw_keys` become `RawJSON`.
+    """
+    obj = {}
+    idx = _WS.match(s, idx + 1).end()
+    if s[idx:idx + 1] == '}':
+        return obj, idx + 1
+    while True:
+        if s[idx:idx + 1] != '"':
+            raise ValueError('expected a member name')
+        key, idx = scanstring(s, idx + 1)
+        idx = _WS.match(s, idx).end()
+        if s[idx:idx + 1] != ':':
+            raise ValueError("expected ':'")
+        idx = _WS.match(s, idx + 1).end()
+        if top:
+            if key == 'params' and s[idx:idx + 1] == '{':
+                value, idx = _parse_object(s, idx, raw_keys)
+            else:
+                value, idx = _decoder.raw_decode(s, idx)
+        elif key in raw_keys:
+            _, end = _skipper.raw_decode(s, idx)
+            value = RawJSON(s[idx:end])
+            idx = end
+        else:
+            value, idx = _decoder.raw_decode(s, idx)
+        obj[key] = value
+        idx = _WS.match(s, idx).end()
+        c = s[idx:idx + 1]
+        if c == ',':
+            idx = _WS.match(s, idx + 1).end()
+        elif c == '}':
+            return obj, idx + 1
+        else:
+            raise ValueError("expected ',' or '}'")
+
+
+def decode_keeping_raw(raw, raw_keys):
+    """Decode a single request object keeping `params` members in `raw_keys` as `RawJSON`.
+
+    Returns None when the body is not a single object this scanner accepts; the
+    caller then decodes it normally.
+    """
+    try:
+        s = raw if isinstance(raw, str) else str(raw, 'utf-8')
+        idx = _WS.match(s).end()
+        if s[idx:idx + 1] != '{':
+            return None
+        req, idx = _parse_object(s, idx, raw_keys, top=True)
+        if _WS.match(s, idx).end() != len(s):
+            return None
+        return req
+    except ValueError:
+        return None
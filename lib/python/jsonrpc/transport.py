@@ -0,0 +1,166 @@
+"""
+Transports that feed request bodies into a `Registry`.
+- `serve_stdio`: read a single request from stdin, write a single response to stdout
+- `serve_stdio_stream`: loop over newline-delimited or Content-Length framed requests on stdin
+- `serve_http` (`jsonrpc.httpd`) and `serve_async` (`jsonrpc.aio`): the HTTP
+  transports, which share the limits and helpers defined here
+
+`StreamedArray` results are written in pieces as they are produced. So is the
+reply to a large batch with `stream_batches` (`--stream-batches`), whose
+members are dispatched while stdin is still being read.
+
+Only what the stdio transports need is imported here, so a one-shot
+`python server.py < request.json` starts without the HTTP machinery.
+"""
+import re
+import sys
+
+from . import codec
+from .batchstream import SPLIT_ABOVE, handle_streamed, is_batch
+from .compression import decompress
+from .core import INVALID_REQUEST, PARSE_ERROR, encode, encode_chunks, is_streamed, make_error
+
+WORKER_MODES = ('thread', 'process')
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Largest request body the HTTP transports accept (`--max-body`; 0 or None: no cap)
+DEFAULT_MAX_BODY = 32 * 1024 * 1024
+
+
+def body_too_large(max_body):
+    return encode(make_error(None, INVALID_REQUEST, f'Invalid Request: body exceeds {max_body} bytes'))
+
+
+def content_length(value):
+    """The length a Content-Length value (str or bytes) gives, or None unless it is plain digits."""
+    value = value.strip()
+    # int() alone would also take '-1', '+5' or '1_000'
+    return int(value) if value.isascii() and value.isdigit() else None
+
+
+def bad_content_length():
+    return encode(make_error(None, PARSE_ERROR, 'Parse error: invalid Content-Length'))
+
+
+def decode_body(body, content_encoding, max_body):
+    """Undo a request's Content-Encoding: (200, body), or (error status, JSON-RPC error body)."""
+    try:
+        return 200, decompress(body, content_encoding, max_body)
+    except LookupError:
+        return 415, encode(make_error(None, INVALID_REQUEST, f'Invalid Request: unsupported Content-Encoding {content_encoding}'))
+    except OverflowError:
+        return 413, body_too_large(max_body)
+    except ValueError as e:
+        return 400, encode(make_error(None, PARSE_ERROR, f'Parse error: {e}'))
+
+
+def serve_stdio(registry, stdin=None, stdout=None, stream_batches=False):
+    """Answer the one request on stdin; with `stream_batches`, a large batch is
+    handled while it is read (see `jsonrpc.batchstream`)."""
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+    body = stdin.read(SPLIT_ABOVE) if stream_batches else stdin.read()
+    if stream_batches and len(body) == SPLIT_ABOVE and is_batch(body):
+        codec.choose(len(body))
+        resp = handle_streamed(registry, stdin.read, body)
+    else:
+        if stream_batches:
+            body += stdin.read()
+        codec.choose(len(body))
+        resp = registry.handle_json(body)
+    if resp is None:
+        # notification — write nothing
+        return
+    if is_streamed(resp):
+        for chunk in encode_chunks(resp):
+            stdout.write(chunk)
+    else:
+        stdout.write(registry.encode(resp))
+    stdout.write(b'\n')
+    stdout.flush()
+
+
+# "Name: value" header line of an LSP-style frame (JSON lines never start like this)
+_HEADER_LINE = re.compile(rb'^[A-Za-z][A-Za-z0-9-]*:')
+_DISCARD_SIZE = 64 * 1024
+
+
+class _Unframed(ValueError):
+    """A frame without a valid Content-Length: where its body ends is unknown."""
+
+
+def _read_framed_body(stdin, first_line, max_body=None):
+    """Read the rest of a Content-Length framed message whose first header line is `first_line`.
+
+    Raises ValueError for a body above `max_body`, once it has been read and
+    dropped, and `_Unframed` when the length is missing or not plain digits.
+    """
+    length = None
+    line = first_line
+    while line and line.strip():
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = content_length(value)
+            if length is None:
+                raise _Unframed('invalid Content-Length')
+        line = stdin.readline()
+    if length is None:
+        raise _Unframed('missing Content-Length')
+    if max_body and length > max_body:
+        while length > 0:
+            chunk = stdin.read(min(length, _DISCARD_SIZE))
+            if not chunk:
+                break
+            length -= len(chunk)
+        raise ValueError(f'body exceeds {max_body} bytes')
+    return stdin.read(length)
+
+
+def serve_stdio_stream(registry, stdin=None, stdout=None, max_body=DEFAULT_MAX_BODY):
+    """Serve requests from stdin until EOF, one response per request (none for notifications).
+
+    Each message is either one line of JSON, or LSP style
+    `Content-Length: N\r\n\r\n<N bytes>`; the reply uses the same framing.
+    Output is flushed after every message. A frame whose body exceeds `max_body`
+    is skipped and answered with -32700. So is one without a valid
+    Content-Length, but the input after it cannot be followed and serving stops.
+    """
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+    while True:
+        line = stdin.readline()
+        if not line:
+            return
+        framed = _HEADER_LINE.match(line) is not None
+        lost = False
+        if framed:
+            try:
+                body = _read_framed_body(stdin, line, max_body)
+            except ValueError as e:
+                body = None
+                error = str(e)
+                lost = isinstance(e, _Unframed)
+        elif line.strip():
+            body = line
+        else:
+            continue
+        resp = make_error(None, PARSE_ERROR, f'Parse error: {error}') if body is None else registry.handle_json(body)
+        if resp is None:
+            continue
+        if not framed and is_streamed(resp):
+            # Still one line per reply, flushed chunk by chunk as the items are produced
+            for chunk in encode_chunks(resp):
+                stdout.write(chunk)
+                stdout.flush()
+            stdout.write(b'\n')
+            stdout.flush()
+            continue
+        out = registry.encode(resp)
+        if framed:
+            stdout.write(b'Content-Length: %d\r\n\r\n' % len(out) + out)
+        else:
+            # JSON text escapes control characters, so the reply is always a single line
+            stdout.write(out + b'\n')
+        stdout.flush()
+        if lost:
+            # Where the next message starts is unknown
+            return
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The tests import `jsonrpc` from the tree, as the solutions' server.py files do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
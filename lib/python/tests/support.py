@@ -0,0 +1,108 @@
+"""
+Helpers shared by the tests: request bodies, and servers run as subprocesses
+on a free local port (a solution's `server.py`, or one written by the test).
+"""
+import contextlib
+import http.client
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+LIB = os.path.join(ROOT, 'lib', 'python')
+
+
+def solution(exercise):
+    return os.path.join(ROOT, 'solutions', exercise, 'code', 'python', 'server.py')
+
+
+def write_server(directory, code):
+    """Write a `server.py` into `directory` that runs `main(rpc)` after `code` registers its methods on `rpc`."""
+    path = os.path.join(str(directory), 'server.py')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'import sys\nsys.path.insert(0, {LIB!r})\n\n'
+                'from jsonrpc import Registry, main  # noqa: E402\n\n'
+                'rpc = Registry()\n'
+                f'{textwrap.dedent(code)}\n'
+                "if __name__ == '__main__':\n    main(rpc)\n")
+    return path
+
+
+def request(method, params, id_=1):
+    return {'jsonrpc': '2.0', 'method': method, 'params': params, 'id': id_}
+
+
+def call(method, params, id_=1):
+    return json.dumps(request(method, params, id_)).encode()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_http(path, *flags, port=None):
+    """Start `path --http *flags` on `port` (or a free one) once it accepts connections; the port is `proc.port`."""
+    port = free_port() if port is None else port
+    env = dict(os.environ, TEST_HOST='127.0.0.1', TEST_PORT=str(port))
+    proc = subprocess.Popen([sys.executable, path, '--http', *flags], env=env, stderr=subprocess.DEVNULL)
+    proc.port = port
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.5).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                proc.kill()
+                raise AssertionError(f'{path} did not start')
+            time.sleep(0.05)
+
+
+@contextlib.contextmanager
+def http_server(path, *flags, port=None):
+    """Run `path` with `--http` and `flags` for the duration of the block; yields its port."""
+    proc = start_http(path, *flags, port=port)
+    try:
+        yield proc.port
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def post(port, body, headers=None):
+    """POST `body`; returns (status, response headers, raw body as sent)."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        conn.request('POST', '/', body, headers or {})
+        resp = conn.getresponse()
+        return resp.status, {k.lower(): v for k, v in resp.getheaders()}, resp.read()
+    finally:
+        conn.close()
+
+
+def raw_http(port, data):
+    """Send `data` and return everything the server writes until it closes the connection."""
+    with socket.create_connection(('127.0.0.1', port), 10) as s:
+        s.sendall(data)
+        chunks = []
+        while True:
+            chunk = s.recv(65536)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+
+
+def load_solution(exercise):
+    """Import `exercise`'s server.py as a module (its `main` does not run)."""
+    name = 'solution_' + exercise.replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, solution(exercise))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,122 @@
+"""Admission control (`jsonrpc.admission`): cost limits, bounded waits and rejections."""
+import threading
+import time
+
+import pytest
+
+from jsonrpc import Registry
+from jsonrpc.admission import SERVER_BUSY, attach_admission, parse_limit
+
+from support import request
+
+
+def gated_registry():
+    """`work` (cost `units`, limit 10) blocks until `registry.gate` is set; `ping` has no limit."""
+    rpc = Registry()
+    rpc.gate = threading.Event()
+
+    def units(params):
+        return params['units'],
+
+    @rpc.method('work', params=units, cost=lambda n: n, limit=10)
+    def work(n):
+        rpc.gate.wait(10)
+        return n
+
+    @rpc.method('ping')
+    def ping(params):
+        return 'pong'
+    return rpc
+
+
+class Call(threading.Thread):
+    """`registry.handle(req)` on a thread of its own, started at once; the reply lands in `reply`."""
+
+    def __init__(self, registry, req):
+        super().__init__(daemon=True)
+        self.registry = registry
+        self.req = req
+        self.reply = None
+        self.start()
+
+    def run(self):
+        self.reply = self.registry.handle(self.req)
+
+
+def wait_for(limiter, running=None, waiting=None):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        stats = limiter.stats()
+        if (running is None or stats['running'] == running) and (waiting is None or stats['waiting'] == waiting):
+            return
+        time.sleep(0.005)
+    raise AssertionError(f'limiter never reached running={running} waiting={waiting}: {limiter.stats()}')
+
+
+def test_rejects_when_full():
+    rpc = gated_registry()
+    limiter = attach_admission(rpc, max_wait=0.05, max_queue=1)['work']
+    held = [Call(rpc, request('work', {'units': 5}, i)) for i in (1, 2)]
+    wait_for(limiter, running=2)
+    # Full: this call waits max_wait, then is rejected
+    started = time.monotonic()
+    busy = rpc.handle(request('work', {'units': 2}, 3))
+    assert time.monotonic() - started >= 0.05, busy
+    assert busy['error']['code'] == SERVER_BUSY and busy['error']['message'] == 'Server busy', busy
+    assert busy['error']['data']['method'] == 'work' and busy['error']['data']['retry_after_ms'] >= 1, busy
+    # Methods without a limit are never held back
+    assert rpc.handle(request('ping', None, 4))['result'] == 'pong'
+    # With the queue full, a call is rejected at once
+    queued = Call(rpc, request('work', {'units': 2}, 5))
+    wait_for(limiter, waiting=1)
+    started = time.monotonic()
+    assert rpc.handle(request('work', {'units': 2}, 6))['error']['code'] == SERVER_BUSY
+    assert time.monotonic() - started < 0.05
+    rpc.gate.set()
+    for t in held + [queued]:
+        t.join(5)
+    assert [t.reply.get('result') for t in held] == [5, 5]
+    assert limiter.stats() == {'capacity': 10, 'in_use': 0, 'running': 0, 'waiting': 0, 'rejected': 2}, limiter.stats()
+
+
+def test_waiting_call_runs():
+    rpc = gated_registry()
+    limiter = attach_admission(rpc, max_wait=5)['work']
+    held = Call(rpc, request('work', {'units': 10}, 1))
+    wait_for(limiter, running=1)
+    waiting = Call(rpc, request('work', {'units': 5}, 2))
+    wait_for(limiter, waiting=1)
+    rpc.gate.set()
+    held.join(5)
+    waiting.join(5)
+    assert waiting.reply['result'] == 5, waiting.reply
+
+
+def test_small_and_large_calls():
+    rpc = gated_registry()
+    limiter = attach_admission(rpc, max_wait=0.05)['work']
+    held = Call(rpc, request('work', {'units': 10}, 1))
+    wait_for(limiter, running=1)
+    # A call costing at most SMALL_SHARE of the limit may exceed it by that share
+    small = Call(rpc, request('work', {'units': 1}, 2))
+    wait_for(limiter, running=2)
+    assert rpc.handle(request('work', {'units': 2}, 3))['error']['code'] == SERVER_BUSY
+    rpc.gate.set()
+    held.join(5)
+    small.join(5)
+    assert small.reply['result'] == 1, small.reply
+    # A call above the limit runs once nothing else of the method does
+    assert rpc.handle(request('work', {'units': 50}, 4))['result'] == 50
+
+
+def test_limits():
+    assert parse_limit('matmul=1e6') == ('matmul', 1000000)
+    assert parse_limit('a=b=2.5') == ('a=b', 2.5)
+    for bad in ('matmul', '=5', 'matmul=0', 'matmul=x'):
+        with pytest.raises(ValueError):
+            parse_limit(bad)
+    rpc = gated_registry()
+    limiters = attach_admission(rpc, {'ping': 3})
+    assert limiters['work'].capacity == 10 and limiters['ping'].capacity == 3
+    # The asyncio server runs limited methods on its executor: a waiting call must not block the loop
+    assert rpc.wants_offload(request('work', {'units': 1})) and rpc.wants_offload([request('ping', None)])
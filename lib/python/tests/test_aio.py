@@ -0,0 +1,121 @@
+"""The asyncio HTTP/1.1 server (`--http --async`): keep-alive, pipelining and offload."""
+import json
+import signal
+import threading
+import time
+
+from support import call, http_server, post, raw_http, solution, start_http, write_server
+
+SLEEP = '''
+import time
+
+
+@rpc.method('sleep', offload=True)
+def sleep(params):
+    time.sleep(params[0])
+    return params[0]
+
+
+@rpc.method('echo')
+def echo(params):
+    return params
+'''
+
+
+def http_request(body, version='HTTP/1.1', headers=()):
+    head = [f'POST / {version}', 'Host: x', f'Content-Length: {len(body)}', *headers]
+    return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+
+def parse_responses(data):
+    """[(status, {header: value}, body)] for the responses in `data`, in order."""
+    responses = []
+    while data:
+        head, _, data = data.partition(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        headers = dict((k.lower(), v.strip()) for k, _, v in (line.partition(':') for line in lines[1:]))
+        length = int(headers.get('content-length', 0))
+        responses.append((int(lines[0].split()[1]), headers, data[:length]))
+        data = data[length:]
+    return responses
+
+
+def test_pipelined_responses_come_back_in_order(tmp_path):
+    with http_server(write_server(tmp_path, SLEEP), '--async') as port:
+        # The first call finishes last, yet its response is written first
+        data = (http_request(call('sleep', [0.3], 1)) + http_request(call('sleep', [0], 2))
+                + http_request(call('echo', ['x'], 3), headers=['Connection: close']))
+        responses = parse_responses(raw_http(port, data))
+        assert [json.loads(body)['id'] for _, _, body in responses] == [1, 2, 3]
+        assert [status for status, _, _ in responses] == [200, 200, 200]
+        assert [h.get('connection') for _, h, _ in responses] == [None, None, 'close']
+
+
+def test_http10_connections_close_unless_kept_alive(tmp_path):
+    with http_server(write_server(tmp_path, SLEEP), '--async') as port:
+        # Without keep-alive the server answers with Connection: close and closes,
+        # so the request after it on the same socket is never read
+        data = http_request(call('echo', [1], 1), 'HTTP/1.0') + http_request(call('echo', [2], 2), 'HTTP/1.0')
+        responses = parse_responses(raw_http(port, data))
+        assert [(json.loads(body)['id'], h.get('connection')) for _, h, body in responses] == [(1, 'close')]
+        data = (http_request(call('echo', [1], 1), 'HTTP/1.0', ['Connection: keep-alive'])
+                + http_request(call('echo', [2], 2), 'HTTP/1.0'))
+        responses = parse_responses(raw_http(port, data))
+        assert [(json.loads(body)['id'], h.get('connection')) for _, h, body in responses] == [(1, None), (2, 'close')]
+
+
+def test_offloaded_calls_do_not_block_other_connections(tmp_path):
+    with http_server(write_server(tmp_path, SLEEP), '--async') as port:
+        slow = threading.Thread(target=post, args=(port, call('sleep', [1])))
+        slow.start()
+        time.sleep(0.1)
+        started = time.monotonic()
+        _, _, body = post(port, call('echo', ['x']))
+        assert time.monotonic() - started < 0.5
+        assert json.loads(body)['result'] == ['x']
+        slow.join()
+
+
+def test_pooled_batches_do_not_block_other_connections(tmp_path):
+    code = SLEEP.replace("'sleep', offload=True", "'sleep'")
+    with http_server(write_server(tmp_path, code), '--async', '--batch-workers', '2') as port:
+        batch = json.dumps([json.loads(call('sleep', [1], i)) for i in range(2)]).encode()
+        replies = []
+        slow = threading.Thread(target=lambda: replies.append(post(port, batch)))
+        slow.start()
+        time.sleep(0.1)
+        started = time.monotonic()
+        _, _, body = post(port, call('echo', ['x']))
+        assert time.monotonic() - started < 0.5
+        assert json.loads(body)['result'] == ['x']
+        slow.join()
+        assert [r['result'] for r in json.loads(replies[0][2])] == [1, 1]
+
+
+def test_sigterm_lets_in_flight_requests_finish(tmp_path):
+    proc = start_http(write_server(tmp_path, SLEEP), '--async')
+    replies = []
+    client = threading.Thread(target=lambda: replies.append(post(proc.port, call('sleep', [0.5]))))
+    client.start()
+    time.sleep(0.2)
+    proc.send_signal(signal.SIGTERM)
+    client.join(10)
+    assert proc.wait(10) == 0
+    assert [json.loads(body)['result'] for _, _, body in replies] == [0.5]
+
+
+def test_body_over_max_body_is_refused():
+    with http_server(solution('002-subtract'), '--async', '--max-body', '100') as port:
+        # Refused on the headers alone: the body is never sent
+        responses = parse_responses(raw_http(port, b'POST / HTTP/1.1\r\nHost: x\r\nContent-Length: 101\r\n\r\n'))
+        assert [(status, h.get('connection')) for status, h, _ in responses] == [(413, 'close')]
+        assert json.loads(responses[0][2])['error']['code'] == -32600
+
+
+def test_invalid_content_length():
+    with http_server(solution('002-subtract'), '--async') as port:
+        for length in (b'-1', b'abc'):
+            data = b'POST / HTTP/1.1\r\nHost: x\r\nContent-Length: %s\r\n\r\n' % length + call('subtract', [5, 3])
+            responses = parse_responses(raw_http(port, data))
+            assert [status for status, _, _ in responses] == [400], (length, responses)
+            assert json.loads(responses[0][2])['error']['code'] == -32700
@@ -0,0 +1,122 @@
+"""Batch bodies handled member by member while they are read (`jsonrpc.batchstream`)."""
+import glob
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from jsonrpc import Registry
+from jsonrpc.batchstream import SPLIT_ABOVE, TOO_LARGE, handle_streamed, split_array
+from jsonrpc.core import encode_chunks, is_streamed
+
+from support import ROOT, call, solution
+
+SUBTRACT = solution('002-subtract')
+# Malformed and mixed batches for the Python solution, which supports batches
+FIXTURES = sorted(glob.glob(os.path.join(ROOT, 'tests', '002-subtract', 'python', 'request-*.json')))
+
+
+def subtract_registry():
+    rpc = Registry()
+
+    @rpc.method('subtract')
+    def subtract(params):
+        return params[0] - params[1]
+    return rpc
+
+
+def reader(data, size):
+    """(head, read) serving `data` `size` bytes at a time, so members straddle reads."""
+    pieces = [data[i:i + size] for i in range(size, len(data), size)]
+    return data[:size], lambda n: pieces.pop(0) if pieces else b''
+
+
+def split(data, size=7, max_member=None):
+    head, read = reader(data, size)
+    return list(split_array(read, head, max_member))
+
+
+def split_error(data, size=7):
+    with pytest.raises(ValueError) as e:
+        split(data, size)
+    return str(e.value)
+
+
+def streamed_batch(registry, data, size=4096, max_member=None):
+    """The decoded reply `handle_streamed` gives for the batch body `data`."""
+    head, read = reader(data, size)
+    resp = handle_streamed(registry, read, head, max_member)
+    if is_streamed(resp):
+        resp = b''.join(encode_chunks(resp))
+    return json.loads(resp) if isinstance(resp, bytes) else resp
+
+
+def test_split_strings():
+    # Brackets, commas and escaped quotes inside strings do not end a member
+    members = [rb'{"a":"x\"],{\\"}', rb'"\\\\"', rb'"[,]"', b'1']
+    for size in (1, 2, 3, 7, 64):
+        assert split(b'[' + b' , '.join(members) + b']', size) == members, size
+
+
+def test_split_nested():
+    members = [b'[1,[2,{"a":[3,[4,[5]]]}]]', b'{"b":{"c":{"d":[],"e":"}"}}}', b'[]', b'{}']
+    for size in (1, 5, 64):
+        assert split(b'[\n' + b',\n'.join(members) + b'\n]\n', size) == members, size
+
+
+def test_split_too_large():
+    big = b'{"jsonrpc":"2.0","method":"subtract","params":[' + b'1,' * 100 + b'1],"id":1}'
+    assert split(b'[1, ' + big + b' ,2]', 7, max_member=100) == [b'1', TOO_LARGE, b'2']
+    # The reply for the dropped member is -32600 with id null; the others still run
+    replies = streamed_batch(subtract_registry(), b'[' + big + b',' + call('subtract', [5, 3], 2) + b']', 16, 100)
+    assert replies == [{'jsonrpc': '2.0', 'error': {'code': -32600, 'message': 'Invalid Request: batch member exceeds 100 bytes'},
+                        'id': None}, {'jsonrpc': '2.0', 'result': 2, 'id': 2}], replies
+
+
+def test_split_malformed():
+    assert split(b'[1]  \n') == [b'1']
+    assert split_error(b'[1] x') == 'data after the batch array'
+    assert split_error(b'[1][2]') == 'data after the batch array'
+    assert split_error(b'[1,2') == 'truncated batch'
+    assert split_error(b'[1,"2]') == 'truncated batch'
+    assert split_error(b'[1,,2]') == 'empty batch member'
+    assert split_error(b'[1,]') == 'empty batch member'
+    assert split_error(b'[}]') == 'unbalanced }'
+
+
+def test_streamed_batch_errors():
+    rpc = subtract_registry()
+    ok = call('subtract', [5, 3], 1)
+    # Before the first reply, the body is answered as a whole
+    assert streamed_batch(rpc, b'[]')['error']['code'] == -32600
+    assert streamed_batch(rpc, b'[}')['error']['code'] == -32700
+    # Later, the reply array ends with -32700 and nothing after the error runs
+    for body in (b'[' + ok + b'] trailing', b'[' + ok + b',' + ok, b'[' + ok + b',{"jsonrpc":}, ' + ok + b']'):
+        replies = streamed_batch(rpc, body, 16)
+        assert [r.get('result', r.get('error', {}).get('code')) for r in replies] == [2, -32700], (body, replies)
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=os.path.basename)
+@pytest.mark.parametrize('flags', [(), ('--stream-batches',)])
+def test_fixtures(path, flags):
+    # Bodies under SPLIT_ABOVE are answered whole, with or without --stream-batches
+    with open(path, 'rb') as f:
+        body = f.read()
+    with open(path.replace('request-', 'expected-'), 'rb') as f:
+        expected = f.read()
+    out = subprocess.run([sys.executable, SUBTRACT, *flags], input=body, stdout=subprocess.PIPE, check=True).stdout
+    assert (json.loads(out) if out.strip() else None) == (json.loads(expected) if expected.strip() else None)
+
+
+def test_stream_batches_end_to_end():
+    # Over SPLIT_ABOVE, so the body is split while it is read; the bad tail ends the replies
+    members = [call('subtract', [i, 1], i) for i in range(SPLIT_ABOVE // 60)]
+    body = b'[' + b','.join(members) + b'] trailing'
+    assert len(body) > SPLIT_ABOVE
+    proc = subprocess.run([sys.executable, SUBTRACT, '--stream-batches'], input=body, stdout=subprocess.PIPE, check=True)
+    replies = json.loads(proc.stdout)
+    assert len(replies) == len(members) + 1, len(replies)
+    assert replies[-2] == {'jsonrpc': '2.0', 'result': len(members) - 2, 'id': len(members) - 1}, replies[-2]
+    assert replies[-1]['error'] == {'code': -32700, 'message': 'Parse error'}, replies[-1]
@@ -0,0 +1,103 @@
+"""The result cache (`jsonrpc.cache`) on an in-process registry."""
+import time
+
+from jsonrpc import InvalidParams, Registry
+from jsonrpc.cache import KEY_MAX_ITEMS, attach_cache
+from jsonrpc.params import by_position_or_name
+
+from support import request
+
+
+def cached_registry(ttl=True):
+    """A cached `subtract` on named or positional numbers and a cached `total` of
+    a list of them, each counting its runs in `registry.runs`."""
+    rpc = Registry()
+    rpc.runs = 0
+
+    def number(x):
+        if type(x) not in (int, float):
+            raise InvalidParams('numbers only')
+        return x
+
+    @rpc.method('subtract', params=by_position_or_name(('minuend', 'subtrahend'), number), cache=ttl)
+    def subtract(a, b):
+        rpc.runs += 1
+        return a - b
+
+    def numbers(params):
+        if type(params) is not list:
+            raise InvalidParams('numbers only')
+        return [number(x) for x in params],
+
+    @rpc.method('total', params=numbers, cache=ttl)
+    def total(values):
+        rpc.runs += 1
+        return sum(values)
+    return rpc
+
+
+def test_keys_are_validated_args():
+    rpc = cached_registry()
+    cache = attach_cache(rpc, 16)
+    for params in ([5, 3], {'minuend': 5, 'subtrahend': 3}, {'subtrahend': 3, 'minuend': 5}):
+        assert rpc.handle(request('subtract', params))['result'] == 2
+    assert rpc.runs == 1, rpc.runs
+    # 1, 1.0 and True would compare equal as keys; their results must not be shared
+    assert rpc.handle(request('subtract', [5.0, 3]))['result'] == 2.0 and rpc.runs == 2
+    assert repr(rpc.handle(request('subtract', [-0.0, 0]))['result']) == '-0.0'
+    assert repr(rpc.handle(request('subtract', [0.0, 0]))['result']) == '0.0'
+    # A rejected call is answered before the cache is consulted
+    misses = cache.stats()['misses']
+    assert rpc.handle(request('subtract', ['5', 3]))['error']['code'] == -32602
+    assert cache.stats()['misses'] == misses
+
+
+def test_large_args_are_not_cached():
+    rpc = cached_registry()
+    cache = attach_cache(rpc, 16)
+    small, large = list(range(KEY_MAX_ITEMS)), list(range(KEY_MAX_ITEMS + 1))
+    for values in (small, small, large, large):
+        rpc.handle(request('total', values))
+    assert rpc.runs == 3 and len(cache) == 1, (rpc.runs, len(cache))
+
+
+def test_errors_are_not_cached():
+    rpc = cached_registry()
+    cache = attach_cache(rpc, 16)
+    for _ in range(2):
+        assert rpc.handle(request('subtract', ['5', 3]))['error']['code'] == -32602
+    assert len(cache) == 0
+
+
+def test_lru_eviction():
+    rpc = cached_registry()
+    cache = attach_cache(rpc, 2)
+    for a in (1, 2, 1, 3):
+        rpc.handle(request('subtract', [a, 0]))
+    # 2 was the least recently used when 3 arrived
+    assert rpc.runs == 3 and cache.stats()['evictions'] == 1, cache.stats()
+    rpc.handle(request('subtract', [1, 0]))
+    assert rpc.runs == 3
+    rpc.handle(request('subtract', [2, 0]))
+    assert rpc.runs == 4
+
+
+def test_max_bytes():
+    rpc = cached_registry()
+    # Entries count their key and result; two of these fit in 15 bytes, three do not
+    cache = attach_cache(rpc, 16, max_bytes=15)
+    for a in range(4):
+        rpc.handle(request('subtract', [a, 0]))
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['evictions'] == 2 and stats['bytes'] <= 15, stats
+
+
+def test_ttl():
+    rpc = cached_registry(ttl=0.05)
+    cache = attach_cache(rpc, 16)
+    rpc.handle(request('subtract', [5, 3]))
+    rpc.handle(request('subtract', [5, 3]))
+    assert rpc.runs == 1
+    time.sleep(0.06)
+    rpc.handle(request('subtract', [5, 3]))
+    assert rpc.runs == 2 and cache.stats()['expirations'] == 1, cache.stats()
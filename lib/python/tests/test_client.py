@@ -0,0 +1,114 @@
+"""The pooled HTTP clients (`jsonrpc.client`) against a solution server."""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from jsonrpc import RpcError
+from jsonrpc.client import AsyncClient, Client, HTTPError
+
+from support import http_server, solution
+
+SUBTRACT = solution('002-subtract')
+SERVERS = [('--workers', '4'), ('--async',)]
+
+
+def counting_sends(client):
+    """Count the HTTP requests `client` makes, in `client.sends`."""
+    client.sends = 0
+    send = client.send
+
+    def counted(body):
+        client.sends += 1
+        return send(body)
+    client.send = counted
+    return client
+
+
+@pytest.mark.parametrize('flags', SERVERS)
+def test_client(flags):
+    with http_server(SUBTRACT, *flags) as port:
+        with Client(f'http://127.0.0.1:{port}/', pool_size=2) as client:
+            assert client.call('subtract', [42, 23]) == 19
+            assert client.call('subtract', {'minuend': 42, 'subtrahend': 23}) == 19
+            with pytest.raises(RpcError) as e:
+                client.call('subtract', ['a', 1])
+            assert e.value.code == -32602
+            assert client.notify('subtract', [1, 1]) is None
+            results = client.batch([('subtract', [5, 3]), ('nope', []), ('subtract', [1, 2])])
+            assert results[0] == 2 and results[2] == -1, results
+            assert isinstance(results[1], RpcError) and results[1].code == -32601, results
+            # Every call went over the one kept-alive connection
+            assert len(client._idle) == 1
+
+
+def test_client_reconnects():
+    # The idle connection is closed when its server stops; the next call resends on a new one
+    with http_server(SUBTRACT, '--workers', '2') as port:
+        client = Client(f'http://127.0.0.1:{port}/')
+        assert client.call('subtract', [5, 3]) == 2
+    with http_server(SUBTRACT, '--workers', '2', port=port):
+        assert client.call('subtract', [6, 3]) == 3
+        client.close()
+
+
+def test_client_batch_window():
+    with http_server(SUBTRACT, '--workers', '4') as port:
+        with counting_sends(Client(f'http://127.0.0.1:{port}/', batch_window=0.05, max_batch=16)) as client:
+            results = [None] * 32
+            start = threading.Barrier(len(results))
+
+            def run(i):
+                start.wait()
+                results[i] = client.call('subtract', [i, 1])
+            threads = [threading.Thread(target=run, args=(i,)) for i in range(len(results))]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert results == [i - 1 for i in range(len(results))], results
+            # 32 calls in batches of at most 16
+            assert 2 <= client.sends < len(results), client.sends
+
+
+def test_client_http_error():
+    with http_server(SUBTRACT, '--workers', '2', '--max-body', '64') as port:
+        with Client(f'http://127.0.0.1:{port}/') as client:
+            with pytest.raises(HTTPError) as e:
+                client.send(b'[' + b' ' * 100 + b']')
+            assert e.value.status == 413 and json.loads(e.value.body)['error']['code'] == -32600
+            assert client.call('subtract', [5, 3]) == 2
+
+
+def test_client_compress():
+    fib = {'start': 0, 'count': 1000}
+    with http_server(solution('007-fibonacci-stream'), '--compress', '--workers', '2') as port:
+        url = f'http://127.0.0.1:{port}/'
+        with Client(url) as plain, Client(url, compress=True) as compressed:
+            assert plain.call('fibStream', fib) == compressed.call('fibStream', fib)
+
+        async def run():
+            async with AsyncClient(url, compress=True) as client:
+                return await client.call('fibStream', fib)
+        result = asyncio.run(run())
+        assert len(result) == 1000 and result[:5] == [0, 1, 1, 2, 3], result[:5]
+
+
+@pytest.mark.parametrize('flags', SERVERS)
+def test_async_client(flags):
+    async def run(url):
+        async with counting_sends(AsyncClient(url, pool_size=2, pipeline=4)) as client:
+            results = await asyncio.gather(*(client.call('subtract', [i, 1]) for i in range(50)))
+            assert results == [i - 1 for i in range(50)], results
+            assert client.sends == 50 and len(client._conns) <= 2, (client.sends, len(client._conns))
+            batch = await client.batch([('subtract', [5, 3]), ('nope', [])])
+            assert batch[0] == 2 and isinstance(batch[1], RpcError) and batch[1].code == -32601, batch
+        async with counting_sends(AsyncClient(url, batch_window=0.01, max_batch=20)) as client:
+            results = await asyncio.gather(*(client.call('subtract', [i, 1]) for i in range(50)))
+            assert results == [i - 1 for i in range(50)], results
+            # 50 calls in batches of at most 20
+            assert client.sends == 3, client.sends
+
+    with http_server(SUBTRACT, *flags) as port:
+        asyncio.run(run(f'http://127.0.0.1:{port}/'))
@@ -0,0 +1,73 @@
+"""The JSON backends of `jsonrpc.codec` and their fallback order."""
+import json
+import sys
+
+import pytest
+
+from jsonrpc import RawJSON, codec
+from jsonrpc.core import encode, encode_chunks
+
+BACKENDS = ('orjson', 'ujson', 'json')
+
+DOCUMENTS = [
+    b'{"jsonrpc":"2.0","method":"subtract","params":[42,23],"id":1}',
+    b'[1,-0,2.5,1e300,-1.5e-300,true,false,null,"",{}]',
+    # Beyond 64 bits: must stay exact integers
+    b'[18446744073709551616,-9223372036854775809,123456789012345678901234567890]',
+    '{"s":"\\u00e9\\ud83d\\ude00 日\\n\\"/"}'.encode('utf-8'),
+]
+
+
+@pytest.fixture(autouse=True)
+def restore_codec():
+    yield
+    codec.use('auto')
+
+
+def installed(name):
+    if name != 'json':
+        pytest.importorskip(name)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_auto_falls_back_in_order(monkeypatch, backend):
+    installed(backend)
+    # Make every backend ahead of this one fail to import
+    for name in BACKENDS[:BACKENDS.index(backend)]:
+        monkeypatch.setitem(sys.modules, name, None)
+    assert codec.use('auto') == backend == codec.name
+
+
+def test_named_backend_must_import(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'orjson', None)
+    with pytest.raises(ValueError):
+        codec.use('orjson')
+    with pytest.raises(ValueError):
+        codec.use('simplejson')
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_backends_agree_with_the_standard_library(backend):
+    installed(backend)
+    codec.use(backend)
+    for doc in DOCUMENTS:
+        expected = json.loads(doc)
+        for data in (doc, bytearray(doc), memoryview(doc), doc.decode('utf-8')):
+            assert codec.loads(data) == expected, (backend, doc)
+        encoded = codec.dumps(expected)
+        assert isinstance(encoded, bytes) and json.loads(encoded) == expected, (backend, encoded)
+    for bad in (b'{', b'[1,]', b'{"a" 1}', b'\xff'):
+        with pytest.raises(ValueError):
+            codec.loads(bad)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_non_finite_floats_are_written_as_null(backend):
+    installed(backend)
+    codec.use(backend)
+    nan, inf = float('nan'), float('inf')
+    assert codec.dumps([nan, inf, -inf, {'a': nan}, (1.5, inf)]) == b'[null,null,null,{"a":null},[1.5,null]]'
+    # Also when RawJSON sends the value through the standard library's encoder
+    resp = {'jsonrpc': '2.0', 'result': [inf, RawJSON('[1, 2]'), {'b': -inf}], 'id': 1}
+    assert encode(resp) == b'{"jsonrpc":"2.0","result":[null,[1, 2],{"b":null}],"id":1}'
+    assert b''.join(encode_chunks(resp)) == encode(resp)
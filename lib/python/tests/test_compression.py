@@ -0,0 +1,93 @@
+"""gzip/deflate on the HTTP transports (`jsonrpc.compression`)."""
+import gzip
+import json
+import zlib
+
+import pytest
+
+from jsonrpc.compression import decompress, negotiate
+
+from support import http_server, post, solution
+
+SERVERS = [('--workers', '2'), ('--async',)]
+
+
+def fib_call(count, id_=1):
+    return json.dumps({'jsonrpc': '2.0', 'method': 'fibStream', 'params': {'start': 0, 'count': count}, 'id': id_}).encode()
+
+
+def test_negotiate():
+    cases = {
+        None: None,
+        '': None,
+        'gzip': 'gzip',
+        'deflate, gzip': 'gzip',
+        'gzip;q=0.5, deflate': 'deflate',
+        'x-gzip': 'gzip',
+        'GZIP;Q=1': 'gzip',
+        'gzip;q=0, deflate;q=0': None,
+        '*': 'gzip',
+        '*;q=0.1, deflate;q=0.5': 'deflate',
+        'br, identity': None,
+        'gzip;q=oops, deflate': 'deflate',
+    }
+    for accept, coding in cases.items():
+        assert negotiate(accept) == coding, accept
+
+
+def test_decompress():
+    data = b'{"jsonrpc":"2.0","method":"subtract","params":[5,3],"id":1}' * 10
+    raw = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    for coding, body in (('gzip', gzip.compress(data)), ('x-gzip', gzip.compress(data)),
+                         ('deflate', zlib.compress(data)), ('deflate', raw.compress(data) + raw.flush()),
+                         ('identity', data), (None, data)):
+        assert decompress(body, coding, len(data)) == data, coding
+    for coding, body, error in (('gzip', b'not gzip', ValueError), ('deflate', b'not deflate', ValueError),
+                                ('br', data, LookupError), ('gzip', gzip.compress(data), OverflowError)):
+        with pytest.raises(error):
+            decompress(body, coding, len(data) - 1)
+
+
+# 1000 numbers (about 100 KB) are compressed whole; 3000 streamed ones piece by piece, sent chunked
+@pytest.mark.parametrize('stream, count', [((), 1000), (('--stream',), 3000)])
+@pytest.mark.parametrize('flags', SERVERS)
+def test_http_compression(flags, stream, count):
+    fib = fib_call(count)
+    with http_server(solution('007-fibonacci-stream'), '--compress', *stream, *flags) as port:
+        status, headers, plain = post(port, fib)
+        assert status == 200 and 'content-encoding' not in headers, headers
+        expected = json.loads(plain)
+        assert len(expected['result']) == count
+        for coding, inflate in (('gzip', gzip.decompress), ('deflate', zlib.decompress)):
+            status, headers, body = post(port, fib, {'Accept-Encoding': coding})
+            assert headers.get('content-encoding') == coding, (coding, headers)
+            assert len(body) < len(plain) and json.loads(inflate(body)) == expected, coding
+        # Below --compress-threshold: sent as is
+        status, headers, body = post(port, fib_call(0), {'Accept-Encoding': 'gzip'})
+        assert 'content-encoding' not in headers and json.loads(body)['error']['code'] == -32602, headers
+
+
+@pytest.mark.parametrize('flags', SERVERS)
+def test_compressed_request_bodies(flags):
+    fib = fib_call(1000)
+    with http_server(solution('007-fibonacci-stream'), *flags) as port:
+        _, _, plain = post(port, fib)
+        # Accepted without --compress, whatever the response coding
+        for coding, deflate in (('gzip', gzip.compress), ('deflate', zlib.compress)):
+            status, headers, body = post(port, deflate(fib), {'Content-Encoding': coding})
+            assert status == 200 and body == plain, (coding, status)
+        status, headers, body = post(port, b'not gzip', {'Content-Encoding': 'gzip'})
+        assert status == 400 and json.loads(body)['error']['code'] == -32700, (status, body)
+        status, headers, body = post(port, fib, {'Content-Encoding': 'br'})
+        assert status == 415 and json.loads(body)['error']['code'] == -32600, (status, body)
+
+
+@pytest.mark.parametrize('flags', SERVERS)
+def test_compressed_raw_params(flags):
+    # The raw payload is located in the decompressed body, so it is still passed through verbatim
+    payload = b'{ "b" : [1.0, 1e2, "\\u00e9"],"a":{} }'
+    body = b'{"jsonrpc":"2.0","method":"echoWithMeta","params":{"payload":%s},"id":1}' % payload
+    with http_server(solution('009-echo-with-meta'), *flags) as port:
+        _, _, plain = post(port, body)
+        status, _, compressed = post(port, gzip.compress(body), {'Content-Encoding': 'gzip'})
+    assert status == 200 and compressed == plain and b'"payload":%s' % payload in plain, compressed
@@ -0,0 +1,73 @@
+"""007 `fibStream`: large `start` values and the `--stream` output paths."""
+import json
+import subprocess
+import sys
+
+import pytest
+
+from support import call, http_server, post, solution
+
+SERVER = solution('007-fibonacci-stream')
+
+
+def fib(start, count):
+    a, b = 0, 1
+    for _ in range(start):
+        a, b = b, a + b
+    values = []
+    for _ in range(count):
+        values.append(a)
+        a, b = b, a + b
+    return values
+
+
+@pytest.fixture
+def big_ints():
+    # F(100000) has 20899 digits; json.loads() refuses integers over 4300 digits by default
+    limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    yield
+    sys.set_int_max_str_digits(limit)
+
+
+def one_shot(*flags, body):
+    out = subprocess.run([sys.executable, SERVER, *flags], input=body, stdout=subprocess.PIPE, check=True).stdout
+    return json.loads(out)
+
+
+def test_largest_start(big_ints):
+    reply = one_shot(body=call('fibStream', {'start': 100000, 'count': 3}))
+    assert reply['result'] == fib(100000, 3)
+    reply = one_shot(body=call('fibStream', {'start': 100001, 'count': 1}))
+    assert reply['error'] == {'code': -32602, 'message': 'Invalid params: start must be <= 100000'}
+
+
+def test_clients_must_lift_the_digit_limit_from_f20578():
+    limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(4300)
+    try:
+        assert one_shot(body=call('fibStream', {'start': 20577, 'count': 1}))['result'] == fib(20577, 1)
+        with pytest.raises(ValueError):
+            one_shot(body=call('fibStream', {'start': 20578, 'count': 1}))
+    finally:
+        sys.set_int_max_str_digits(limit)
+
+
+@pytest.mark.parametrize('flags', [('--workers', '2'), ('--async',)])
+def test_streamed_output_matches_whole_output(big_ints, flags):
+    body = call('fibStream', {'start': 20000, 'count': 1000})
+    with http_server(SERVER, *flags) as port:
+        status, _, whole = post(port, body)
+        assert status == 200
+    with http_server(SERVER, '--stream', *flags) as port:
+        status, headers, streamed = post(port, body)
+        assert status == 200 and headers.get('transfer-encoding') == 'chunked'
+    assert json.loads(streamed) == json.loads(whole)
+    assert json.loads(whole)['result'] == fib(20000, 1000)
+
+
+def test_stdio_stream_output_matches_one_shot(big_ints):
+    body = call('fibStream', {'start': 20000, 'count': 1000})
+    proc = subprocess.run([sys.executable, SERVER, '--stdio-stream', '--stream'], input=body + b'\n',
+                          stdout=subprocess.PIPE, check=True)
+    assert json.loads(proc.stdout) == one_shot(body=body)
@@ -0,0 +1,122 @@
+"""The HTTP serving modes: single-threaded, `--workers N` threads and pre-forked processes."""
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from jsonrpc.httpd import MAX_QUICK_EXITS
+
+from support import call, free_port, http_server, post, raw_http, solution, start_http, write_server
+
+MODES = [(), ('--workers', '4'), ('--workers', '2', '--worker-mode', 'process')]
+
+SLEEP = '''
+import time
+
+
+@rpc.method('sleep')
+def sleep(params):
+    time.sleep(params[0])
+    return params[0]
+'''
+
+# Pre-forked workers that cannot listen exit at once
+REFUSE_LISTEN = '''
+from jsonrpc import httpd
+
+
+def refuse(server):
+    raise {error}
+
+
+httpd.ReusePortHTTPServer.server_activate = refuse
+'''
+
+
+@pytest.mark.parametrize('flags', MODES)
+def test_serves_and_exits_on_sigterm(flags):
+    proc = start_http(solution('002-subtract'), *flags)
+    try:
+        for i in range(4):
+            status, _, body = post(proc.port, call('subtract', [42, i], i))
+            assert status == 200 and json.loads(body) == {'jsonrpc': '2.0', 'result': 42 - i, 'id': i}
+        status, _, body = post(proc.port, json.dumps({'jsonrpc': '2.0', 'method': 'subtract', 'params': [1, 1]}).encode())
+        assert status == 204 and body == b''
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(10) == 0
+
+
+def test_threads_serve_connections_concurrently(tmp_path):
+    with http_server(write_server(tmp_path, SLEEP), '--workers', '4') as port:
+        replies = []
+        threads = [threading.Thread(target=lambda i=i: replies.append(post(port, call('sleep', [0.5], i))))
+                   for i in range(4)]
+        started = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert time.monotonic() - started < 1.5
+        assert sorted(json.loads(body)['id'] for _, _, body in replies) == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize('flags', MODES)
+def test_sigterm_lets_in_flight_requests_finish(tmp_path, flags):
+    proc = start_http(write_server(tmp_path, SLEEP), *flags)
+    replies = []
+    client = threading.Thread(target=lambda: replies.append(post(proc.port, call('sleep', [0.5]))))
+    client.start()
+    time.sleep(0.2)
+    proc.send_signal(signal.SIGTERM)
+    client.join(10)
+    assert proc.wait(10) == 0
+    assert [json.loads(body)['result'] for _, _, body in replies] == [0.5]
+
+
+@pytest.mark.parametrize('flags', [(), ('--workers', '2')])
+def test_body_over_max_body_is_refused(flags):
+    with http_server(solution('002-subtract'), '--max-body', '100', *flags) as port:
+        # Refused on the headers alone: the body is never sent
+        reply = raw_http(port, b'POST / HTTP/1.1\r\nHost: x\r\nContent-Length: 101\r\n\r\n')
+        head, _, body = reply.partition(b'\r\n\r\n')
+        assert head.split()[1] == b'413' and json.loads(body)['error']['code'] == -32600, reply
+        status, _, body = post(port, call('subtract', [5, 3]))
+        assert status == 200 and json.loads(body)['result'] == 2
+
+
+@pytest.mark.parametrize('error, status, printed', [
+    ("OSError('listen() refused')", 1, 'OSError: listen() refused'),
+    ('SystemExit(3)', 3, None),
+])
+def test_prefork_gives_up_on_workers_that_keep_dying(tmp_path, error, status, printed):
+    env = dict(os.environ, TEST_HOST='127.0.0.1', TEST_PORT=str(free_port()))
+    started = time.monotonic()
+    proc = subprocess.run([sys.executable, write_server(tmp_path, REFUSE_LISTEN.format(error=error)), '--http',
+                           '--workers', '2', '--worker-mode', 'process'],
+                          env=env, stderr=subprocess.PIPE, text=True, timeout=30)
+    assert proc.returncode == 1
+    assert f'{MAX_QUICK_EXITS} workers in a row exited' in proc.stderr and 'giving up' in proc.stderr, proc.stderr
+    # Workers keep their exit status and print the traceback of an unexpected error
+    assert f'last exit status {status})' in proc.stderr, proc.stderr
+    if printed:
+        assert 'Traceback (most recent call last)' in proc.stderr and printed in proc.stderr, proc.stderr
+    else:
+        assert 'Traceback' not in proc.stderr, proc.stderr
+    # Respawns back off (0.1 s, 0.2 s, ...) instead of forking in a tight loop
+    assert time.monotonic() - started >= 1
+
+
+@pytest.mark.parametrize('flags', [(), ('--workers', '2')])
+def test_invalid_content_length(flags):
+    with http_server(solution('002-subtract'), *flags) as port:
+        for length in (b'-1', b'abc'):
+            reply = raw_http(port, b'POST / HTTP/1.1\r\nHost: x\r\nContent-Length: %s\r\n\r\n' % length
+                             + call('subtract', [5, 3]))
+            head, _, body = reply.partition(b'\r\n\r\n')
+            assert head.split()[1] == b'400' and json.loads(body)['error']['code'] == -32700, (length, reply)
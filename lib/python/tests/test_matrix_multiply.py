@@ -0,0 +1,24 @@
+"""006 `matmul`: the tiled pure-Python product."""
+import random
+from array import array
+
+import pytest
+
+from support import load_solution
+
+matrix = load_solution('006-matrix-multiply')
+
+
+def naive(a, b):
+    return [[sum(a[i][k] * b[k][j] for k in range(len(b))) for j in range(len(b[0]))] for i in range(len(a))]
+
+
+@pytest.mark.parametrize('exact', [True, False])
+@pytest.mark.parametrize('cols', [1, matrix.TILE, matrix.TILE + 1, 3 * matrix.TILE + 5])
+def test_tiled_product_matches_naive(exact, cols):
+    rng = random.Random(cols)
+    value = (lambda: rng.randint(-10 ** 12, 10 ** 12)) if exact else (lambda: float(rng.randint(-1000, 1000)))
+    a = [[value() for _ in range(37)] for _ in range(23)]
+    b = [[value() for _ in range(cols)] for _ in range(37)]
+    rows = (a, b) if exact else ([array('d', row) for row in a], [array('d', row) for row in b])
+    assert matrix.multiply_python(*rows, exact) == naive(a, b)
@@ -0,0 +1,60 @@
+"""008 `mergeObjects`: deep and wide inputs, and inputs left unmodified."""
+import copy
+import json
+import subprocess
+import sys
+
+import pytest
+
+from support import call, load_solution, solution
+
+merge_objects = load_solution('008-merge-objects').merge_objects
+
+
+def nested(depth, leaf):
+    obj = leaf
+    for _ in range(depth):
+        obj = {'a': obj}
+    return obj
+
+
+def test_deep_inputs():
+    # Far deeper than the recursion limit
+    result = merge_objects([nested(5000, {'x': 1}), nested(5000, {'y': 2})], 'last')
+    for _ in range(5000):
+        result = result['a']
+    assert result == {'x': 1, 'y': 2}
+
+
+def test_deep_inputs_end_to_end():
+    body = call('mergeObjects', {'items': [nested(500, {'x': [1]}), nested(500, {'x': [2]})], 'strategy': 'concat'})
+    out = subprocess.run([sys.executable, solution('008-merge-objects')], input=body, stdout=subprocess.PIPE, check=True)
+    assert json.loads(out.stdout)['result'] == nested(500, {'x': [1, 2]})
+
+
+def test_wide_inputs():
+    left = {f'k{i}': {'n': i} for i in range(10000)}
+    right = {f'k{i}': {'m': i} for i in range(5000, 15000)}
+    result = merge_objects([left, right], 'last')
+    assert len(result) == 15000
+    assert result['k0'] == {'n': 0} and result['k5000'] == {'n': 5000, 'm': 5000} and result['k14999'] == {'m': 14999}
+
+
+@pytest.mark.parametrize('strategy', ['last', 'first', 'concat'])
+def test_inputs_are_not_modified(strategy):
+    items = [
+        {'a': {'b': [1], 'c': None}, 'list': [1], 'keep': {'deep': [0]}},
+        {'a': {'b': [2], 'c': 3}, 'list': 2, 'new': {'x': []}},
+        {'a': {'b': 4}, 'list': [3]},
+    ]
+    before = copy.deepcopy(items)
+    result = merge_objects(items, strategy)
+    assert items == before
+    # Subtrees only one input has are shared, not copied
+    assert result['keep'] is items[0]['keep'] and result['new'] is items[1]['new']
+    expected = {
+        'last': {'a': {'b': 4, 'c': 3}, 'list': [3]},
+        'first': {'a': {'b': [1], 'c': 3}, 'list': [1]},
+        'concat': {'a': {'b': [1, 2, 4], 'c': [3]}, 'list': [1, 2, 3]},
+    }[strategy]
+    assert {k: result[k] for k in expected} == expected
@@ -0,0 +1,108 @@
+"""Runtime metrics (`jsonrpc.metrics`): counters, histograms and the Prometheus text."""
+import http.client
+import re
+
+import pytest
+
+from jsonrpc import InvalidParams, Registry
+from jsonrpc.admission import attach_admission
+from jsonrpc.cache import attach_cache
+from jsonrpc.metrics import BUCKETS, Histogram, attach_metrics
+from jsonrpc.params import by_position_or_name
+
+from support import call, http_server, post, request, solution
+
+# name{labels} value, as written by Metrics.prometheus
+_SAMPLE = re.compile(r'([a-z_]+)(?:\{((?:[a-z]+="(?:[^"\\]|\\.)*",?)*)\})? (\S+)')
+
+
+def prometheus_samples(text):
+    """{(name, labels): value} from Prometheus text; raises on a malformed line."""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith('# HELP ') or line.startswith('# TYPE '):
+            continue
+        m = _SAMPLE.fullmatch(line)
+        assert m is not None, f'malformed line {line!r}'
+        samples[m.group(1), m.group(2) or ''] = float(m.group(3))
+    return samples
+
+
+def subtract_registry():
+    rpc = Registry()
+
+    def number(x):
+        if type(x) not in (int, float):
+            raise InvalidParams('numbers only')
+        return x
+
+    @rpc.method('subtract', params=by_position_or_name(('minuend', 'subtrahend'), number), cache=True)
+    def subtract(a, b):
+        return a - b
+    return rpc
+
+
+def test_histogram_buckets():
+    hist = Histogram()
+    for seconds in (0, 1e-6, 1.5e-6, 3e-6, BUCKETS[-1], 100):
+        hist.observe(seconds)
+    snap = hist.snapshot()
+    # Bucket bounds are inclusive: 1 µs lands in the first one, 1.5 µs in the 2 µs one
+    assert snap['cumulative'][:3] == [2, 3, 4] and snap['cumulative'][-2:] == [5, 6], snap['cumulative']
+    assert snap['count'] == 6 and abs(snap['sum'] - (100 + BUCKETS[-1] + 5.5e-6)) < 1e-9, snap
+
+
+def test_counts():
+    rpc = subtract_registry()
+    metrics = attach_metrics(rpc)
+    attach_cache(rpc, 16)
+    attach_admission(rpc, {'subtract': 100})
+    for body in (call('subtract', [5, 3]), call('subtract', [5, 3]), call('subtract', ['a', 3]), call('nope', []), b'{'):
+        rpc.encode(rpc.handle_json(body))
+    stats = rpc.handle(request('rpc.stats', None))['result']
+    assert stats['methods']['subtract'] == {'calls': 3, 'in_flight': 0, 'errors': {'-32602': 1}}, stats['methods']
+    # Errors found before a method is dispatched have method ""
+    assert stats['methods'][''] == {'calls': 0, 'in_flight': 0, 'errors': {'-32700': 1, '-32601': 1}}, stats['methods']
+    assert stats['phases']['parse']['']['count'] == 5 and stats['phases']['serialise']['']['count'] == 5, stats['phases']
+    assert stats['phases']['dispatch']['subtract']['count'] == 3, stats['phases']
+    assert stats['cache']['hits'] == 1 and stats['cache']['entries'] == 1, stats['cache']
+    assert stats['admission']['subtract']['capacity'] == 100, stats['admission']
+    samples = prometheus_samples(metrics.prometheus(rpc.cache))
+    assert samples['jsonrpc_requests_total', 'method="subtract"'] == 3
+    assert samples['jsonrpc_errors_total', 'method="subtract",code="-32602"'] == 1
+    assert samples['jsonrpc_errors_total', 'method="",code="-32700"'] == 1
+    assert samples['jsonrpc_cache_hits_total', ''] == 1 and samples['jsonrpc_cache_entries', ''] == 1
+    labels = 'phase="dispatch",method="subtract"'
+    buckets = [samples['jsonrpc_phase_seconds_bucket', f'{labels},le="{bound:g}"'] for bound in BUCKETS]
+    assert buckets == sorted(buckets), buckets
+    assert samples['jsonrpc_phase_seconds_bucket', f'{labels},le="+Inf"'] == samples['jsonrpc_phase_seconds_count', labels] == 3
+
+
+def test_label_escaping():
+    rpc = Registry()
+    metrics = attach_metrics(rpc)
+    rpc.register('we"ird\\name', lambda params: 1)
+    rpc.handle(request('we"ird\\name', None))
+    samples = prometheus_samples(metrics.prometheus())
+    assert samples['jsonrpc_requests_total', 'method="we\\"ird\\\\name"'] == 1, samples
+
+
+def get(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        conn.request('GET', path)
+        resp = conn.getresponse()
+        return resp.status, resp.getheader('Content-Type'), resp.read().decode('utf-8')
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('flags', [('--workers', '2'), ('--async',)])
+def test_http_metrics(flags):
+    with http_server(solution('002-subtract'), '--metrics', *flags) as port:
+        post(port, call('subtract', [5, 3]))
+        status, content_type, text = get(port, '/metrics?x=1')
+        assert status == 200 and content_type.startswith('text/plain; version=0.0.4'), flags
+        assert prometheus_samples(text)['jsonrpc_requests_total', 'method="subtract"'] == 1, (flags, text)
+    with http_server(solution('002-subtract'), *flags) as port:
+        assert get(port, '/metrics')[0] == 404, flags
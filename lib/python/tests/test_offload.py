@@ -0,0 +1,150 @@
+"""The process-pool offload backend (`jsonrpc.offload`)."""
+import os
+import random
+import socket
+import time
+from array import array
+
+import pytest
+
+from jsonrpc import InvalidParams, Registry
+from jsonrpc.offload import CALL_TIMEOUT, SHARE_ABOVE, attach_offload_pool, pack, unpack
+
+from support import load_solution, request
+
+SHM_DIR = '/dev/shm'
+
+
+@pytest.fixture
+def pools():
+    """Attach offload pools through `pools(registry, ...)`; their workers are stopped afterwards."""
+    attached = []
+
+    def attach(registry, *args, **kwargs):
+        pool = attach_offload_pool(registry, *args, **kwargs)
+        attached.append(pool)
+        return pool
+    yield attach
+    for pool in attached:
+        pool.close()
+
+
+def shared_blocks():
+    return {name for name in os.listdir(SHM_DIR) if name.startswith('psm_')} if os.path.isdir(SHM_DIR) else set()
+
+
+def worker_registry():
+    rpc = Registry()
+
+    @rpc.method('total', offload='process')
+    def total(values):
+        if len(values) and values[0] < 0:
+            raise InvalidParams('negative')
+        return sum(values)
+
+    @rpc.method('stall', offload='process')
+    def stall(values):
+        time.sleep(5)
+
+    @rpc.method('sleep', offload='process')
+    def sleep(seconds):
+        time.sleep(seconds)
+        return os.getpid()
+
+    @rpc.method('crash', offload='process')
+    def crash(params):
+        os._exit(1)
+    return rpc
+
+
+def test_pack_round_trip():
+    big = array('d', range(SHARE_ABOVE // 8))
+    rows = [array('q', range(i, i + 100)) for i in range(0, 100 * 100, 100)]
+    small = array('d', [1.5])
+    args = (big, rows, small, [1, 2], 'x')
+    packed, shm = pack(args)
+    try:
+        assert shm is not None and packed[2:] == args[2:]
+        assert unpack(packed, shm.name) == args
+    finally:
+        shm.close()
+        shm.unlink()
+    assert pack((small, [1.0] * SHARE_ABOVE)) == ((small, [1.0] * SHARE_ABOVE), None)
+
+
+@pytest.mark.parametrize('exercise, bodies', [
+    ('005-prime-factors', [97, [2, 3, 4], list(range(2, 300)), [4294967291, 4294967295] * 40, ['x']]),
+    ('006-matrix-multiply', [
+        {'a': [[1, 2], [3, 4]], 'b': [[5, 6], [7, 8]]},
+        {'a': [[random.randint(-9, 9) for _ in range(40)] for _ in range(40)],
+         'b': [[random.randint(-9, 9) for _ in range(40)] for _ in range(40)]},
+        # Float rows of 64 KiB and more go through shared memory
+        {'a': [[random.random() for _ in range(100)] for _ in range(100)],
+         'b': [[random.random() for _ in range(100)] for _ in range(100)]},
+        {'a': [[1, 2]], 'b': [[1, 2]]},
+    ]),
+])
+def test_offloaded_results_equal_inline_results(pools, exercise, bodies):
+    rpc = load_solution(exercise).rpc
+    method = next(iter(rpc._process))
+    inline = [rpc.handle(request(method, params, i)) for i, params in enumerate(bodies)]
+    pool = pools(rpc, 2)
+    assert [rpc.handle(request(method, params, i)) for i, params in enumerate(bodies)] == inline
+    assert pool.replaced == 0
+
+
+def test_errors_cross_the_boundary(pools):
+    rpc = worker_registry()
+    pools(rpc, 1)
+    assert rpc.handle(request('total', [-1]))['error'] == {'code': -32602, 'message': 'Invalid params: negative'}
+    assert rpc.handle(request('total', [1, 2]))['result'] == 3
+
+
+def test_timeout_replaces_the_worker(pools):
+    rpc = worker_registry()
+    pool = pools(rpc, 1, timeout=0.2)
+    pid = rpc.handle(request('sleep', 0))['result']
+    started = time.monotonic()
+    reply = rpc.handle(request('sleep', 5))
+    assert time.monotonic() - started < 2
+    assert reply['error'] == {'code': CALL_TIMEOUT, 'message': 'Call timed out', 'data': {'timeout_ms': 200}}
+    assert pool.replaced == 1
+    replacement = rpc.handle(request('sleep', 0))['result']
+    assert replacement != pid
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+
+
+def test_dead_worker_is_replaced(pools):
+    rpc = worker_registry()
+    pool = pools(rpc, 1)
+    assert rpc.handle(request('crash', None))['error']['code'] == -32603
+    assert pool.replaced == 1
+    assert rpc.handle(request('total', [1, 2]))['result'] == 3
+
+
+@pytest.mark.skipif(not os.path.isdir(SHM_DIR), reason='no /dev/shm')
+def test_shared_blocks_are_unlinked(pools):
+    rpc = worker_registry()
+    pools(rpc, 1, timeout=0.5)
+    big = array('d', range(SHARE_ABOVE // 8))
+    before = shared_blocks()
+    assert rpc.handle(request('total', big))['result'] == sum(big)
+    assert rpc.handle(request('total', array('d', [-1.0]) + big))['error']['code'] == -32602
+    assert rpc.handle(request('stall', big))['error']['code'] == CALL_TIMEOUT
+    assert shared_blocks() == before
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason='no /proc/self/fd')
+def test_workers_drop_inherited_sockets(pools):
+    rpc = Registry()
+
+    @rpc.method('sockets', offload='process')
+    def sockets(params):
+        links = [f'/proc/self/fd/{fd}' for fd in os.listdir('/proc/self/fd')]
+        return sum(os.readlink(link).startswith('socket:') for link in links if os.path.exists(link))
+
+    # Sockets the server opened before its workers were forked: only the worker's own pipe remains
+    with socket.create_server(('127.0.0.1', 0)) as listener, socket.create_connection(listener.getsockname()):
+        pools(rpc, 2)
+        assert [rpc.handle(request('sockets', None, i))['result'] for i in range(2)] == [1, 1]
@@ -0,0 +1,38 @@
+"""005 `primeFactors`: the table, gcd and Pollard rho paths against plain trial division."""
+import random
+
+from support import load_solution
+
+primes = load_solution('005-prime-factors')
+
+
+def trial_division(n):
+    factors = []
+    p = 2
+    while p * p <= n:
+        while n % p == 0:
+            factors.append(p)
+            n //= p
+        p += 1
+    return factors + [n] if n > 1 else factors
+
+
+def test_factor_matches_trial_division():
+    rng = random.Random(5)
+    values = [2, 3, 4, primes.TABLE_LIMIT, primes.TABLE_LIMIT + 1, 2 ** 31, 3 ** 20, primes.MAX_U32,
+              # Largest 32-bit prime, squares and products of primes just above and below 1625
+              4294967291, 1627 ** 2, 1621 ** 3, 1621 * 1627 * 1627,
+              # Parts made of trial primes that exceed the table
+              3 ** 11 * 1627, 2 ** 17 * 32749, 1613 * 1619 * 1621]
+    values += [rng.randint(2, primes.MAX_U32) for _ in range(300)]
+    values += [rng.choice(primes.PRIMES[-2000:]) * rng.choice(primes.PRIMES[-2000:]) for _ in range(50)]
+    for n in values:
+        assert primes.factor(n) == trial_division(n), n
+
+
+def test_factor_many_matches_factor():
+    values = [6, 4294967291, 6, 1627 ** 2, 97]
+    result = primes.factor_many(values)
+    assert result == [primes.factor(n) for n in values]
+    # Repeated inputs get their own lists
+    assert result[0] is not result[2]
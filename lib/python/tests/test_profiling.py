@@ -0,0 +1,117 @@
+"""Profiling captures, their triggers, and the slow-request log (`jsonrpc.profiling`)."""
+import json
+import os
+import pstats
+import signal
+import time
+
+from jsonrpc import Registry
+from jsonrpc.profiling import PROFILE_BUSY, UNAUTHORIZED, SlowLog, attach_profiler
+
+from support import call, request
+
+
+def work_registry():
+    rpc = Registry()
+
+    @rpc.method('work')
+    def work(params):
+        time.sleep(params[0])
+        return params[0]
+    return rpc
+
+
+def profile(rpc, **params):
+    return rpc.handle(request('rpc.profile', params))
+
+
+def wait_for_file(path):
+    deadline = time.monotonic() + 5
+    while not os.path.exists(path):
+        assert time.monotonic() < deadline, f'{path} was not written'
+        time.sleep(0.01)
+
+
+def test_cprofile_capture(tmp_path):
+    rpc = work_registry()
+    attach_profiler(rpc, str(tmp_path), 'secret', signum=None)
+    path = profile(rpc, token='secret', mode='cprofile', requests=2)['result']['path']
+    assert path.endswith('.pstats') and os.path.dirname(path) == str(tmp_path)
+    for i in range(3):
+        rpc.handle(request('work', [0], i))
+    wait_for_file(path)
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert 'work' in functions
+
+
+def test_sample_capture(tmp_path):
+    rpc = work_registry()
+    attach_profiler(rpc, str(tmp_path), 'secret', signum=None)
+    path = profile(rpc, token='secret', mode='sample', seconds=0.5)['result']['path']
+    assert path.endswith('.folded')
+    rpc.handle(request('work', [0.2]))
+    wait_for_file(path)
+    with open(path) as f:
+        stacks = [line.rsplit(' ', 1) for line in f.read().splitlines()]
+    assert stacks and all(int(n) > 0 for _, n in stacks)
+    assert any(stack.split(';')[-1].startswith('work (') for stack, _ in stacks), stacks
+
+
+def test_profile_method_needs_the_token(tmp_path):
+    rpc = work_registry()
+    profiler = attach_profiler(rpc, str(tmp_path), 'secret', signum=None)
+    for params in ({}, {'token': 'wrong'}, {'token': None}):
+        assert profile(rpc, **params)['error'] == {'code': UNAUTHORIZED, 'message': 'Unauthorized'}, params
+    assert rpc.handle(request('rpc.profile', ['secret']))['error']['code'] == UNAUTHORIZED
+    assert profiler.capture is None
+    assert profile(rpc, token='secret', mode='trace')['error']['code'] == -32602
+    assert profile(rpc, token='secret', seconds=0)['error']['code'] == -32602
+    profile(rpc, token='secret', mode='cprofile', seconds=5)
+    assert profile(rpc, token='secret')['error']['code'] == PROFILE_BUSY
+    profiler.stop()
+    # Without a token the method does not exist
+    rpc = work_registry()
+    attach_profiler(rpc, str(tmp_path), None, signum=None)
+    assert profile(rpc, token='secret')['error']['code'] == -32601
+
+
+def test_signal_starts_the_default_capture(tmp_path):
+    rpc = work_registry()
+    previous = signal.getsignal(signal.SIGUSR1)
+    try:
+        profiler = attach_profiler(rpc, str(tmp_path))
+        os.kill(os.getpid(), signal.SIGUSR1)
+        deadline = time.monotonic() + 5
+        while profiler.capture is None:
+            assert time.monotonic() < deadline, 'SIGUSR1 started no capture'
+            time.sleep(0.01)
+        path = profiler.capture.path
+        assert path.endswith('.folded')
+        rpc.handle(request('work', [0.05]))
+        profiler.stop()
+        wait_for_file(path)
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+
+
+def test_slow_log_records_slow_requests_once(tmp_path):
+    rpc = work_registry()
+    path = str(tmp_path / 'slow.log')
+    rpc.set_slow_log(SlowLog(0.05, path))
+    for i, delay in enumerate((0.001, 0.1, 0.001)):
+        rpc.encode(rpc.handle_json(call('work', [delay], i)))
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 1, records
+    record = records[0]
+    assert record['total_ms'] >= 50 and record['bytes'] == len(call('work', [0.1], 1))
+    assert [c['method'] for c in record['calls']] == ['work'] and record['calls'][0]['dispatch_ms'] >= 50
+    assert record['calls'][0]['params_bytes'] == len('[0.1]')
+
+
+def test_slow_log_skips_fast_requests(tmp_path):
+    rpc = work_registry()
+    path = str(tmp_path / 'slow.log')
+    rpc.set_slow_log(SlowLog(0.05, path))
+    rpc.encode(rpc.handle_json(call('work', [0])))
+    assert not os.path.exists(path)
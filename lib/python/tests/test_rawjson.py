@@ -0,0 +1,65 @@
+"""`raw_params`: members passed through as their source text (`jsonrpc.rawjson`)."""
+import json
+
+from jsonrpc import Registry, dumps
+from jsonrpc.rawjson import RawJSON
+
+PAYLOAD = '{ "b" : [1.0, 1e2, -0, "\\u00e9", 123456789012345678901234567890],"a":{} }'
+
+
+def echo_registry():
+    """`echo` returns its raw `payload`; `other` gets a `payload` member decoded."""
+    rpc = Registry()
+    rpc.seen = []
+
+    def payload(params):
+        return params['payload'],
+
+    @rpc.method('echo', params=payload, raw_params=('payload',))
+    def echo(value):
+        rpc.seen.append(value)
+        return {'payload': value}
+
+    @rpc.method('other', params=payload)
+    def other(value):
+        rpc.seen.append(value)
+        return {'payload': value}
+    return rpc
+
+
+def body(method, payload=PAYLOAD, id_=1):
+    return '{"jsonrpc": "2.0", "method": "%s", "params": {"payload": %s}, "id": %d}' % (method, payload, id_)
+
+
+def test_payload_text_is_passed_through():
+    rpc = echo_registry()
+    for raw in (body('echo'), body('echo').encode('utf-8')):
+        out = dumps(rpc.handle_json(raw))
+        assert out == '{"jsonrpc":"2.0","result":{"payload":%s},"id":1}' % PAYLOAD
+    value = rpc.seen[0]
+    assert isinstance(value, RawJSON) and value.text == PAYLOAD and value.decode() == json.loads(PAYLOAD)
+
+
+def test_other_methods_get_decoded_values():
+    rpc = echo_registry()
+    assert json.loads(dumps(rpc.handle_json(body('other'))))['result'] == {'payload': json.loads(PAYLOAD)}
+    assert rpc.seen == [json.loads(PAYLOAD)]
+
+
+def test_fallback_to_a_normal_decode():
+    rpc = echo_registry()
+    expected = {'payload': json.loads(PAYLOAD)}
+    # The scanner only takes single UTF-8 request objects; a batch, or a body in
+    # another encoding, is decoded as a whole and its payload re-encoded
+    replies = rpc.handle_json('[%s, %s]' % (body('echo', id_=1), body('echo', id_=2)))
+    assert [json.loads(dumps(r))['result'] for r in replies] == [expected, expected]
+    reply = rpc.handle_json(body('echo').encode('utf-16'))
+    assert json.loads(dumps(reply))['result'] == expected
+    assert not any(isinstance(value, RawJSON) for value in rpc.seen)
+
+
+def test_invalid_payload_is_a_parse_error():
+    rpc = echo_registry()
+    for payload in ('{"a": }', '[1, 2', 'nul', '"\\x"'):
+        assert rpc.handle_json(body('echo', payload))['error']['code'] == -32700, payload
+    assert rpc.seen == []
@@ -0,0 +1,93 @@
+"""The stdio transports: one-shot `serve_stdio` and the persistent `serve_stdio_stream`."""
+import io
+import json
+import subprocess
+import sys
+
+from jsonrpc import Registry
+from jsonrpc.transport import serve_stdio_stream
+
+from support import call, solution
+
+
+def subtract_registry():
+    rpc = Registry()
+
+    @rpc.method('subtract')
+    def subtract(params):
+        return params[0] - params[1]
+    return rpc
+
+
+def frame(body, length=None):
+    return b'Content-Length: %s\r\n\r\n' % (str(len(body)).encode() if length is None else length) + body
+
+
+def read_frames(data):
+    """The JSON bodies of the Content-Length framed replies in `data`."""
+    replies = []
+    while data:
+        head, _, rest = data.partition(b'\r\n\r\n')
+        length = int(head.split(b':')[1])
+        replies.append(json.loads(rest[:length]))
+        data = rest[length:]
+    return replies
+
+
+def stdio_stream(data, registry=None, **kwargs):
+    out = io.BytesIO()
+    serve_stdio_stream(registry or subtract_registry(), io.BytesIO(data), out, **kwargs)
+    return out.getvalue()
+
+
+def test_stream_json_lines():
+    notification = b'{"jsonrpc": "2.0", "method": "subtract", "params": [1, 1]}'
+    data = call('subtract', [5, 3]) + b'\n\n' + notification + b'\n' + call('subtract', [1, 3], 2) + b'\n'
+    lines = stdio_stream(data).splitlines()
+    assert [json.loads(line) for line in lines] == [{'jsonrpc': '2.0', 'result': 2, 'id': 1},
+                                                    {'jsonrpc': '2.0', 'result': -2, 'id': 2}]
+
+
+def test_stream_framed():
+    data = frame(call('subtract', [5, 3])) + frame(call('subtract', [1, 3], 2))
+    assert read_frames(stdio_stream(data)) == [{'jsonrpc': '2.0', 'result': 2, 'id': 1},
+                                               {'jsonrpc': '2.0', 'result': -2, 'id': 2}]
+
+
+def test_stream_framing_over_max_body():
+    # The oversized frame is skipped whole; the next one is still answered
+    data = frame(b'[' + b' ' * 200 + b']') + frame(call('subtract', [5, 3], 2))
+    replies = read_frames(stdio_stream(data, max_body=100))
+    assert [r.get('error', {}).get('code') for r in replies] == [-32700, None], replies
+    assert replies[0]['error']['message'] == 'Parse error: body exceeds 100 bytes', replies
+    assert replies[1]['result'] == 2, replies
+
+
+def test_stream_framing_invalid_length():
+    for length in (b'-1', b'abc', b'+5', b'1_0'):
+        data = frame(call('subtract', [5, 3]), length) + frame(call('subtract', [5, 3], 2))
+        replies = read_frames(stdio_stream(data))
+        # Nothing after a frame of unknown length can be read
+        assert replies == [{'jsonrpc': '2.0', 'error': {'code': -32700, 'message': 'Parse error: invalid Content-Length'},
+                            'id': None}], (length, replies)
+
+
+def test_stream_framing_missing_length():
+    replies = read_frames(stdio_stream(b'Content-Type: application/json\r\n\r\n' + call('subtract', [5, 3])))
+    assert replies == [{'jsonrpc': '2.0', 'error': {'code': -32700, 'message': 'Parse error: missing Content-Length'},
+                        'id': None}], replies
+
+
+def test_stream_replies_before_the_next_request():
+    # Each reply is flushed as soon as it is written, so a client can wait for it
+    proc = subprocess.Popen([sys.executable, solution('002-subtract'), '--stdio-stream'],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        for i in range(3):
+            proc.stdin.write(call('subtract', [10, i], i) + b'\n')
+            proc.stdin.flush()
+            assert json.loads(proc.stdout.readline()) == {'jsonrpc': '2.0', 'result': 10 - i, 'id': i}
+        proc.stdin.close()
+        assert proc.wait(10) == 0
+    finally:
+        proc.kill()
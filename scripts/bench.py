@@ -0,0 +1,672 @@
+#!/usr/bin/env python3
+"""
+Load generator / latency benchmark for the JSON-RPC solutions.
+
+Replays the fixtures in tests/<exercise>/request-*.json, plus synthetic larger
+payloads for the exercise's method, against a solution and reports throughput
+and p50/p95/p99/max latency. A machine-readable JSON result is written so runs
+can be compared (see --output).
+
+Transports:
+  http          start the solution as an HTTP server (python `server.py --http`,
+                or the `command` from config.yaml, e.g. plackup app.psgi) on a free
+                port, or target an already running server with --url; clients share
+                one pool of keep-alive connections (`jsonrpc.client`), and with
+                --batch-window single calls from concurrent clients are sent as batches
+  stdio         one process per request (`python server.py` / `perl server.pl`)
+  stdio-stream  one long-lived `server.py --stdio-stream` per client (Python only;
+                notification-only payloads are skipped because they get no reply)
+
+Regression gate (--suite):
+  runs the fixed SUITE benchmarks (subtract dispatch, primeFactors on the largest
+  32-bit primes, 200x200 matmul, fibStream with a large count, deep mergeObjects)
+  and compares throughput and p50/p95 latency with benchmarks/baseline-<lang>.json.
+  A metric worse than --tolerance, or any reply that is not a `result` (an
+  error answer would otherwise look fast), fails the run with exit code 2, like
+  run-tests.py. The first run (or --update-baseline) records the baseline instead.
+  The gate is run by hand: timings depend on the machine, so no baseline is
+  committed and CI does not run it; record one on the machine you compare on.
+
+Examples:
+  python3 scripts/bench.py -e 002-subtract --lang python --concurrency 8 --requests 5000
+  python3 scripts/bench.py -e 005-prime-factors --lang perl --transport stdio --requests 200
+  python3 scripts/bench.py -e 002-subtract --url http://127.0.0.1:4000/ --rate 500 --duration 10
+  python3 scripts/bench.py --suite --tolerance 0.2
+"""
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import random
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS_DIR = os.path.join(ROOT, 'tests')
+SOLUTIONS_DIR = os.path.join(ROOT, 'solutions')
+TMP_DIR = os.path.join(ROOT, 'tmp')
+
+
+def load_runner():
+    # run-tests.py is not importable by name (hyphen); reuse its solution/server helpers
+    spec = importlib.util.spec_from_file_location('run_tests', os.path.join(ROOT, 'scripts', 'run-tests.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+runner = load_runner()
+# load_runner() has put lib/python on sys.path
+from jsonrpc.client import Client  # noqa: E402
+from jsonrpc.core import RpcError  # noqa: E402
+
+
+# --- workload -----------------------------------------------------------------
+
+def fixture_payloads(exercise):
+    """[(name, body str)] for every request fixture of the exercise."""
+    exercise_dir = os.path.join(TESTS_DIR, exercise)
+    payloads = []
+    for name in sorted(os.listdir(exercise_dir)):
+        if name.startswith('request-') and name.endswith('.json'):
+            with open(os.path.join(exercise_dir, name), 'r') as fh:
+                payloads.append((name, fh.read()))
+    return payloads
+
+
+def _call(method, params, id_=1):
+    return json.dumps({"jsonrpc": "2.0", "method": method, "params": params, "id": id_}, separators=(',', ':'))
+
+
+def _nested(depth, leaf):
+    obj = leaf
+    for i in range(depth):
+        obj = {f'k{i % 7}': obj}
+    return obj
+
+
+# Synthetic payloads per method: name -> builder(rng) returning a request body
+SYNTHETIC = {
+    'sum': {
+        'sum-10k': lambda rng: _call('sum', [rng.randint(-1000, 1000) for _ in range(10000)]),
+    },
+    'subtract': {
+        'subtract-small': lambda rng: _call('subtract', [42, 23]),
+        'subtract-batch-1000': lambda rng: json.dumps([json.loads(_call('subtract', [i, 1], i)) for i in range(1000)]),
+    },
+    'multiply': {
+        'multiply-1k': lambda rng: _call('multiply', [rng.choice((1, -1, 2)) for _ in range(1000)]),
+    },
+    'divide': {
+        'divide-batch-1000': lambda rng: json.dumps([json.loads(_call('divide', [i + 1, 2], i)) for i in range(1000)]),
+    },
+    'primeFactors': {
+        'primeFactors-u32-max': lambda rng: _call('primeFactors', 4294967295),
+        'primeFactors-200-u32': lambda rng: _call('primeFactors', [rng.randint(2 ** 31, 2 ** 32 - 1) for _ in range(200)]),
+    },
+    'matmul': {
+        'matmul-50x50': lambda rng: _call('matmul', {
+            'a': [[rng.randint(-9, 9) for _ in range(50)] for _ in range(50)],
+            'b': [[rng.randint(-9, 9) for _ in range(50)] for _ in range(50)],
+        }),
+    },
+    'fibStream': {
+        'fibStream-1000': lambda rng: _call('fibStream', {'start': 0, 'count': 1000}),
+        'fibStream-far-window': lambda rng: _call('fibStream', {'start': 900, 'count': 100}),
+    },
+    'mergeObjects': {
+        'mergeObjects-wide-10k': lambda rng: _call('mergeObjects', {
+            'items': [{f'key{i}': i for i in range(10000)}, {f'key{i}': -i for i in range(0, 10000, 2)}],
+        }),
+        'mergeObjects-deep-500': lambda rng: _call('mergeObjects', {
+            'items': [_nested(500, {'x': [1]}), _nested(500, {'x': [2], 'y': 1})], 'strategy': 'concat',
+        }),
+    },
+    'echoWithMeta': {
+        'echoWithMeta-1MB': lambda rng: _call('echoWithMeta', {
+            'payload': {'blob': 'x' * (1024 * 1024)}, 'meta': {'user': 'bench', '_secret': 's'},
+        }),
+    },
+    'reverse': {
+        'reverse-100KB': lambda rng: _call('reverse', ['mañana 🙂 ' * 10000]),
+    },
+}
+
+
+def exercise_methods(exercise):
+    """Method names used by the exercise's fixtures."""
+    methods = set()
+    for _, body in fixture_payloads(exercise):
+        try:
+            req = json.loads(body)
+        except Exception:
+            continue
+        for r in (req if isinstance(req, list) else [req]):
+            if isinstance(r, dict) and r.get('method') in SYNTHETIC:
+                methods.add(r['method'])
+    return sorted(methods)
+
+
+def synthetic_payloads(exercise, seed=0):
+    rng = random.Random(seed)
+    payloads = []
+    for method in exercise_methods(exercise):
+        for name, build in SYNTHETIC[method].items():
+            payloads.append((name, build(rng)))
+    return payloads
+
+
+def is_json(body):
+    try:
+        json.loads(body)
+        return True
+    except Exception:
+        return False
+
+
+def expects_reply(body):
+    """False for a notification or an all-notification batch (nothing comes back)."""
+    try:
+        req = json.loads(body)
+    except Exception:
+        return True
+    reqs = req if isinstance(req, list) and req else [req]
+    return any(not isinstance(r, dict) or 'id' in r for r in reqs)
+
+
+# --- clients ------------------------------------------------------------------
+
+class HttpClient:
+    """A benchmark worker's handle on the run's shared `jsonrpc.client.Client`.
+
+    With auto-batching, a body holding one call is issued with `Client.call`, so
+    calls from concurrent workers are coalesced; an error reply is still a reply.
+    Anything else (batches, notifications, invalid JSON) is posted as is.
+    """
+
+    def __init__(self, pool, batching=False):
+        self.pool = pool
+        self.batching = batching
+        self.calls = {}
+
+    def call(self, body):
+        if self.batching:
+            req = self.calls.get(body)
+            if req is None:
+                req = self.calls[body] = single_call(body)
+            if req:
+                try:
+                    return self.pool.call(req['method'], req.get('params'))
+                except RpcError as e:
+                    return e
+        return self.pool.send(body)
+
+    def close(self):
+        pass
+
+
+def single_call(body):
+    """The request object when `body` is one call with an id, else False."""
+    try:
+        req = json.loads(body)
+    except Exception:
+        return False
+    if isinstance(req, dict) and req.get('jsonrpc') == '2.0' and isinstance(req.get('method'), str) and 'id' in req:
+        return req
+    return False
+
+
+class StdioClient:
+    """Spawns the solution once per request, like run-tests.py --spawn-per-test."""
+
+    def __init__(self, cmd):
+        self.cmd = cmd
+
+    def call(self, body):
+        proc = subprocess.run(self.cmd, input=body.encode('utf-8'), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        if proc.returncode != 0:
+            raise RuntimeError(f'exit status {proc.returncode}')
+        return proc.stdout
+
+    def close(self):
+        pass
+
+
+class StdioStreamClient:
+    """Keeps one `server.py --stdio-stream` process and exchanges one line per call."""
+
+    def __init__(self, cmd):
+        self.proc = subprocess.Popen(cmd + ['--stdio-stream'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def call(self, body):
+        self.proc.stdin.write(body.encode('utf-8') + b'\n')
+        self.proc.stdin.flush()
+        line = self.proc.stdout.readline()
+        if not line:
+            raise RuntimeError('server closed stdout')
+        return line
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait(timeout=10)
+
+
+# --- server start-up ------------------------------------------------------------
+
+def solution_command(exercise, lang):
+    if lang == 'python':
+        path = runner.find_python_solution(exercise)
+        return [sys.executable, path] if path else None
+    path = runner.find_perl_solution(exercise)
+    return ['perl', path] if path else None
+
+
+def start_http_server(exercise, lang, host='127.0.0.1', server_args=()):
+    """Start the solution's HTTP server on a free port; returns (process, url).
+
+    `server_args` are passed to `server.py` (not to a config.yaml command).
+    """
+    port = runner.find_free_port(host)
+    env = os.environ.copy()
+    env['TEST_HOST'] = host
+    env['TEST_PORT'] = port
+    config_path = os.path.join(SOLUTIONS_DIR, exercise, 'code', lang, 'config.yaml')
+    cmd = None
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as fh:
+            cfg = runner.yaml.safe_load(fh) or {}
+        if cfg.get('command'):
+            cmd = cfg['command'] if isinstance(cfg['command'], list) else shlex.split(cfg['command'])
+            configured_port = str(cfg.get('port', ''))
+            cmd = [port if str(x) == configured_port else str(x) for x in cmd] + [host, port]
+    if cmd is None:
+        base = solution_command(exercise, lang)
+        if base is None:
+            raise SystemExit(f'No {lang} solution found for {exercise}')
+        cmd = base + ['--http'] + list(server_args)
+    try:
+        proc = subprocess.Popen(cmd, cwd=ROOT, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=env)
+    except OSError as e:
+        raise RuntimeError(f'Could not start {cmd[0]}: {e}')
+    ready, stderr = runner.wait_until_ready(proc, host, port, timeout=10)
+    if not ready:
+        raise RuntimeError(f'Server did not start: {stderr}')
+    return proc, f'http://{host}:{port}/'
+
+
+# --- load loop ------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    # Rank ceil(pct% of n); round() would round halves to even and pick the wrong rank
+    k = max(0, min(len(sorted_values) - 1, math.ceil(pct * len(sorted_values) / 100.0) - 1))
+    return sorted_values[k]
+
+
+def summarise(latencies, errors, elapsed):
+    values = sorted(latencies)
+    ms = lambda v: None if v is None else round(v * 1000, 3)  # noqa: E731
+    return {
+        'requests': len(values) + errors,
+        'errors': errors,
+        'throughput_rps': round(len(values) / elapsed, 2) if elapsed > 0 else None,
+        'latency_ms': {
+            'mean': ms(sum(values) / len(values)) if values else None,
+            'p50': ms(percentile(values, 50)),
+            'p95': ms(percentile(values, 95)),
+            'p99': ms(percentile(values, 99)),
+            'max': ms(values[-1] if values else None),
+        },
+    }
+
+
+def run_load(make_client, payloads, concurrency, total_requests=None, duration=None, rate=None, warmup=0, check=None):
+    """Drive `concurrency` workers over `payloads` round-robin.
+
+    A call that raises counts as an error, and so does a reply that `check`
+    rejects (by raising).
+
+    Stops after `total_requests` calls or `duration` seconds. With `rate`
+    (requests/s across all workers) calls are paced on a fixed schedule and
+    latency is measured from the scheduled send time, so a stalled server is
+    not hidden by workers that simply send less (coordinated omission).
+    """
+    lock = threading.Lock()
+    counter = [0]
+    per_payload = {name: {'latencies': [], 'errors': 0} for name, _ in payloads}
+    all_latencies = []
+    errors = [0]
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    def next_index():
+        with lock:
+            i = counter[0]
+            if total_requests is not None and i >= total_requests + warmup:
+                return None
+            counter[0] += 1
+            return i
+
+    def worker():
+        client = make_client()
+        try:
+            while True:
+                i = next_index()
+                if i is None:
+                    return
+                scheduled = started + i / rate if rate else None
+                now = time.perf_counter()
+                if deadline and now >= deadline:
+                    return
+                if scheduled and scheduled > now:
+                    time.sleep(scheduled - now)
+                name, body = payloads[i % len(payloads)]
+                t0 = scheduled if scheduled else time.perf_counter()
+                try:
+                    reply = client.call(body)
+                    latency = time.perf_counter() - t0
+                    if check is not None:
+                        check(reply)
+                    if i >= warmup:
+                        with lock:
+                            all_latencies.append(latency)
+                            per_payload[name]['latencies'].append(latency)
+                except Exception:
+                    if i >= warmup:
+                        with lock:
+                            errors[0] += 1
+                            per_payload[name]['errors'] += 1
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    result = summarise(all_latencies, errors[0], elapsed)
+    result['elapsed_s'] = round(elapsed, 3)
+    result['payloads'] = {name: summarise(v['latencies'], v['errors'], elapsed) for name, v in per_payload.items()}
+    return result
+
+
+def print_report(result):
+    lat = result['latency_ms']
+    print(f"Requests: {result['requests']}  errors: {result['errors']}  elapsed: {result['elapsed_s']} s")
+    print(f"Throughput: {result['throughput_rps']} req/s")
+    print(f"Latency ms: mean {lat['mean']}  p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  max {lat['max']}")
+    print('Per payload:')
+    for name, r in result['payloads'].items():
+        pl = r['latency_ms']
+        print(f"  {name:32} n={r['requests']:<6} err={r['errors']:<4} p50={pl['p50']} p99={pl['p99']} max={pl['max']}")
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description='Throughput / latency benchmark for JSON-RPC solutions')
+    parser.add_argument('--exercise', '-e', help='Exercise directory under tests/ (e.g. 002-subtract); required unless --suite')
+    parser.add_argument('--lang', default='python', help='Solution language: python or perl (default: python)')
+    parser.add_argument('--transport', choices=('http', 'stdio', 'stdio-stream'), default='http', help='How to talk to the solution (default: http)')
+    parser.add_argument('--url', help='Benchmark an already running HTTP server instead of starting one')
+    parser.add_argument('--payloads', default='fixtures,synthetic', help='Comma-separated workload sets: fixtures, synthetic (default: both)')
+    parser.add_argument('--concurrency', '-c', type=int, default=1, help='Concurrent clients (default: 1)')
+    parser.add_argument('--requests', '-n', type=int, default=None, help='Total requests to send (default: 1000 unless --duration)')
+    parser.add_argument('--duration', '-d', type=float, default=None, help='Run for this many seconds')
+    parser.add_argument('--rate', '-r', type=float, default=None, help='Target request rate across all clients (req/s); default: as fast as possible')
+    parser.add_argument('--compress', action='store_true', help='--transport http: accept gzip/deflate responses (a server.py started here gets --compress)')
+    parser.add_argument('--batch-window', type=float, default=None, help='--transport http: coalesce single calls issued within this many ms into batch requests')
+    parser.add_argument('--warmup', type=int, default=0, help='Leading requests excluded from the statistics')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for synthetic payloads')
+    parser.add_argument('--output', '-o', help='Write the JSON result here (default: tmp/bench-<exercise>-<lang>-<transport>-<timestamp>.json)')
+    parser.add_argument('--suite', action='store_true', help='Run the fixed regression suite (SUITE) and compare it with the baseline file')
+    parser.add_argument('--baseline', help='Baseline file for --suite (default: benchmarks/baseline-<lang>.json)')
+    parser.add_argument('--update-baseline', action='store_true', help='--suite: overwrite the baseline with this run instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='--suite: allowed relative slowdown per metric before failing (default: 0.25)')
+    parser.add_argument('--only', help='--suite: comma-separated benchmark names to run')
+    return parser
+
+
+def collect_payloads(exercise, kinds, seed=0):
+    payloads = []
+    if 'fixtures' in kinds:
+        payloads += fixture_payloads(exercise)
+    if 'synthetic' in kinds:
+        payloads += synthetic_payloads(exercise, seed)
+    return payloads
+
+
+def make_client_factory(args, exercise):
+    """Returns (client factory, cleanup callable)."""
+    if args.transport == 'http':
+        proc = None
+        url = args.url
+        if not url:
+            try:
+                proc, url = start_http_server(exercise, args.lang, server_args=['--compress'] if args.compress else ())
+            except RuntimeError as e:
+                raise SystemExit(str(e))
+        window = args.batch_window / 1000 if args.batch_window else None
+        pool = Client(url, pool_size=max(1, args.concurrency), timeout=60, batch_window=window, compress=args.compress)
+
+        def cleanup():
+            pool.close()
+            stop_server(proc)
+        return (lambda: HttpClient(pool, batching=bool(window))), cleanup
+    cmd = solution_command(exercise, args.lang)
+    if cmd is None:
+        raise SystemExit(f'No {args.lang} solution found for {exercise}')
+    if args.transport == 'stdio':
+        return (lambda: StdioClient(cmd)), lambda: None
+    if args.lang != 'python':
+        raise SystemExit('--transport stdio-stream is only supported by the Python solutions')
+    return (lambda: StdioStreamClient(cmd)), lambda: None
+
+
+def stop_server(proc):
+    if proc is None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except Exception:
+        proc.kill()
+
+
+# --- regression suite -------------------------------------------------------------
+
+# Largest primes below 2^32: the worst case for trial division
+U32_PRIMES = [4294967291, 4294967279, 4294967231, 4294967197, 4294967189,
+              4294967161, 4294967143, 4294967111, 4294967087, 4294967029]
+
+# Fixed benchmarks for --suite: name -> (exercise, body builder, requests, warmup)
+SUITE = {
+    'subtract-dispatch': ('002-subtract', lambda: _call('subtract', [42, 23]), 2000, 200),
+    'primeFactors-u32-primes': ('005-prime-factors', lambda: _call('primeFactors', U32_PRIMES * 5), 50, 5),
+    'matmul-200x200': ('006-matrix-multiply', lambda: _call('matmul', {
+        'a': [[(i * 7 + j) % 19 - 9 for j in range(200)] for i in range(200)],
+        'b': [[(i * 5 + j * 3) % 17 - 8 for j in range(200)] for i in range(200)],
+    }), 10, 2),
+    'fibStream-large-count': ('007-fibonacci-stream', lambda: _call('fibStream', {'start': 0, 'count': 1000}), 200, 20),
+    'mergeObjects-deep': ('008-merge-objects', lambda: _call('mergeObjects', {
+        'items': [_nested(500, {'x': [1], 'n': 1}), _nested(500, {'x': [2], 'm': 2}), _nested(500, {'x': [3]})],
+        'strategy': 'concat',
+    }), 200, 20),
+}
+
+
+def expect_results(reply):
+    """Raise unless every response in `reply` carries a `result` (suite payloads are all valid calls)."""
+    if isinstance(reply, RpcError):
+        raise reply
+    resps = json.loads(reply) if reply else None
+    for resp in resps if isinstance(resps, list) else [resps]:
+        if not isinstance(resp, dict) or 'error' in resp or 'result' not in resp:
+            raise RuntimeError(f'not a result: {str(resp)[:200]}')
+
+
+# Metrics compared against the baseline: (key, True when higher is better)
+GATED_METRICS = (('throughput_rps', True), ('p50_ms', False), ('p95_ms', False))
+
+
+def run_benchmark(name, lang):
+    """Run one SUITE entry; returns its metrics, or None if there is no solution.
+
+    Uses HTTP where the solution can serve it (Python, or a config.yaml command),
+    otherwise one process per request over stdio (Perl server.pl).
+    """
+    exercise, build, requests, warmup = SUITE[name]
+    cmd = solution_command(exercise, lang)
+    has_config = os.path.exists(os.path.join(SOLUTIONS_DIR, exercise, 'code', lang, 'config.yaml'))
+    if cmd is None and not has_config:
+        return None
+    payloads = [(name, build())]
+    if lang == 'python' or has_config:
+        proc, url = start_http_server(exercise, lang)
+        pool = Client(url, pool_size=1, timeout=60)
+        try:
+            result = run_load(lambda: HttpClient(pool), payloads, 1, requests, warmup=warmup, check=expect_results)
+        finally:
+            pool.close()
+            stop_server(proc)
+    else:
+        result = run_load(lambda: StdioClient(cmd), payloads, 1, requests, warmup=warmup, check=expect_results)
+    return {
+        'requests': result['requests'],
+        'errors': result['errors'],
+        'throughput_rps': result['throughput_rps'],
+        'p50_ms': result['latency_ms']['p50'],
+        'p95_ms': result['latency_ms']['p95'],
+        'max_ms': result['latency_ms']['max'],
+    }
+
+
+def compare(baseline, current, tolerance):
+    """Returns a list of (benchmark, metric, baseline, current, change, regressed)."""
+    rows = []
+    for name, metrics in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key, higher_is_better in GATED_METRICS:
+            old, new = base.get(key), metrics.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change < -tolerance if higher_is_better else change > tolerance
+            rows.append((name, key, old, new, change, regressed))
+    return rows
+
+
+def run_suite(args):
+    names = [x.strip() for x in args.only.split(',')] if args.only else list(SUITE)
+    unknown = [n for n in names if n not in SUITE]
+    if unknown:
+        raise SystemExit(f"Unknown benchmark(s): {', '.join(unknown)}; choose from: {', '.join(SUITE)}")
+    baseline_path = args.baseline or os.path.join(ROOT, 'benchmarks', f'baseline-{args.lang}.json')
+
+    current = {}
+    failed = False
+    for name in names:
+        try:
+            metrics = run_benchmark(name, args.lang)
+        except RuntimeError as e:
+            print(f'{name}: FAILED ({e})')
+            failed = True
+            continue
+        if metrics is None:
+            print(f'{name}: SKIPPED (no {args.lang} solution for {SUITE[name][0]})')
+            continue
+        print(f"{name}: {metrics['throughput_rps']} req/s  p50 {metrics['p50_ms']} ms  p95 {metrics['p95_ms']} ms  errors {metrics['errors']}")
+        if metrics['errors']:
+            failed = True
+        current[name] = metrics
+
+    baseline = None
+    if os.path.exists(baseline_path) and not args.update_baseline:
+        with open(baseline_path, 'r') as fh:
+            baseline = json.load(fh).get('benchmarks', {})
+
+    if baseline is None:
+        if failed:
+            print('Benchmark errors; baseline not written')
+            return 2
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+        with open(baseline_path, 'w') as fh:
+            json.dump({
+                'lang': args.lang,
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'benchmarks': current,
+            }, fh, indent=2)
+            fh.write('\n')
+        print(f'Baseline written to {baseline_path}')
+        return 0
+
+    print(f'\nCompared with {baseline_path} (tolerance {args.tolerance:.0%}):')
+    for name, key, old, new, change, regressed in compare(baseline, current, args.tolerance):
+        mark = 'REGRESSION' if regressed else 'ok'
+        print(f'  {name:26} {key:15} {old:>12} -> {new:<12} {change:+.1%}  {mark}')
+        failed = failed or regressed
+    missing = sorted(set(current) - set(baseline))
+    if missing:
+        print(f"  Not in baseline (run --update-baseline to record): {', '.join(missing)}")
+    print('Benchmark regression gate: ' + ('FAILED' if failed else 'passed'))
+    return 2 if failed else 0
+
+
+def run_single(args):
+    if not args.exercise:
+        raise SystemExit('--exercise is required (or use --suite)')
+    if not os.path.isdir(os.path.join(TESTS_DIR, args.exercise)):
+        raise SystemExit(f"Unknown exercise {args.exercise}; choose from: {', '.join(sorted(os.listdir(TESTS_DIR)))}")
+    kinds = {x.strip() for x in args.payloads.split(',') if x.strip()}
+    payloads = collect_payloads(args.exercise, kinds, args.seed)
+    if args.transport == 'stdio-stream':
+        # One reply line per request: drop notifications and bodies that are not one JSON document
+        payloads = [(name, json.dumps(json.loads(body))) for name, body in payloads if is_json(body) and expects_reply(body)]
+    if not payloads:
+        raise SystemExit(f'No payloads for {args.exercise}')
+    total_requests = args.requests if args.requests is not None or args.duration else 1000
+
+    make_client, cleanup = make_client_factory(args, args.exercise)
+    try:
+        result = run_load(make_client, payloads, max(1, args.concurrency), total_requests, args.duration, args.rate, args.warmup)
+    finally:
+        cleanup()
+
+    print_report(result)
+    report = {
+        'exercise': args.exercise,
+        'lang': args.lang,
+        'transport': args.transport,
+        'url': args.url,
+        'concurrency': args.concurrency,
+        'rate': args.rate,
+        'batch_window_ms': args.batch_window,
+        'compress': args.compress,
+        'payloads': sorted(kinds),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'result': result,
+    }
+    output = args.output or os.path.join(TMP_DIR, f"bench-{args.exercise}-{args.lang}-{args.transport}-{time.strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as fh:
+        json.dump(report, fh, indent=2)
+        fh.write('\n')
+    print(f'Result written to {output}')
+    return 0 if result['errors'] == 0 else 2
+
+
+if __name__ == '__main__':
+    args = build_arg_parser().parse_args()
+    sys.exit(run_suite(args) if args.suite else run_single(args))
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Cold-start check for the Python solutions: each `server.py` answers its first
+request fixture as a one-shot stdio process (`python server.py < request`).
+
+Fails when a solution
+- imports a module that only the HTTP transports or optional features need
+  (`FORBIDDEN`; found with `python -X importtime`),
+- spends more than --import-budget-ms importing modules that a bare
+  interpreter does not load, or
+- takes more than --budget-ms longer than `python -c pass` end to end (median
+  of --runs runs).
+
+Usage:
+  python3 scripts/check-startup.py
+  python3 scripts/check-startup.py -e 005-prime-factors --runs 21 --budget-ms 50
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS_DIR = os.path.join(ROOT, 'tests')
+SOLUTIONS_DIR = os.path.join(ROOT, 'solutions')
+
+# Loaded on demand by `--http`, `--async`, `--batch-workers`, `--profiling` or an accelerated codec
+FORBIDDEN = (
+    'argparse',
+    'asyncio',
+    'concurrent.futures',
+    'cProfile',
+    'http.server',
+    'multiprocessing',
+    'orjson',
+    'pstats',
+    'socket',
+    'ujson',
+)
+
+
+def find_solutions(exercises=None):
+    found = []
+    for ex in sorted(os.listdir(SOLUTIONS_DIR)):
+        if exercises and ex not in exercises:
+            continue
+        path = os.path.join(SOLUTIONS_DIR, ex, 'code', 'python', 'server.py')
+        request = os.path.join(TESTS_DIR, ex, 'request-0001.json')
+        if os.path.exists(path) and os.path.exists(request):
+            found.append((ex, path, request))
+    return found
+
+
+def run(cmd, request=None):
+    with open(request or os.devnull, 'rb') as stdin:
+        started = time.perf_counter()
+        proc = subprocess.run(cmd, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        elapsed = time.perf_counter() - started
+    return proc, elapsed
+
+
+def median_ms(cmd, request, runs):
+    return statistics.median(run(cmd, request)[1] for _ in range(runs)) * 1000
+
+
+def import_times(stderr):
+    """module -> (cumulative µs, nesting depth) from `-X importtime` output."""
+    times = {}
+    for line in stderr.decode('utf-8', 'replace').splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        stripped = name.lstrip(' ')
+        times[stripped] = (int(cumulative), len(name) - len(stripped))
+    return times
+
+
+def check(ex, path, request, baseline, args):
+    problems = []
+    proc, _ = run([sys.executable, '-X', 'importtime', path], request)
+    if proc.returncode != 0 or not proc.stdout.strip():
+        return [f'no response (exit {proc.returncode})']
+    times = import_times(proc.stderr)
+    loaded = [name for name in FORBIDDEN if name in times]
+    if loaded:
+        problems.append('imports ' + ', '.join(loaded))
+    # Top-level imports only: their cumulative time already covers what they pull in
+    top = min(depth for _, depth in times.values())
+    import_ms = sum(us for name, (us, depth) in times.items() if depth == top and name not in baseline) / 1000
+    if import_ms > args.import_budget_ms:
+        problems.append(f'imports take {import_ms:.1f} ms (budget {args.import_budget_ms:g})')
+    startup_ms = median_ms([sys.executable, path], request, args.runs) - args.bare_ms
+    if startup_ms > args.budget_ms:
+        problems.append(f'{startup_ms:.1f} ms over a bare interpreter (budget {args.budget_ms:g})')
+    print(f'{ex}: imports {import_ms:.1f} ms, startup +{startup_ms:.1f} ms ->', 'FAIL' if problems else 'OK')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--exercises', '-e', help='Comma-separated exercise directories to check (default: all)', default=None)
+    parser.add_argument('--runs', type=int, default=9, help='Timed runs per solution; the median counts (default: %(default)s)')
+    parser.add_argument('--budget-ms', type=float, default=100, help='Allowed end-to-end time over `python -c pass` (default: %(default)g)')
+    parser.add_argument('--import-budget-ms', type=float, default=50, help='Allowed time importing modules a bare interpreter does not load (default: %(default)g)')
+    args = parser.parse_args()
+    exercises = set(args.exercises.split(',')) if args.exercises else None
+
+    bare, _ = run([sys.executable, '-X', 'importtime', '-c', 'pass'])
+    baseline = set(import_times(bare.stderr))
+    args.bare_ms = median_ms([sys.executable, '-c', 'pass'], None, args.runs)
+    print(f'python -c pass: {args.bare_ms:.1f} ms')
+
+    solutions = find_solutions(exercises)
+    failed = 0
+    for ex, path, request in solutions:
+        problems = check(ex, path, request, baseline, args)
+        for problem in problems:
+            print('  ' + problem)
+        failed += bool(problems)
+    print(f'Passed: {len(solutions) - failed}/{len(solutions)}')
+    sys.exit(0 if solutions and not failed else 2)
+
+
+if __name__ == '__main__':
+    main()
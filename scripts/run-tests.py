@@ -5,17 +5,26 @@ Currently supports Python reference implementations located in:
   solutions/<exercise>/code/python/server.py
 
 For each request fixture (files named request-*.json) it finds the corresponding
-expected-*.json and runs the solution, comparing JSON outputs.
+expected-*.json and runs the solution, comparing JSON outputs. Fixtures under
+tests/<exercise>/<lang>/ cover behaviour only that language's solution has and
+run only with that --lang.
+
+Python solutions are started once per exercise as an HTTP server on a free
+ephemeral port and every fixture is POSTed to that process over one kept-alive
+connection (`jsonrpc.client`); pass --spawn-per-test to run a fresh interpreter
+per fixture instead.
 """
 import argparse
+import io
 import os
 import json
+import socket
 import subprocess
 import sys
 import time
-import urllib.request
-import urllib.error
+import traceback
 import shlex
+from concurrent.futures import ThreadPoolExecutor
 try:
     import yaml
 except Exception:
@@ -26,6 +35,9 @@ ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TESTS_DIR = os.path.join(ROOT, 'tests')
 SOLUTIONS_DIR = os.path.join(ROOT, 'solutions')
 
+sys.path.insert(0, os.path.join(ROOT, 'lib', 'python'))
+from jsonrpc.client import Client  # noqa: E402
+
 
 def find_python_solution(exercise_name):
     path = os.path.join(SOLUTIONS_DIR, exercise_name, 'code', 'python', 'server.py')
@@ -51,25 +63,34 @@ def run_solution_perl(path, req_json, env=None):
     return proc.returncode, stdout, stderr
 
 
+def wait_until_ready(proc, host, port, timeout=4.0):
+    """Poll the server until it answers a POST; returns (True, None) or (False, stderr)."""
+    deadline = time.monotonic() + timeout
+    with Client(f'http://{host}:{port}/', pool_size=1, timeout=1) as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                break
+            try:
+                client.send(b'{}')
+                return True, None
+            except Exception:
+                time.sleep(0.05)
+    # Failed to start server
+    if proc.poll() is None:
+        proc.terminate()
+    try:
+        _, stderr = proc.communicate(timeout=5)
+    except Exception:
+        proc.kill()
+        _, stderr = proc.communicate()
+    return False, stderr
+
+
 def run_solution_python_server(path, host, port, env=None):
     cmd = [sys.executable, path, '--http']
     proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
-    # Wait for server to be ready (try to connect)
-    url = f'http://{host}:{port}/'
-    ready = False
-    for i in range(20):
-        try:
-            req = urllib.request.Request(url, data=b'{}', method='POST', headers={'Content-Type': 'application/json'})
-            with urllib.request.urlopen(req, timeout=1) as resp:
-                ready = True
-                break
-        except Exception:
-            time.sleep(0.2)
+    ready, stderr = wait_until_ready(proc, host, port)
     if not ready:
-        # Failed to start server
-        stderr = proc.stderr.read() if proc.stderr else ''
-        proc.terminate()
-        proc.wait()
         return 1, '', f'Server did not start: {stderr}'
     return 0, proc, None
 
@@ -77,22 +98,8 @@ def run_solution_python_server(path, host, port, env=None):
 def run_solution_perl_server(path, host, port, env=None):
     cmd = ['perl', path, '--http']
     proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
-    # Wait for server to be ready (try to connect)
-    url = f'http://{host}:{port}/'
-    ready = False
-    for i in range(20):
-        try:
-            req = urllib.request.Request(url, data=b'{}', method='POST', headers={'Content-Type': 'application/json'})
-            with urllib.request.urlopen(req, timeout=1) as resp:
-                ready = True
-                break
-        except Exception:
-            time.sleep(0.2)
+    ready, stderr = wait_until_ready(proc, host, port)
     if not ready:
-        # Failed to start server
-        stderr = proc.stderr.read() if proc.stderr else ''
-        proc.terminate()
-        proc.wait()
         return 1, '', f'Server did not start: {stderr}'
     return 0, proc, None
 
@@ -100,12 +107,20 @@ def run_solution_perl_server(path, host, port, env=None):
 # Using PyYAML (`yaml.safe_load`) for config parsing (see top-level import)
 
 
-def post_to_server(host, port, req_json):
-    url = f'http://{host}:{port}/'
-    req = urllib.request.Request(url, data=req_json.encode('utf-8'), method='POST', headers={'Content-Type': 'application/json'})
-    with urllib.request.urlopen(req, timeout=5) as resp:
-        out = resp.read().decode('utf-8')
-        return 0, out, None
+def post_to_server(client, req_json):
+    out = client.send(req_json).decode('utf-8')
+    return 0, out, None
+
+
+def find_free_port(host):
+    # Let the OS pick an unused port; the server binds it right after we release it
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return str(sock.getsockname()[1])
+
+
+def format_ms(seconds):
+    return f'{seconds * 1000:.1f} ms'
 
 
 def normalise(json_str):
@@ -116,6 +131,235 @@ def normalise(json_str):
         return json_str.strip()
 
 
+def run_exercise(exercise, request_files, args, allocate_port=False, buf=None):
+    """Run every fixture of one exercise.
+
+    Output is buffered (in `buf` when given) so parallel runs can print whole
+    exercises in order. With `allocate_port`, a port taken from config.yaml is
+    replaced by a free one. Returns (passed, total, output).
+    """
+    exercise_tests_dir = os.path.join(TESTS_DIR, exercise)
+    if buf is None:
+        buf = io.StringIO()
+
+    def log(*parts):
+        print(*parts, file=buf)
+
+    total, passed = 0, 0
+    log(f'Running tests for exercise: {exercise}')
+
+    # Find solution based on selected language
+    python_solution = None
+    perl_solution = None
+    if args.lang == 'python':
+        python_solution = find_python_solution(exercise)
+    elif args.lang == 'perl':
+        perl_solution = find_perl_solution(exercise)
+    # cfg may be populated from config.yaml below; initialise empty for checks
+    cfg = {}
+    # If there's no implementation for the chosen language and no configured command, skip tests
+    if args.lang == 'python' and python_solution is None:
+        # we'll check config.yaml later; temporarily continue to config loading
+        pass
+
+    # Prepare for optional server process (either started by this runner or by a configured command)
+    server_proc = None
+    server_started = False
+
+    # Per-exercise local host/port variables. Do not mutate `args` so CLI
+    # values remain constant across exercises; allow config.yaml to override
+    # these local variables for the current exercise only.
+    host = args.host
+    port = args.port
+    configured_port = None
+    exercise_started = time.perf_counter()
+
+    # If a `config.yaml` exists under the solution code directory, read it and
+    # use its `host`/`port` values and (optionally) `command` to start the service.
+    config_path = os.path.join(SOLUTIONS_DIR, exercise, 'code', args.lang, 'config.yaml')
+    if os.path.exists(config_path):
+        try:
+            with open(config_path, 'r') as fh:
+                cfg = yaml.safe_load(fh) or {}
+        except Exception as e:
+            log(f'  Failed to parse config.yaml for {exercise}: {e}')
+            cfg = {}
+
+        # If host/port present in config and not provided on CLI, adopt them
+        if not host and 'host' in cfg:
+            host = str(cfg['host'])
+        if not port and 'port' in cfg:
+            port = str(cfg['port'])
+            if allocate_port:
+                # Parallel runs: swap the configured port (e.g. 8080) for a free one
+                configured_port, port = port, find_free_port(host or '127.0.0.1')
+
+        # If a command is specified in config, attempt to start it and wait for readiness
+        if 'command' in cfg:
+            # Only attempt to run the configured command if we have host/port
+            if not host or not port:
+                log('  config.yaml contains `command` but `host`/`port` are not set; skipping configured command')
+                # Treat as if there's no usable command so later logic marks missing solutions correctly
+                cfg.pop('command', None)
+            else:
+                if isinstance(cfg['command'], list):
+                    cmd = list(cfg['command'])
+                else:
+                    cmd = shlex.split(cfg['command'])
+                # Ensure all command parts are strings (PyYAML may parse numbers)
+                cmd = [str(x) for x in cmd]
+                if configured_port is not None:
+                    cmd = [port if x == configured_port else x for x in cmd]
+                # Append host and port as positional args for the command
+                cmd.append(str(host))
+                cmd.append(str(port))
+                log(f'  Starting configured command for {exercise}: {" ".join(cmd)}')
+                try:
+                    env = os.environ.copy()
+                    env['TEST_HOST'] = host
+                    env['TEST_PORT'] = str(port)
+                    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
+                    ready, stderr = wait_until_ready(proc, host, port)
+                    if not ready:
+                        log(f'  Failed to start configured command for {exercise}: {stderr}')
+                    else:
+                        server_proc = proc
+                        server_started = True
+                except Exception as e:
+                    log(f'  Exception starting configured command for {exercise}: {e}')
+    # Python solutions without an explicit host/port get a long-lived server on a
+    # free ephemeral port, so the interpreter starts once per exercise, not per fixture.
+    if args.lang == 'python' and python_solution and not server_started and not (host and port) and not args.spawn_per_test:
+        host = host or '127.0.0.1'
+        port = find_free_port(host)
+    if not server_started and host and port and ((args.lang == 'python' and python_solution) or (args.lang == 'perl' and perl_solution)):
+        env = os.environ.copy()
+        if host:
+            env['TEST_HOST'] = host
+        if port:
+            env['TEST_PORT'] = port
+        log(f'  Starting server for {exercise} at {host}:{port} ...')
+        if args.lang == 'python':
+            rc, proc, err = run_solution_python_server(python_solution, host, port, env=env)
+        elif args.lang == 'perl':
+            rc, proc, err = run_solution_perl_server(perl_solution, host, port, env=env)
+        if rc != 0:
+            log(f'  Failed to start server for {exercise}: {err}')
+        else:
+            server_proc = proc
+            server_started = True
+
+    # Now that config.yaml (if any) is loaded into `cfg`, if there's still no implementation
+    # and no configured command, mark tests as missing and skip this exercise.
+    has_command = bool(cfg.get('command'))
+    if args.lang == 'python' and not python_solution and not has_command:
+        log(f'  No Python solution found for {exercise}; marking {len(request_files)} test(s) as failed')
+        for req_file in request_files:
+            total += 1
+            log(f'  {req_file} -> MISSING-SOLUTION')
+        # ensure any started server is cleaned up
+        if server_proc:
+            try:
+                server_proc.terminate()
+                server_proc.wait(timeout=5)
+            except Exception:
+                try:
+                    server_proc.kill()
+                except Exception:
+                    pass
+        return passed, total, buf.getvalue()
+    if args.lang == 'perl' and not perl_solution and not has_command:
+        log(f'  No Perl solution found for {exercise}; marking {len(request_files)} test(s) as failed')
+        for req_file in request_files:
+            total += 1
+            log(f'  {req_file} -> MISSING-SOLUTION')
+        if server_proc:
+            try:
+                server_proc.terminate()
+                server_proc.wait(timeout=5)
+            except Exception:
+                try:
+                    server_proc.kill()
+                except Exception:
+                    pass
+        return passed, total, buf.getvalue()
+    # Only a configured command can serve this exercise and it did not come up
+    if not server_started and not (python_solution or perl_solution):
+        log(f'  Configured server for {exercise} is not running; marking {len(request_files)} test(s) as failed')
+        for req_file in request_files:
+            total += 1
+            log(f'  {req_file} -> SERVER-NOT-STARTED')
+        return passed, total, buf.getvalue()
+
+    # One pooled keep-alive client per exercise server
+    client = Client(f'http://{host}:{port}/', pool_size=1, timeout=args.timeout) if server_started else None
+    try:
+        for req_file in request_files:
+            idx = req_file.split('request-')[-1].split('.json')[0]
+            expected_file = os.path.join(os.path.dirname(req_file), f'expected-{idx}.json')
+            req_path = os.path.join(exercise_tests_dir, req_file)
+            expected_path = os.path.join(exercise_tests_dir, expected_file)
+
+            if not os.path.exists(expected_path):
+                log('  Skipping test ' + req_path + ', missing expected file: ' + expected_path)
+                continue
+
+            with open(req_path, 'r') as fh:
+                req_json = fh.read()
+            with open(expected_path, 'r') as fh:
+                expected_json = fh.read()
+
+            total += 1
+            # Prepare environment (per-exercise host/port)
+            env = os.environ.copy()
+            if host:
+                env['TEST_HOST'] = host
+            if port:
+                env['TEST_PORT'] = port
+            test_started = time.perf_counter()
+            if server_started:
+                code, stdout, stderr = post_to_server(client, req_json)
+            else:
+                if args.lang == 'python':
+                    code, stdout, stderr = run_solution_python(python_solution, req_json, env=env)
+                elif args.lang == 'perl':
+                    code, stdout, stderr = run_solution_perl(perl_solution, req_json, env=env)
+            elapsed = time.perf_counter() - test_started
+            if stderr and stderr.strip():
+                log(f'  STDERR: {stderr.strip()}')
+
+            if stdout.strip() == '':
+                # Notification maybe => expected may be empty
+                out_obj = ''
+            else:
+                out_obj = normalise(stdout)
+
+            expected_obj = normalise(expected_json)
+
+            ok = out_obj == expected_obj
+            result = 'OK' if ok else 'FAIL'
+            log(f'  {req_file} -> {result} ({format_ms(elapsed)})')
+            if not ok:
+                log('   expected:', json.dumps(expected_obj, separators=(",", ":")))
+                log('   got:     ', json.dumps(out_obj, separators=(",", ":")) if isinstance(out_obj, (dict, list)) else out_obj)
+            else:
+                passed += 1
+    finally:
+        if client:
+            client.close()
+        if server_proc:
+            try:
+                server_proc.terminate()
+                server_proc.wait(timeout=5)
+            except Exception:
+                try:
+                    server_proc.kill()
+                except Exception:
+                    pass
+    log(f'  Exercise time: {format_ms(time.perf_counter() - exercise_started)}')
+    return passed, total, buf.getvalue()
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Language-agnostic test runner for top-level JSON fixtures')
     parser.add_argument('--exercises', '-e', help='Comma-separated exercise directories to run (e.g. 001-intro)', default=None)
@@ -123,6 +367,9 @@ if __name__ == '__main__':
     parser.add_argument('--host', help='Optional host to set as TEST_HOST env var', default=None)
     parser.add_argument('--port', help='Optional port to set as TEST_PORT env var', default=None)
     parser.add_argument('--lang', help='Language to use for solutions (default: perl)', default='perl')
+    parser.add_argument('--spawn-per-test', action='store_true', help='Start a new solution process for every fixture instead of one server per exercise (Python only)')
+    parser.add_argument('--timeout', type=float, default=5, help='Seconds to wait for each HTTP response (default: 5)')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Run N exercises concurrently, each server on its own free port (default: 1)')
     args = parser.parse_args()
 
     if not os.path.isdir(TESTS_DIR):
@@ -136,222 +383,50 @@ if __name__ == '__main__':
     if args.run_all:
         requested_exercises = None
 
-    total, passed = 0, 0
+    jobs = max(1, args.jobs)
+    if jobs > 1 and args.port:
+        print('--port pins every exercise to one port; running exercises one at a time')
+        jobs = 1
+
+    selected = []
     for exercise in sorted(os.listdir(TESTS_DIR)):
         exercise_tests_dir = os.path.join(TESTS_DIR, exercise)
         if not os.path.isdir(exercise_tests_dir):
             continue
         # Discover fixtures
         request_files = sorted([f for f in os.listdir(exercise_tests_dir) if f.startswith('request-') and f.endswith('.json')])
+        # Fixtures for behaviour only one language's solution has live in tests/<exercise>/<lang>/
+        lang_dir = os.path.join(exercise_tests_dir, args.lang)
+        if os.path.isdir(lang_dir):
+            request_files += sorted(os.path.join(args.lang, f) for f in os.listdir(lang_dir)
+                                    if f.startswith('request-') and f.endswith('.json'))
         if not request_files:
             continue
-
         # If the user specified --exercises/-e, skip non-selected exercises. Only show the
         # 'Running tests' message for exercises that will actually be executed.
         if requested_exercises is not None and exercise not in requested_exercises:
             continue
+        selected.append((exercise, request_files))
 
-        print(f'Running tests for exercise: {exercise}')
-
-        # Locate solution
-        if requested_exercises is not None and exercise not in requested_exercises:
-            continue
-        # Find solution based on selected language
-        python_solution = None
-        perl_solution = None
-        if args.lang == 'python':
-            python_solution = find_python_solution(exercise)
-        elif args.lang == 'perl':
-            perl_solution = find_perl_solution(exercise)
-        # cfg may be populated from config.yaml below; initialise empty for checks
-        cfg = {}
-        # If there's no implementation for the chosen language and no configured command, skip tests
-        if args.lang == 'python' and python_solution is None:
-            # we'll check config.yaml later; temporarily continue to config loading
-            pass
-
-        # Prepare for optional server process (either started by this runner or by a configured command)
-        server_proc = None
-        server_started = False
-
-        # Per-exercise local host/port variables. Do not mutate `args` so CLI
-        # values remain constant across exercises; allow config.yaml to override
-        # these local variables for the current exercise only.
-        host = args.host
-        port = args.port
-
-        # If a `config.yaml` exists under the solution code directory, read it and
-        # use its `host`/`port` values and (optionally) `command` to start the service.
-        config_path = os.path.join(SOLUTIONS_DIR, exercise, 'code', args.lang, 'config.yaml')
-        if os.path.exists(config_path):
+    total, passed = 0, 0
+    suite_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        bufs = [io.StringIO() for _ in selected]
+        futures = [pool.submit(run_exercise, exercise, request_files, args, jobs > 1, buf)
+                   for (exercise, request_files), buf in zip(selected, bufs)]
+        # Print each exercise's buffered output in order as soon as it (and all before it) finish
+        for (exercise, request_files), buf, fut in zip(selected, bufs, futures):
             try:
-                with open(config_path, 'r') as fh:
-                    cfg = yaml.safe_load(fh) or {}
-            except Exception as e:
-                print(f'  Failed to parse config.yaml for {exercise}: {e}')
-                cfg = {}
-
-            # If host/port present in config and not provided on CLI, adopt them
-            if not host and 'host' in cfg:
-                host = str(cfg['host'])
-            if not port and 'port' in cfg:
-                port = str(cfg['port'])
-
-            # If a command is specified in config, attempt to start it and wait for readiness
-            if 'command' in cfg:
-                # Only attempt to run the configured command if we have host/port
-                if not host or not port:
-                    print('  config.yaml contains `command` but `host`/`port` are not set; skipping configured command')
-                    # Treat as if there's no usable command so later logic marks missing solutions correctly
-                    cfg.pop('command', None)
-                else:
-                    if isinstance(cfg['command'], list):
-                        cmd = list(cfg['command'])
-                    else:
-                        cmd = shlex.split(cfg['command'])
-                    # Ensure all command parts are strings (PyYAML may parse numbers)
-                    cmd = [str(x) for x in cmd]
-                    # Append host and port as positional args for the command
-                    cmd.append(str(host))
-                    cmd.append(str(port))
-                    print(f'  Starting configured command for {exercise}: {" ".join(cmd)}')
-                    try:
-                        env = os.environ.copy()
-                        env['TEST_HOST'] = host
-                        env['TEST_PORT'] = str(port)
-                        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
-                        # Wait for server to be ready (try to connect)
-                        url = f'http://{host}:{port}/'
-                        ready = False
-                        for i in range(20):
-                            try:
-                                req = urllib.request.Request(url, data=b'{}', method='POST', headers={'Content-Type': 'application/json'})
-                                with urllib.request.urlopen(req, timeout=1) as resp:
-                                    ready = True
-                                    break
-                            except Exception:
-                                time.sleep(0.2)
-                        if not ready:
-                            stderr = proc.stderr.read() if proc.stderr else ''
-                            proc.terminate()
-                            proc.wait()
-                            print(f'  Failed to start configured command for {exercise}: {stderr}')
-                        else:
-                            server_proc = proc
-                            server_started = True
-                    except Exception as e:
-                        print(f'  Exception starting configured command for {exercise}: {e}')
-        if host and port and ((args.lang == 'python' and python_solution) or (args.lang == 'perl' and perl_solution)):
-            env = os.environ.copy()
-            if host:
-                env['TEST_HOST'] = host
-            if port:
-                env['TEST_PORT'] = port
-            print(f'  Starting server for {exercise} at {host}:{port} ...')
-            if args.lang == 'python':
-                rc, proc, err = run_solution_python_server(python_solution, host, port, env=env)
-            elif args.lang == 'perl':
-                rc, proc, err = run_solution_perl_server(perl_solution, host, port, env=env)
-            if rc != 0:
-                print(f'  Failed to start server for {exercise}: {err}')
-            else:
-                server_proc = proc
-                server_started = True
-
-        # Now that config.yaml (if any) is loaded into `cfg`, if there's still no implementation
-        # and no configured command, mark tests as missing and skip this exercise.
-        has_command = bool(cfg.get('command'))
-        if args.lang == 'python' and not python_solution and not has_command:
-            print(f'  No Python solution found for {exercise}; marking {len(request_files)} test(s) as failed')
-            for req_file in request_files:
-                total += 1
-                print(f'  {req_file} -> MISSING-SOLUTION')
-            # ensure any started server is cleaned up
-            if server_proc:
-                try:
-                    server_proc.terminate()
-                    server_proc.wait(timeout=5)
-                except Exception:
-                    try:
-                        server_proc.kill()
-                    except Exception:
-                        pass
-            continue
-        if args.lang == 'perl' and not perl_solution and not has_command:
-            print(f'  No Perl solution found for {exercise}; marking {len(request_files)} test(s) as failed')
-            for req_file in request_files:
-                total += 1
-                print(f'  {req_file} -> MISSING-SOLUTION')
-            if server_proc:
-                try:
-                    server_proc.terminate()
-                    server_proc.wait(timeout=5)
-                except Exception:
-                    try:
-                        server_proc.kill()
-                    except Exception:
-                        pass
-            continue
-
-        try:
-            for req_file in request_files:
-                idx = req_file.split('request-')[-1].split('.json')[0]
-                expected_file = f'expected-{idx}.json'
-                req_path = os.path.join(exercise_tests_dir, req_file)
-                expected_path = os.path.join(exercise_tests_dir, expected_file)
-
-                if not os.path.exists(expected_path):
-                    print('  Skipping test ' + req_path + ', missing expected file: ' + expected_path)
-                    continue
-
-                with open(req_path, 'r') as fh:
-                    req_json = fh.read()
-                with open(expected_path, 'r') as fh:
-                    expected_json = fh.read()
-
-                total += 1
-                # Prepare environment (per-exercise host/port)
-                env = os.environ.copy()
-                if host:
-                    env['TEST_HOST'] = host
-                if port:
-                    env['TEST_PORT'] = port
-                if server_started:
-                    code, stdout, stderr = post_to_server(host, port, req_json)
-                else:
-                    if args.lang == 'python':
-                        code, stdout, stderr = run_solution_python(python_solution, req_json, env=env)
-                    elif args.lang == 'perl':
-                        code, stdout, stderr = run_solution_perl(perl_solution, req_json, env=env)
-                if stderr and stderr.strip():
-                    print(f'  STDERR: {stderr.strip()}')
-
-                if stdout.strip() == '':
-                    # Notification maybe => expected may be empty
-                    out_obj = ''
-                else:
-                    out_obj = normalise(stdout)
-
-                expected_obj = normalise(expected_json)
-
-                ok = out_obj == expected_obj
-                result = 'OK' if ok else 'FAIL'
-                print(f'  {req_file} -> {result}')
-                if not ok:
-                    print('   expected:', json.dumps(expected_obj, separators=(",", ":")))
-                    print('   got:     ', json.dumps(out_obj, separators=(",", ":")) if isinstance(out_obj, (dict, list)) else out_obj)
-                else:
-                    passed += 1
-        finally:
-            if server_proc:
-                try:
-                    server_proc.terminate()
-                    server_proc.wait(timeout=5)
-                except Exception:
-                    try:
-                        server_proc.kill()
-                    except Exception:
-                        pass
+                ex_passed, ex_total, output = fut.result()
+            except Exception:
+                # A runner error fails the exercise; keep what it logged before the error
+                output = buf.getvalue() + traceback.format_exc()
+                output += f'  {exercise} -> FAIL (runner error; {len(request_files)} test(s) counted as failed)\n'
+                ex_passed, ex_total = 0, len(request_files)
+            print(output, end='', flush=True)
+            passed += ex_passed
+            total += ex_total
 
     print(f'Passed: {passed}/{total} tests')
+    print(f'Total time: {format_ms(time.perf_counter() - suite_started)}')
     sys.exit(0 if passed == total else 2)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+JSON-RPC 2.0 implementation for the `primeFactors` method.
+- `params` is one integer or an array of integers (numeric strings are accepted), each in [2, 2^32 - 1]
+- Numbers up to 65536 are factored from a smallest-prime-factor table built once at start-up
+- Larger numbers: one gcd with the product of the primes below the cube root of 2^32
+  finds which of them divide n, in place of trial division by each one. The remaining
+  cofactor is 1, a prime (deterministic Miller-Rabin) or a product of two primes (split
+  with Pollard's rho, Brent variant)
+- Array params are factored per distinct value, so repeated items cost one factorization
+- With `--offload-workers N` larger calls run in forked worker processes, which inherit the table
+"""
+import os
+import sys
+from array import array
+from math import gcd, isqrt, prod
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'lib', 'python'))
+
+from jsonrpc import MISSING, InvalidParams, Registry, main  # noqa: E402
+
+MAX_U32 = 4294967295  # 2^32 - 1
+TABLE_LIMIT = 65536
+INVALID = f'items must be integers >= 2 and <= {MAX_U32}'
+
+rpc = Registry()
+
+# Miller-Rabin with these bases is exact for every n < 4759123141 (> 2^32)
+_MR_BASES = (2, 7, 61)
+
+
+def _build_spf(limit):
+    """Smallest prime factor of every n < limit (0 and 1 map to 0)."""
+    spf = array('I', range(limit))
+    spf[0] = spf[1] = 0
+    # Largest prime first so smaller primes overwrite shared multiples
+    for p in reversed([p for p in range(2, isqrt(limit - 1) + 1) if all(p % q for q in range(2, isqrt(p) + 1))]):
+        spf[p * p::p] = array('I', [p]) * len(range(p * p, limit, p))
+    return spf
+
+
+SPF = _build_spf(TABLE_LIMIT + 1)
+PRIMES = array('I', (n for n in range(2, TABLE_LIMIT) if SPF[n] == n))
+# Every prime factor of a 32-bit n, except at most two, is below this bound (1626^3 > 2^32)
+_TRIAL_PRIMES = tuple(p for p in PRIMES if p <= 1625)
+# gcd(n, _TRIAL_PRODUCT) is the product of the trial primes dividing n (a 2301-bit number)
+_TRIAL_PRODUCT = prod(_TRIAL_PRIMES)
+
+
+def is_prime(n):
+    """Deterministic for n < 2^32."""
+    if n <= TABLE_LIMIT:
+        return n >= 2 and SPF[n] == n
+    if n % 2 == 0:
+        return False
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in _MR_BASES:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def pollard_rho(n):
+    """A non-trivial factor of the odd composite `n`, or None if no polynomial found one."""
+    for c in range(1, 32):
+        y, r, q, g = 2, 1, 1, 1
+        x = ys = y
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                # Batch the gcd over up to 128 steps
+                for _ in range(min(128, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += 128
+            r *= 2
+        if g == n:
+            # The batch overshot; replay it one step at a time
+            g = 1
+            while g == 1:
+                ys = (ys * ys + c) % n
+                g = gcd(abs(x - ys), n)
+        if g != n:
+            return g
+    return None
+
+
+def _split(m):
+    """Prime factors (ascending) of a cofactor with at most two prime factors, all > 1625."""
+    if m == 1:
+        return []
+    if is_prime(m):
+        return [m]
+    root = isqrt(m)
+    if root * root == m:
+        return [root, root]
+    d = pollard_rho(m)
+    if d is None:
+        # Not reached for 32-bit inputs; the smaller factor is always below 65536
+        d = next(p for p in PRIMES if m % p == 0)
+    return sorted((d, m // d))
+
+
+def _table_factors(n):
+    """Prime factors of n <= TABLE_LIMIT, read from the smallest-prime-factor table."""
+    factors = []
+    while n > 1:
+        p = SPF[n]
+        factors.append(p)
+        n //= p
+    return factors
+
+
+def factor(n):
+    """Prime factors of 2 <= n <= 2^32 - 1 in ascending order, with multiplicity."""
+    if n <= TABLE_LIMIT:
+        return _table_factors(n)
+    # Divide out the trial primes found by the gcd, as often as they divide n. This
+    # costs about 2 us, where dividing by all 256 trial primes in turn costs about 20 us
+    cofactor = n
+    g = gcd(n, _TRIAL_PRODUCT)
+    while g > 1:
+        cofactor //= g
+        g = gcd(cofactor, g)
+    smooth = n // cofactor
+    if smooth <= TABLE_LIMIT:
+        factors = _table_factors(smooth)
+    else:
+        factors = []
+        for p in _TRIAL_PRIMES:
+            while smooth % p == 0:
+                factors.append(p)
+                smooth //= p
+            if smooth == 1:
+                break
+    return factors + _split(cofactor)
+
+
+def factor_many(values):
+    """Factor every value, computing each distinct value once."""
+    done = {}
+    out = []
+    for n in values:
+        factors = done.get(n)
+        if factors is None:
+            factors = done[n] = factor(n)
+        # Fresh list per item so equal inputs don't share one object in the result
+        out.append(list(factors))
+    return out
+
+
+def to_u32(x):
+    if isinstance(x, bool):
+        raise ValueError(x)
+    if isinstance(x, int):
+        n = x
+    elif isinstance(x, float) and x.is_integer():
+        n = int(x)
+    elif isinstance(x, str) and 0 < len(x) <= 10 and x.isascii() and x.isdigit():
+        n = int(x)
+    else:
+        raise ValueError(x)
+    if not 2 <= n <= MAX_U32:
+        raise ValueError(x)
+    return n
+
+
+def number_or_array(params):
+    """Returns (values, is_array); the whole request is invalid if any item is."""
+    if params is MISSING or isinstance(params, dict):
+        raise InvalidParams(INVALID)
+    try:
+        if isinstance(params, list):
+            return [to_u32(x) for x in params], True
+        return [to_u32(params)], False
+    except (ValueError, TypeError):
+        raise InvalidParams(INVALID)
+
+
+# Admission control (`--admission`): one unit per number, 4096 numbers in flight. With
+# `--offload-workers`, calls of 64 numbers or more run in a worker process
+@rpc.method('primeFactors', params=number_or_array, offload='process', cache=True,
+            cost=lambda values, is_array: len(values), limit=4096, offload_cost=64)
+def prime_factors(values, is_array):
+    if is_array:
+        return factor_many(values)
+    return factor(values[0])
+
+
+if __name__ == "__main__":
+    main(rpc)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+JSON-RPC 2.0 implementation for the `matmul` method.
+- `params` is `{"a": [[...], ...], "b": [[...], ...]}`; both matrices must be non-empty,
+  rectangular and numeric (numbers or numeric strings), with `a` columns == `b` rows
+- Each matrix is validated in one pass into row buffers: Python ints when every
+  entry is an integer (results stay exact ints), otherwise `array('d')` rows
+- The product is computed against the transpose of `b`, so every cell is one
+  `sum(map(mul, row, column))` running in C. Columns are taken `TILE` at a time,
+  so that they stay in cache while every row of `a` passes over them
+- A float product cell that overflows a double (inf, or nan from inf - inf) is
+  answered with -32602 instead of being written as invalid JSON
+- When NumPy is installed, products of at least `NUMPY_THRESHOLD` multiply-adds use it
+  (int64 only when the result provably cannot overflow)
+- With `--offload-workers N` larger products run in worker processes; the `array('d')`
+  rows of large float matrices reach them through shared memory
+"""
+import os
+import re
+import sys
+from array import array
+from math import isfinite
+from operator import mul
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'lib', 'python'))
+
+from jsonrpc import InvalidParams, Registry, main  # noqa: E402
+
+INVALID = 'matrices must be numeric and dimensions must match'
+OVERFLOW = 'entries too large: a product cell overflows a double'
+# rows(a) * cols(a) * cols(b) at which the NumPy path takes over
+NUMPY_THRESHOLD = 48 ** 3
+# Columns of b per tile of the pure-Python product
+TILE = 64
+# Integral float results up to this magnitude are returned as ints (like 19, not 19.0)
+_EXACT_FLOAT = 2 ** 53
+
+# Same numeric literals the Perl solution accepts in strings
+_NUMERIC = re.compile(r'-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?')
+
+rpc = Registry()
+
+_numpy = None
+
+
+def numpy_module():
+    """NumPy if it is importable (imported on first use), else None."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+def _number(x):
+    """Convert one entry; returns an int or a finite float."""
+    t = type(x)
+    if t is int:
+        return x
+    if t is float:
+        if isfinite(x):
+            return x
+    elif t is str and _NUMERIC.fullmatch(x):
+        if '.' in x or 'e' in x or 'E' in x:
+            v = float(x)
+            if isfinite(v):
+                return v
+        else:
+            return int(x)
+    raise InvalidParams(INVALID)
+
+
+def _doubles(rows):
+    try:
+        return [array('d', row) for row in rows]
+    except OverflowError:
+        # An integer too large for a double
+        raise InvalidParams(INVALID)
+
+
+def to_matrix(m):
+    """Validate a matrix; returns (rows, n_cols, all_int)."""
+    if type(m) is not list or not m:
+        raise InvalidParams(INVALID)
+    cols = None
+    all_int = True
+    rows = []
+    for row in m:
+        if type(row) is not list or not row:
+            raise InvalidParams(INVALID)
+        if cols is None:
+            cols = len(row)
+        elif len(row) != cols:
+            raise InvalidParams(INVALID)
+        # Fast path: a row of plain JSON integers needs no conversion
+        if all(type(x) is int for x in row):
+            rows.append(row)
+            continue
+        row = [_number(x) for x in row]
+        if all_int and any(type(x) is float for x in row):
+            all_int = False
+        rows.append(row)
+    if not all_int:
+        rows = _doubles(rows)
+    return rows, cols, all_int
+
+
+def matrices(params):
+    if type(params) is not dict or 'a' not in params or 'b' not in params:
+        raise InvalidParams(INVALID)
+    a = to_matrix(params['a'])
+    b = to_matrix(params['b'])
+    if a[1] != len(b[0]):
+        raise InvalidParams(INVALID)
+    return a, b
+
+
+def _int_or_float(v):
+    if not isfinite(v):
+        # Finite entries whose sum of products overflows; JSON has no Infinity or NaN
+        raise InvalidParams(OVERFLOW)
+    return int(v) if v.is_integer() and -_EXACT_FLOAT <= v <= _EXACT_FLOAT else v
+
+
+def multiply_python(a_rows, b_rows, exact):
+    # Columns of b as contiguous rows, so each cell is a dot product of two sequences
+    b_cols = [list(col) for col in zip(*b_rows)]
+    if not exact:
+        b_cols = [array('d', col) for col in b_cols]
+    if len(b_cols) <= TILE:
+        return [[sum(map(mul, row, col)) for col in b_cols] for row in a_rows]
+    out = [[] for _ in a_rows]
+    for start in range(0, len(b_cols), TILE):
+        tile = b_cols[start:start + TILE]
+        for row, cells in zip(a_rows, out):
+            cells.extend([sum(map(mul, row, col)) for col in tile])
+    return out
+
+
+def multiply_numpy(np, a_rows, b_rows, exact):
+    if exact:
+        bound = max(abs(x) for row in a_rows for x in row) * max(abs(x) for row in b_rows for x in row) * len(b_rows)
+        if bound >= 2 ** 63:
+            return None
+        return (np.array(a_rows, dtype=np.int64) @ np.array(b_rows, dtype=np.int64)).tolist()
+    return (np.array(a_rows, dtype=np.float64) @ np.array(b_rows, dtype=np.float64)).tolist()
+
+
+def multiply_adds(a, b):
+    return len(a[0]) * a[1] * b[1]
+
+
+# Admission control (`--admission`): four 200x200 products in flight. With
+# `--offload-workers`, products from 32x32 on (about 2 ms) run in a worker process
+@rpc.method('matmul', params=matrices, offload='process', cost=multiply_adds, limit=4 * 200 ** 3,
+            offload_cost=32 ** 3)
+def matmul(a, b):
+    a_rows, inner, a_int = a
+    b_rows, cols, b_int = b
+    exact = a_int and b_int
+    if not exact:
+        # Mixed input: promote the integer side to doubles as well
+        a_rows = _doubles(a_rows) if a_int else a_rows
+        b_rows = _doubles(b_rows) if b_int else b_rows
+    result = None
+    if len(a_rows) * inner * cols >= NUMPY_THRESHOLD:
+        np = numpy_module()
+        if np is not None:
+            result = multiply_numpy(np, a_rows, b_rows, exact)
+    if result is None:
+        result = multiply_python(a_rows, b_rows, exact)
+    if not exact:
+        result = [[_int_or_float(v) for v in row] for row in result]
+    return result
+
+
+if __name__ == "__main__":
+    main(rpc)
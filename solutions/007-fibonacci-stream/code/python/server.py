@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+JSON-RPC 2.0 implementation for the `fibStream` method.
+- `params` is `{"start": S, "count": N}` (`start` defaults to 0) and the result is
+  `[F(S), ..., F(S+N-1)]`
+- F(S) and F(S+1) are reached in O(log S) steps by fast doubling; the window is then
+  iterated with `decimal` integers, whose decimal text is produced in linear time
+  (converting a big `int` to text is quadratic)
+- `count` is capped at `MAX_COUNT`; with `--stream` the result is written as it is
+  produced and the cap rises to `STREAM_MAX_COUNT`
+- Numbers from F(20578) on have more than 4300 digits, which the standard-library
+  `json` of Python 3.11+ refuses to decode by default. A Python client asking for
+  them, `jsonrpc.client` included, calls `sys.set_int_max_str_digits(0)` first
+"""
+import decimal
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'lib', 'python'))
+
+from jsonrpc import InvalidParams, Registry, StreamedArray, main  # noqa: E402
+
+MAX_COUNT = 1000
+STREAM_MAX_COUNT = 100000
+# F(100000) has 20899 digits
+MAX_START = 100000
+
+# Exact integer arithmetic: enough precision that additions never round
+_EXACT = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, traps=[decimal.Overflow])
+
+rpc = Registry()
+
+
+def fib_pair(n):
+    """(F(n), F(n+1)) by fast doubling."""
+    a, b = 0, 1
+    for bit in bin(n)[2:]:
+        # F(2k) = F(k) * (2F(k+1) - F(k)), F(2k+1) = F(k)^2 + F(k+1)^2
+        c = a * ((b << 1) - a)
+        d = a * a + b * b
+        a, b = (d, c + d) if bit == '1' else (c, d)
+    return a, b
+
+
+def fib_fragments(start, count):
+    """JSON text of F(start), ..., F(start + count - 1), one item at a time."""
+    a, b = fib_pair(start)
+    a = _EXACT.create_decimal(a)
+    b = _EXACT.create_decimal(b)
+    add = _EXACT.add
+    for _ in range(count):
+        yield str(a)
+        a, b = b, add(a, b)
+
+
+def _non_negative_int(v):
+    """The value as an int if it is a non-negative integer (or digit string), else None."""
+    if isinstance(v, bool):
+        return None
+    if isinstance(v, int):
+        return v if v >= 0 else None
+    if isinstance(v, float):
+        return int(v) if v.is_integer() and v >= 0 else None
+    if isinstance(v, str) and v.isascii() and v.isdigit():
+        return int(v)
+    return None
+
+
+def window(params):
+    if not isinstance(params, dict):
+        raise InvalidParams('params must be an object with start and count')
+    start = _non_negative_int(params.get('start', 0))
+    count = _non_negative_int(params.get('count'))
+    if start is None or count is None:
+        raise InvalidParams('start and count must be integers')
+    if count == 0:
+        raise InvalidParams('count must be a positive integer')
+    limit = STREAM_MAX_COUNT if rpc.streaming else MAX_COUNT
+    if count > limit:
+        raise InvalidParams(f'count must be <= {limit}')
+    if start > MAX_START:
+        raise InvalidParams(f'start must be <= {MAX_START}')
+    return start, count
+
+
+# Admission control (`--admission`): one unit per number, four full windows in flight
+@rpc.method('fibStream', params=window, offload=True, cache=True,
+            cost=lambda start, count: count, limit=4 * MAX_COUNT)
+def fib_stream(start, count):
+    if rpc.streaming:
+        # Produced while the transport writes it
+        return StreamedArray(fib_fragments, start, count)
+    return StreamedArray(list(fib_fragments(start, count)))
+
+
+if __name__ == "__main__":
+    main(rpc)
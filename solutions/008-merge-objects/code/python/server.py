@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+JSON-RPC 2.0 implementation for the `mergeObjects` method.
+- `params` is `{"items": [{...}, ...], "strategy": "last" | "first" | "concat"}` (default `last`)
+- Objects are merged key by key, recursively; for any other pair of values the
+  strategy decides: `last` takes the later value, `first` keeps the earlier one
+  (unless it is null), `concat` joins both as arrays (non-arrays become one item)
+- The merge walks an explicit stack, so nesting depth is not limited by recursion
+- Untouched subtrees of the inputs are shared by the result, not copied; a dict
+  or list is copied only right before the merge has to modify it, and `concat`
+  extends lists the merge already owns in place
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'lib', 'python'))
+
+from jsonrpc import InvalidParams, Registry, main  # noqa: E402
+
+STRATEGIES = ('last', 'first', 'concat')
+
+rpc = Registry()
+
+
+def _as_items(v):
+    # concat operand: arrays contribute their items, null nothing, anything else itself
+    if type(v) is list:
+        return v
+    if v is None:
+        return ()
+    return (v,)
+
+
+def merge_objects(items, strategy):
+    """Merge a non-empty list of dicts without modifying any of them."""
+    # ids of the dicts/lists created by this merge, which may be modified in place.
+    # Every other container belongs to the inputs and stays alive with them, so
+    # an id in this set cannot be mistaken for an input container.
+    owned = set()
+
+    def own(obj):
+        copy = dict(obj) if type(obj) is dict else list(obj)
+        owned.add(id(copy))
+        return copy
+
+    acc = items[0]
+    for right in items[1:]:
+        if id(acc) not in owned:
+            acc = own(acc)
+        # (owned target dict, input dict merged into it)
+        stack = [(acc, right)]
+        while stack:
+            target, src = stack.pop()
+            for key, rv in src.items():
+                if key not in target:
+                    target[key] = rv
+                    continue
+                lv = target[key]
+                if type(lv) is dict and type(rv) is dict:
+                    if id(lv) not in owned:
+                        lv = target[key] = own(lv)
+                    stack.append((lv, rv))
+                elif strategy == 'last':
+                    target[key] = rv
+                elif strategy == 'first':
+                    if lv is None:
+                        target[key] = rv
+                else:
+                    if type(lv) is list and id(lv) in owned:
+                        lv.extend(_as_items(rv))
+                    else:
+                        joined = own(_as_items(lv))
+                        joined.extend(_as_items(rv))
+                        target[key] = joined
+    return acc
+
+
+def merge_params(params):
+    if not isinstance(params, dict):
+        raise InvalidParams('params must be an object')
+    strategy = params.get('strategy', 'last')
+    if strategy not in STRATEGIES:
+        raise InvalidParams("strategy must be 'last', 'first', or 'concat'")
+    items = params.get('items')
+    if type(items) is not list or not items or not all(type(x) is dict for x in items):
+        raise InvalidParams('items must be array of objects')
+    return items, strategy
+
+
+@rpc.method('mergeObjects', params=merge_params, offload=True)
+def merge(items, strategy):
+    return merge_objects(items, strategy)
+
+
+if __name__ == "__main__":
+    main(rpc)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+JSON-RPC 2.0 implementation for the `echoWithMeta` method.
+- `params` is `{"payload": <any>, "meta": {...}}`; `meta` is optional
+- The result echoes `payload` and returns `meta` without its `_`-prefixed keys, plus `timestamp`
+- `payload` is never decoded: its source text is located in the request body and
+  spliced into the response as is (`raw_params`), so large payloads cost one
+  validating scan instead of a decode and a re-encode
+- `timestamp` is `TEST_TIME` when set, otherwise the fixed value the exercise expects
+  (like the Perl solution); it is read once at start-up
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'lib', 'python'))
+
+from jsonrpc import MISSING, InvalidParams, Registry, main  # noqa: E402
+
+DEFAULT_TIME = '2020-01-01T12:00:00Z'
+TIMESTAMP = os.environ.get('TEST_TIME') or DEFAULT_TIME
+
+rpc = Registry()
+
+
+def echo_params(params):
+    if not isinstance(params, dict):
+        raise InvalidParams('params must be an object')
+    payload = params.get('payload', MISSING)
+    if payload is MISSING:
+        raise InvalidParams('missing payload')
+    meta = params.get('meta', {})
+    if not isinstance(meta, dict):
+        raise InvalidParams('meta must be an object')
+    return payload, meta
+
+
+@rpc.method('echoWithMeta', params=echo_params, raw_params=('payload',))
+def echo_with_meta(payload, meta):
+    meta = {k: v for k, v in meta.items() if not k.startswith('_')}
+    meta['timestamp'] = TIMESTAMP
+    return {'payload': payload, 'meta': meta}
+
+
+if __name__ == "__main__":
+    main(rpc)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+JSON-RPC 2.0 implementation for the `reverse` method.
+- `params` is `[text]` or `[text, mode]`; anything else is plain "Invalid params"
+- `mode` "codepoint" (default) reverses code points with one slice
+- `mode` "grapheme" keeps extended grapheme clusters (UAX #29: base + combining marks,
+  emoji ZWJ sequences, flags, Hangul syllables, CR LF) intact and reverses their order
+- Grapheme break properties come from `unicodedata` plus a few fixed ranges; the
+  matching regular expression is built on first use and cached
+- Clusters are matched in C by that expression; runs of BMP characters that are
+  their own clusters are reversed as one slice, and output is assembled in chunks of about
+  `CHUNK_CHARS`, so no per-character list is ever built
+"""
+import os
+import re
+import sys
+import unicodedata
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'lib', 'python'))
+
+from jsonrpc import InvalidParams, Registry, main  # noqa: E402
+
+MODES = ('codepoint', 'grapheme')
+CHUNK_CHARS = 65536
+
+rpc = Registry()
+
+# Grapheme_Cluster_Break values that unicodedata cannot derive from the general category
+_PREPEND = [(0x0600, 0x0605), (0x06DD, 0x06DD), (0x070F, 0x070F), (0x0890, 0x0891), (0x08E2, 0x08E2),
+            (0x0D4E, 0x0D4E), (0x110BD, 0x110BD), (0x110CD, 0x110CD), (0x111C2, 0x111C3),
+            (0x1193F, 0x1193F), (0x11941, 0x11941), (0x11A3A, 0x11A3A), (0x11A84, 0x11A89), (0x11D46, 0x11D46)]
+# Spacing combining marks (Mc) that are Grapheme_Extend, i.e. Extend rather than SpacingMark
+_EXTEND_MC = {0x09BE, 0x09D7, 0x0B3E, 0x0B57, 0x0BBE, 0x0BD7, 0x0CC2, 0x0CD5, 0x0CD6, 0x0D3E, 0x0D57,
+              0x0DCF, 0x0DDF, 0x1B35, 0x302E, 0x302F, 0x1D165, 0x1D16E, 0x1D16F, 0x1D170, 0x1D171, 0x1D172}
+_EXTEND_EXTRA = [(0x200C, 0x200C), (0xFF9E, 0xFF9F), (0x1F3FB, 0x1F3FF), (0xE0020, 0xE007F)]
+_SPACING_EXTRA = [(0x0E33, 0x0E33), (0x0EB3, 0x0EB3)]
+_REGIONAL = [(0x1F1E6, 0x1F1FF)]
+_HANGUL_L = [(0x1100, 0x115F), (0xA960, 0xA97C)]
+_HANGUL_V = [(0x1160, 0x11A7), (0xD7B0, 0xD7C6)]
+_HANGUL_T = [(0x11A8, 0x11FF), (0xD7CB, 0xD7FB)]
+# Extended_Pictographic (emoji-data.txt), merged into ranges
+_PICTOGRAPHIC = [
+    (0x00A9, 0x00A9), (0x00AE, 0x00AE), (0x203C, 0x203C), (0x2049, 0x2049), (0x2122, 0x2122),
+    (0x2139, 0x2139), (0x2194, 0x2199), (0x21A9, 0x21AA), (0x231A, 0x231B), (0x2328, 0x2328),
+    (0x2388, 0x2388), (0x23CF, 0x23CF), (0x23E9, 0x23F3), (0x23F8, 0x23FA), (0x24C2, 0x24C2),
+    (0x25AA, 0x25AB), (0x25B6, 0x25B6), (0x25C0, 0x25C0), (0x25FB, 0x25FE), (0x2600, 0x2605),
+    (0x2607, 0x2612), (0x2614, 0x2685), (0x2690, 0x2705), (0x2708, 0x2712), (0x2714, 0x2714),
+    (0x2716, 0x2716), (0x271D, 0x271D), (0x2721, 0x2721), (0x2728, 0x2728), (0x2733, 0x2734),
+    (0x2744, 0x2744), (0x2747, 0x2747), (0x274C, 0x274C), (0x274E, 0x274E), (0x2753, 0x2755),
+    (0x2757, 0x2757), (0x2763, 0x2767), (0x2795, 0x2797), (0x27A1, 0x27A1), (0x27B0, 0x27B0),
+    (0x27BF, 0x27BF), (0x2934, 0x2935), (0x2B05, 0x2B07), (0x2B1B, 0x2B1C), (0x2B50, 0x2B50),
+    (0x2B55, 0x2B55), (0x3030, 0x3030), (0x303D, 0x303D), (0x3297, 0x3297), (0x3299, 0x3299),
+    (0x1F000, 0x1F0FF), (0x1F10D, 0x1F10F), (0x1F12F, 0x1F12F), (0x1F16C, 0x1F171), (0x1F17E, 0x1F17F),
+    (0x1F18E, 0x1F18E), (0x1F191, 0x1F19A), (0x1F1AD, 0x1F1E5), (0x1F201, 0x1F20F), (0x1F21A, 0x1F21A),
+    (0x1F22F, 0x1F22F), (0x1F232, 0x1F23A), (0x1F23C, 0x1F23F), (0x1F249, 0x1F3FA), (0x1F400, 0x1F53D),
+    (0x1F546, 0x1F64F), (0x1F680, 0x1F6FF), (0x1F774, 0x1F77F), (0x1F7D5, 0x1F7FF), (0x1F80C, 0x1F80F),
+    (0x1F848, 0x1F84F), (0x1F85A, 0x1F85F), (0x1F888, 0x1F88F), (0x1F8AE, 0x1F8FF), (0x1F90C, 0x1F93A),
+    (0x1F93C, 0x1F945), (0x1F947, 0x1FAFF), (0x1FC00, 0x1FFFD),
+]
+# Combining marks and format characters outside these ranges are not assigned
+_SCAN_RANGES = (range(0x0000, 0x20000), range(0xE0000, 0xE1000))
+
+_segment = None
+
+
+def _runs(code_points):
+    """Sorted code points -> [(first, last)] of consecutive runs."""
+    runs = []
+    for cp in code_points:
+        if runs and runs[-1][1] == cp - 1:
+            runs[-1] = (runs[-1][0], cp)
+        else:
+            runs.append((cp, cp))
+    return runs
+
+
+def _cls(ranges, negate=False):
+    body = ''.join(f'\\U{a:08x}' if a == b else f'\\U{a:08x}-\\U{b:08x}' for a, b in ranges)
+    return f'[{"^" if negate else ""}{body}]'
+
+
+def _build_segment_pattern():
+    """Regular expression matching either a run of stand-alone characters (group `plain`)
+    or one extended grapheme cluster, following the UAX #29 cluster grammar."""
+    category = unicodedata.category
+    control, extend, spacing = [], [], []
+    for block in _SCAN_RANGES:
+        for cp in block:
+            cat = category(chr(cp))
+            if cat == 'Mn' or cat == 'Me':
+                extend.append(cp)
+            elif cat == 'Mc':
+                (extend if cp in _EXTEND_MC else spacing).append(cp)
+            elif cat in ('Cc', 'Cf', 'Zl', 'Zp') and cp not in (0x0D, 0x0A, 0x200C, 0x200D):
+                control.append(cp)
+    prepend = set(cp for a, b in _PREPEND for cp in range(a, b + 1))
+    tags = set(range(0xE0020, 0xE0080))
+    control = _runs(cp for cp in control if cp not in prepend and cp not in tags)
+    extend = _runs(sorted(set(extend) | set(cp for a, b in _EXTEND_EXTRA for cp in range(a, b + 1))))
+    spacing = _runs(sorted(set(spacing) | set(cp for a, b in _SPACING_EXTRA for cp in range(a, b + 1))))
+    lv = [(cp, cp) for cp in range(0xAC00, 0xD7A4, 28)]
+    lvt = [(cp + 1, cp + 27) for cp in range(0xAC00, 0xD7A4, 28)]
+
+    not_control = _cls([(0x0A, 0x0A), (0x0D, 0x0D)] + control, negate=True)
+    post = _cls(extend + spacing + [(0x200D, 0x200D)])
+    # Everything that can take part in a multi-character cluster, or is CR/LF/Control.
+    # `re` tests BMP members against a bitmap but astral ones one range at a time, so
+    # astral characters are left to the cluster branch instead of listed here
+    special = [(0x0A, 0x0A), (0x0D, 0x0D), (0x200D, 0x200D), (0xAC00, 0xD7A3)] + control + extend \
+        + spacing + _PREPEND + _HANGUL_L + _HANGUL_V + _HANGUL_T + _PICTOGRAPHIC
+    special = _cls([r for r in special if r[1] < 0x10000] + [(0x10000, 0x10FFFF)])
+    L, V, T = _cls(_HANGUL_L), _cls(_HANGUL_V), _cls(_HANGUL_T)
+    hangul = f'{L}*(?:{V}+|{_cls(lv)}{V}*|{_cls(lvt)}){T}*|{L}+|{T}+'
+    pict = _cls(_PICTOGRAPHIC)
+    core = f'{hangul}|{_cls(_REGIONAL)}{{2}}|{pict}(?:{_cls(extend)}*\\u200d{pict})*|{not_control}'
+    cluster = f'\\r\\n|{_cls([(0x0A, 0x0A), (0x0D, 0x0D)] + control)}|{_cls(_PREPEND)}*(?:{core}){post}*'
+    # Greedy run; when an extender follows, backtracking hands the last character to the cluster
+    plain = f'(?P<plain>{special[:1]}^{special[1:]}{{1,{CHUNK_CHARS}}}(?!{post}))'
+    return re.compile(f'{plain}|{cluster}|.', re.DOTALL)
+
+
+def segment_pattern():
+    global _segment
+    if _segment is None:
+        _segment = _build_segment_pattern()
+    return _segment
+
+
+def reverse_codepoints(text):
+    return text[::-1]
+
+
+def reverse_graphemes(text):
+    chunks = []
+    pieces = []
+    size = 0
+    for m in segment_pattern().finditer(text):
+        piece = m.group()
+        # A plain run is a sequence of one-character clusters: reverse it whole
+        pieces.append(piece[::-1] if m.lastgroup == 'plain' else piece)
+        size += len(piece)
+        if size >= CHUNK_CHARS:
+            pieces.reverse()
+            chunks.append(''.join(pieces))
+            pieces = []
+            size = 0
+    pieces.reverse()
+    chunks.append(''.join(pieces))
+    chunks.reverse()
+    return ''.join(chunks)
+
+
+_REVERSERS = {'codepoint': reverse_codepoints, 'grapheme': reverse_graphemes}
+
+
+def text_and_mode(params):
+    if not isinstance(params, list) or not 1 <= len(params) <= 2 or not isinstance(params[0], str):
+        raise InvalidParams()
+    mode = params[1] if len(params) == 2 else 'codepoint'
+    # Any JSON value can arrive here; only strings are looked up (a list or object is unhashable)
+    if not isinstance(mode, str) or mode not in _REVERSERS:
+        raise InvalidParams(f"mode must be one of {', '.join(MODES)}")
+    return params[0], mode
+
+
+@rpc.method('reverse', params=text_and_mode, offload=True, cache=True)
+def reverse(text, mode):
+    return _REVERSERS[mode](text)
+
+
+if __name__ == "__main__":
+    main(rpc)